@@ -4,8 +4,16 @@ import sys
 from pathlib import Path
 from time import perf_counter
 
+from ak_api import audit
+from ak_api import cache
+from ak_api import cassette
+from ak_api import metrics
+from ak_api import ratelimit
+from ak_api import scheduler
+from ak_api import transport
 from command import delivery_config as dc
 from command import security as sec
+from command import snapshot
 from utils import _logging as lg
 from utils.parser import AkamaiParser as Parser
 
@@ -19,6 +27,23 @@ if __name__ == '__main__':
         start_time = perf_counter()
         args = Parser.get_args()
         logger = lg.setup_logger(args)
+        if args.record:
+            cassette.configure(mode='record', directory=args.record)
+        elif args.replay:
+            cassette.configure(mode='replay', directory=args.replay, latency=args.replay_latency)
+        elif args.offline:
+            cassette.configure(mode='offline', directory=cassette.snapshot_directory(args.account_switch_key))
+        elif args.update_snapshot:
+            cassette.configure(mode='update', directory=cassette.snapshot_directory(args.account_switch_key))
+        transport.configure(pool_maxsize=args.pool_size, keep_alive=not args.no_keep_alive, http2=args.http2,
+                            base_url=args.base_url)
+        ratelimit.configure(rate=args.rate_limit)
+        scheduler.configure(limit=getattr(args, 'concurrency', None))
+        # a recording must capture every call, not only the cache misses
+        cache.configure(enabled=not args.no_cache and not cassette.recording(), ttl=args.cache_ttl)
+        metrics.start()
+        if args.audit_requests or args.max_duplicates is not None:
+            audit.start()
 
         if args.command == 'delivery-config':
             Path('output/delivery-config').mkdir(parents=True, exist_ok=True)
@@ -26,6 +51,10 @@ if __name__ == '__main__':
                 dc.get_property_all_behaviors(args, logger=logger)
             elif args.subcommand == 'custom-behavior':
                 dc.get_custom_behavior(args, logger=logger)
+            elif args.subcommand == 'activate':
+                dc.activate(args, logger=logger)
+            elif args.subcommand == 'activation-status':
+                dc.activation_status(args, logger=logger)
             else:
                 dc.main(args, logger=logger)
 
@@ -36,5 +65,17 @@ if __name__ == '__main__':
             else:
                 sec.list_config(args, logger)
 
+        if args.command == 'snapshot':
+            if args.subcommand == 'query':
+                snapshot.query(args, logger=logger)
+            else:
+                snapshot.main(args, logger=logger)
+
+        metrics.print_summary()
+        ratelimit.print_headroom()
+        repeats = audit.report() if audit.ENABLED else 0
         end_time = lg.log_cli_timing(start_time)
         logger.info(end_time)
+        if args.max_duplicates is not None and repeats > args.max_duplicates:
+            logger.error(f'{repeats} duplicate API requests, more than --max-duplicates {args.max_duplicates}')
+            sys.exit(1)
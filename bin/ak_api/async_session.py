@@ -0,0 +1,230 @@
+'''
+asyncio counterpart of AkamaiSession for fan-out heavy endpoints
+
+Requests are signed with the same EdgeGridSigner used by the blocking session and sent
+through one httpx.AsyncClient. A semaphore bounds how many requests are in flight.
+
+    async with AsyncPapi(account_switch_key=key, max_in_flight=50) as papi:
+        results = await asyncio.gather(*[papi.get_property_hostnames(x) for x in property_ids])
+'''
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import time
+from configparser import NoSectionError
+
+import httpx
+import requests
+from ak_api import audit
+from ak_api import cache
+from ak_api import cassette
+from ak_api import circuit
+from ak_api import metrics
+from ak_api import ratelimit
+from ak_api import retry
+from ak_api import scheduler
+from ak_api import singleflight
+from ak_api import transport
+from ak_api.edge_auth import EdgeGridSigner
+from akamai.edgegrid import EdgeRc
+
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 120
+
+
+class AsyncAkamaiSession:
+    def __init__(self, edgerc_file: str | None = None,
+                 section: str | None = None,
+                 account_switch_key: str | None = None,
+                 max_in_flight: int | None = None,
+                 http2: bool | None = None):
+
+        if isinstance(edgerc_file, EdgeRc):
+            self.edgerc_file = edgerc_file
+        else:
+            self.edgerc_file = transport.load_edgerc(edgerc_file)
+        self.account_switch_key = account_switch_key if account_switch_key else None
+        self.section = section if section else 'default'
+        self.max_in_flight = max_in_flight if max_in_flight else scheduler.LIMIT
+        self.http2 = transport.HTTP2 if http2 is None else http2
+
+        try:
+            self.host = self.edgerc_file.get(self.section, 'host')
+            self.base_url = transport.BASE_URL if transport.BASE_URL else f'https://{self.host}'
+            self.auth = EdgeGridSigner.from_edgerc(self.edgerc_file, self.section)
+        except NoSectionError:
+            sys.exit(logger.error(f'edgerc section "{self.section}" not found'))
+        self.semaphore = None
+        self.client = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        limits = httpx.Limits(max_connections=self.max_in_flight,
+                              max_keepalive_connections=self.max_in_flight)
+        if cassette.replaying():
+            self.client = httpx.AsyncClient(transport=cassette.AsyncCassetteTransport(), timeout=TIMEOUT)
+        elif cassette.recording():
+            recorder = cassette.AsyncCassetteTransport(httpx.AsyncHTTPTransport(limits=limits, http2=self.http2))
+            self.client = httpx.AsyncClient(transport=recorder, timeout=TIMEOUT)
+        else:
+            self.client = httpx.AsyncClient(limits=limits, timeout=TIMEOUT, http2=self.http2)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+
+    @property
+    def params(self) -> dict:
+        return {'accountSwitchKey': self.account_switch_key} if self.account_switch_key else {}
+
+    def sign(self, method: str, url: str,
+             params: dict | None = None,
+             json: dict | None = None,
+             headers: dict | None = None) -> requests.PreparedRequest:
+        '''
+        Build the request with requests so EdgeGridSigner signs exactly what the blocking session would send
+        '''
+        prepared = requests.Request(method, url, params=params, json=json, headers=headers).prepare()
+        return self.auth(prepared)
+
+    async def request(self, method: str, url: str,
+                      params: dict | None = None,
+                      json: dict | None = None,
+                      headers: dict | None = None) -> httpx.Response:
+        if not audit.ENABLED:
+            return await self.dispatch(method, url, params=params, json=json, headers=headers)
+        start = time.perf_counter()
+        resp = await self.dispatch(method, url, params=params, json=json, headers=headers)
+        kwargs = {'params': params, 'json': json}
+        audit.record(method, url, kwargs, headers or {}, resp.status_code, resp.headers, time.perf_counter() - start)
+        return resp
+
+    async def dispatch(self, method: str, url: str,
+                       params: dict | None = None,
+                       json: dict | None = None,
+                       headers: dict | None = None) -> httpx.Response:
+        if method.upper() != 'GET':
+            return shared(await self.send_with_retry(method, url, params=params, json=json, headers=headers))
+
+        prepared = requests.Request(method, url, params=params, headers=headers).prepare()
+        key = cache.cache_key(method, prepared.url, headers)
+        # tasks asking for the same resource at the same time share one round trip
+        return await singleflight.flights.do_async(key, lambda: self.cached_get(key, prepared.url, url, params, headers))
+
+    async def cached_get(self, key: str, full_url: str, url: str,
+                         params: dict | None = None,
+                         headers: dict | None = None) -> httpx.Response:
+        rule = cache.policy('GET', url)
+        if rule is None:
+            return shared(await self.send_with_retry('GET', url, params=params, headers=headers))
+
+        entry = cache.lookup(key, rule == 'immutable')
+        if entry and entry.fresh:
+            metrics.record('GET', transport.endpoint_template(url), entry.status, 0.0, len(entry.body), cache_hit=True)
+            return cached_response(entry, full_url)
+        if entry and entry.etag:
+            headers = {**(headers or {}), 'If-None-Match': entry.etag}
+
+        resp = await self.send_with_retry('GET', url, params=params, headers=headers)
+        if entry and resp.status_code == 304:
+            cache.touch(key)
+            return cached_response(entry, full_url)
+        if resp.status_code == 200:
+            cache.store(key, full_url, resp.status_code, resp.headers, resp.content, rule == 'immutable')
+        return shared(resp)
+
+    async def send_with_retry(self, method: str, url: str,
+                              params: dict | None = None,
+                              json: dict | None = None,
+                              headers: dict | None = None) -> httpx.Response:
+        bucket = ratelimit.bucket_for(url)
+        policy = retry.RetryPolicy(method, url, transport.endpoint_template(url))
+        breaker = circuit.breaker_for(method, policy.endpoint)
+        if not breaker.allow():
+            metrics.record(method, policy.endpoint, circuit.OPEN, 0.0, 0)
+            return circuit_open_response(breaker, method, url)
+        throttled = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                await bucket.acquire_async()
+                try:
+                    # the session bound is held per attempt, not through backoff and rate-limit sleeps
+                    async with self.semaphore, scheduler.slot_async(url):
+                        # sign once a slot is free so the EdgeGrid timestamp is fresh when the request leaves
+                        prepared = self.sign(method, url, params=params, json=json, headers=headers)
+                        resp = await self.client.request(prepared.method, prepared.url,
+                                                         content=prepared.body,
+                                                         headers=dict(prepared.headers))
+                except httpx.TransportError as err:
+                    delay = policy.delay_error(connect_failed=isinstance(err, (httpx.ConnectError, httpx.ConnectTimeout)))
+                    if delay is None:
+                        breaker.failure()
+                        metrics.record(method, policy.endpoint, type(err).__name__, time.perf_counter() - start, 0, policy.attempt + throttled)
+                        raise
+                    logger.warning(f'{method} {policy.endpoint} {type(err).__name__}, retry {policy.attempt} in {delay:.1f}s')
+                    await asyncio.sleep(delay)
+                    continue
+
+                pause = ratelimit.throttled(resp.status_code, resp.headers, resp.text if resp.status_code in [403, 429] else '')
+                if pause is not None:
+                    if throttled >= ratelimit.MAX_THROTTLED:
+                        break
+                    throttled += 1
+                    if bucket.throttle(pause):
+                        logger.warning(f'rate limited on {bucket.family}, requests resume in {pause:.0f} seconds')
+                    continue
+
+                bucket.recover()
+                bucket.observe(resp.headers)
+                delay = policy.delay(resp.status_code, resp.headers)
+                if delay is None:
+                    break
+                logger.warning(f'{method} {policy.endpoint} {resp.status_code}, retry {policy.attempt} in {delay:.1f}s')
+                await asyncio.sleep(delay)
+        except BaseException:
+            breaker.abort()
+            raise
+
+        breaker.record(resp.status_code)
+        metrics.record(method, policy.endpoint, resp.status_code, time.perf_counter() - start, len(resp.content), policy.attempt + throttled)
+        return resp
+
+    async def get(self, url: str, params: dict | None = None, headers: dict | None = None) -> httpx.Response:
+        return await self.request('GET', url, params=params, headers=headers)
+
+    async def post(self, url: str, json: dict | None = None,
+                   params: dict | None = None, headers: dict | None = None) -> httpx.Response:
+        return await self.request('POST', url, params=params, json=json, headers=headers)
+
+
+class SharedAsyncResponse(singleflight.ParsedOnce, httpx.Response):
+    pass
+
+
+def shared(resp: httpx.Response) -> SharedAsyncResponse:
+    resp.__class__ = SharedAsyncResponse
+    return resp
+
+
+def circuit_open_response(breaker: circuit.CircuitBreaker, method: str, url: str) -> httpx.Response:
+    return httpx.Response(503,
+                          headers={circuit.HEADER: circuit.OPEN},
+                          json=breaker.problem(),
+                          request=httpx.Request(method, url))
+
+
+def cached_response(entry: cache.Entry, url: str) -> SharedAsyncResponse:
+    return SharedAsyncResponse(entry.status,
+                               headers={**entry.headers, cache.HIT_HEADER: 'HIT'},
+                               content=entry.body,
+                               request=httpx.Request('GET', url))
+
+
+if __name__ == '__main__':
+    pass
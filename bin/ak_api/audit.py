@@ -0,0 +1,125 @@
+'''
+Redundant request detector, --audit-requests
+
+Every API call is fingerprinted (method, path, sorted query, Accept header, body digest) and
+journaled with its call site in this code base (logs/api_audit.jsonl, worker processes included).
+report() lists the fingerprints requested more than once in the run, where they were called from
+and the time spent on the repeats. Cache hits and coalesced calls are duplicates too, they cost
+less but still show a caller asking twice for the same thing. Status polls of long running jobs
+(POLLING) repeat on purpose and are not reported.
+
+With --max-duplicates N the CLI exits with status 1 when more than N requests were repeats.
+'''
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+from ak_api import cache
+from ak_api import cassette
+from ak_api import metrics
+from tabulate import tabulate
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = False
+PATH = 'logs/api_audit.jsonl'
+DEPTH = 3  # frames of call site kept per request
+ROOT = f'{Path(__file__).resolve().parents[1]}{os.sep}'
+TRANSPORT = [f'ak_api{os.sep}{x}.py' for x in ['audit', 'async_session', 'edge_auth', 'singleflight', 'transport']]
+# status of bulk searches, bulk activations and activations, asked again until the job is done
+POLLING = [r'^/papi/v1/bulk/rules-search-requests/\d+$',
+           r'^/papi/v1/bulk/activations/\d+$',
+           r'^/papi/v1/properties/[^/]+/activations(/[^/]+)?$']
+
+_journal = metrics.Journal(PATH)
+
+
+def start(path: str | None = None) -> None:
+    global ENABLED, PATH, _journal
+    PATH = path if path else PATH
+    _journal.close()
+    _journal = metrics.Journal(PATH)
+    _journal.reset()
+    ENABLED = True
+
+
+def call_site(depth: int = DEPTH) -> str:
+    '''
+    Innermost frames of this code base above the transport, ie. 'ak_api/papi.py:210 get_property_version_latest < ...'
+    '''
+    sites = []
+    frame = sys._getframe(1)
+    while frame and len(sites) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(ROOT):
+            relative = filename[len(ROOT):]
+            if relative not in TRANSPORT:
+                sites.append(f'{relative}:{frame.f_lineno} {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ' < '.join(sites)
+
+
+def record(method: str, url: str, kwargs: dict, headers, status: int, response_headers, elapsed: float) -> None:
+    prepared = requests.Request(method, url, params=kwargs.get('params'),
+                                data=kwargs.get('data'), json=kwargs.get('json')).prepare()
+    _journal.write({'ts': round(time.time(), 3),
+                    'fingerprint': cassette.interaction_key(method, prepared.url, prepared.body, headers),
+                    'caller': call_site(),
+                    'status': status,
+                    'elapsed': round(elapsed, 4),
+                    'cache': cache.HIT_HEADER in response_headers})
+
+
+def duplicates(records: list[dict] | None = None) -> list[dict]:
+    '''
+    One row per fingerprint requested more than once, most wasted time first
+    '''
+    records = _journal.read() if records is None else records
+    groups = defaultdict(list)
+    for x in records:
+        groups[x['fingerprint']].append(x)
+
+    rows = []
+    for fingerprint, calls in groups.items():
+        if len(calls) < 2 or polling(fingerprint):
+            continue
+        calls = sorted(calls, key=lambda x: x['ts'])
+        callers = Counter(x['caller'] for x in calls)
+        rows.append({'request': fingerprint.split(' accept=')[0],
+                     'calls': len(calls),
+                     'wasted_s': round(sum(x['elapsed'] for x in calls[1:]), 2),
+                     'cache_hits': sum(x['cache'] for x in calls),
+                     'call sites': '\n'.join(f'{v}x {k}' for k, v in callers.most_common())})
+    return sorted(rows, key=lambda x: (x['wasted_s'], x['calls']), reverse=True)
+
+
+def polling(fingerprint: str) -> bool:
+    path = fingerprint.split(' ', 2)[1].split('?')[0]
+    return any(re.match(x, path) for x in POLLING)
+
+
+def report(top: int = 20) -> int:
+    '''
+    Print the duplicated requests, return how many requests were repeats
+    '''
+    rows = duplicates()
+    repeats = sum(x['calls'] - 1 for x in rows)
+    if rows:
+        print()
+        print(tabulate(rows[:top], headers='keys', tablefmt='simple', numalign='right', showindex=False))
+    wasted = sum(x['wasted_s'] for x in rows)
+    logger.info(f'duplicate requests: {repeats} over {len(rows)} resources, {wasted:.2f}s spent on repeats, journal: {PATH}')
+    return repeats
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,201 @@
+'''
+Persistent response cache beneath every AkamaiSession, stored in SQLite under cache/
+
+Only GET responses of known endpoints are cached
+  - the ruletree of a locked property version (activated at least once, see version_cache) never changes
+    and is kept until evicted
+  - account listings (groups, properties, hostnames ...), version details with their activation status,
+    ruletrees of editable versions and appsec exports are served for TTL seconds then revalidated with If-None-Match
+
+Entries are keyed by method, url with sorted query string (accountSwitchKey included) and the
+Accept/PAPI-Use-Prefixes headers which change the response body. Size is bounded, least recently used entries go first.
+'''
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+from ak_api import version_cache
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = True
+TTL = 600                         # seconds before a mutable listing is revalidated
+MAX_BYTES = 512 * 1024 * 1024
+PATH = 'cache/api_cache.db'
+HIT_HEADER = 'X-Akamai-Utility-Cache'  # set on responses served from the cache
+
+IMMUTABLE = [r'^/papi/v1/properties/(?P<property_id>[^/]+)/versions/(?P<version>\d+)/rules$']  # once the version is locked
+MUTABLE = [r'^/papi/v1/(groups|contracts|products|properties)$',
+           r'^/papi/v1/properties/[^/]+$',
+           r'^/papi/v1/properties/[^/]+/hostnames$',
+           r'^/papi/v1/properties/[^/]+/versions$',
+           r'^/papi/v1/properties/[^/]+/versions/\d+$',
+           r'^/papi/v1/properties/[^/]+/versions/\d+/rules$',
+           r'^/papi/v1/properties/[^/]+/versions/\d+/hostnames$',
+           r'^/appsec/v1/export/configs/\d+/versions/\d+$',
+           r'^/appsec/v1/configs$',
+           r'^/network-list/v2/network-lists$',
+           r'^/cprg/v1/cpcodes$']
+KEY_HEADERS = ['Accept', 'PAPI-Use-Prefixes']
+KEEP_HEADERS = ['Content-Type', 'ETag']
+
+_local = threading.local()
+_lock = threading.Lock()
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS response (
+    key         TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    status      INTEGER NOT NULL,
+    headers     TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    etag        TEXT,
+    immutable   INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size        INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_accessed_at ON response (accessed_at);
+'''
+
+
+class Entry(NamedTuple):
+    key: str
+    status: int
+    headers: dict
+    body: bytes
+    etag: str | None
+    fresh: bool
+
+
+def configure(enabled: bool | None = None, ttl: int | None = None,
+              path: str | None = None, max_bytes: int | None = None) -> None:
+    global ENABLED, TTL, PATH, MAX_BYTES
+    if enabled is not None:
+        ENABLED = enabled
+    if ttl is not None:
+        TTL = int(ttl)
+    if path:
+        PATH = path
+    if max_bytes:
+        MAX_BYTES = int(max_bytes)
+
+
+def policy(method: str, url: str) -> str | None:
+    '''
+    'immutable', 'ttl' or None when the response must not be cached
+    '''
+    if not ENABLED or method.upper() != 'GET':
+        return None
+    path = urlparse(str(url)).path
+    for pattern in IMMUTABLE:
+        found = re.match(pattern, path)
+        if found and version_cache.locked(found['property_id'], found['version']):
+            return 'immutable'
+    if any(re.match(x, path) for x in MUTABLE):
+        return 'ttl'
+    return None
+
+
+def cache_key(method: str, url: str, headers: dict | None = None) -> str:
+    parsed = urlparse(str(url))
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    vary = '|'.join(f'{k}={headers.get(k.lower(), "")}' for k in KEY_HEADERS)
+    raw = f'{method.upper()} {parsed.netloc}{parsed.path}?{query} {vary}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def connection() -> sqlite3.Connection:
+    '''
+    One connection per process and thread, pandarallel workers fork with the parent's module state
+    '''
+    owner = (os.getpid(), PATH)
+    if getattr(_local, 'owner', None) != owner:
+        Path(PATH).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(PATH, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with _lock:
+            conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.owner = owner
+    return _local.conn
+
+
+def lookup(key: str, immutable: bool = False) -> Entry | None:
+    '''
+    immutable is the policy of the request, an entry stored as immutable is only fresh while it still is
+    '''
+    try:
+        conn = connection()
+        row = conn.execute('SELECT status, headers, body, etag, immutable, stored_at FROM response WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        status, headers, body, etag, stored_immutable, stored_at = row
+        now = time.time()
+        conn.execute('UPDATE response SET accessed_at = ? WHERE key = ?', (now, key))
+    except sqlite3.Error as err:
+        logger.debug(f'cache lookup skipped: {err}')
+        return None
+    return Entry(key, status, json.loads(headers), bytes(body), etag, (immutable and bool(stored_immutable)) or now - stored_at < TTL)
+
+
+def store(key: str, url: str, status: int, headers, body: bytes, immutable: bool) -> None:
+    kept = {k: headers[k] for k in KEEP_HEADERS if k in headers}
+    now = time.time()
+    try:
+        conn = connection()
+        conn.execute('INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     (key, str(url), status, json.dumps(kept), body, kept.get('ETag'), int(immutable), now, now, len(body)))
+        evict(conn)
+    except sqlite3.Error as err:
+        logger.debug(f'cache store skipped: {err}')
+
+
+def touch(key: str) -> None:
+    '''
+    Server answered 304 Not Modified, the entry is fresh for another TTL
+    '''
+    try:
+        now = time.time()
+        connection().execute('UPDATE response SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+    except sqlite3.Error as err:
+        logger.debug(f'cache touch skipped: {err}')
+
+
+def evict(conn: sqlite3.Connection) -> None:
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM response').fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    excess = total - MAX_BYTES * 0.9  # evict a little extra so the next insert does not evict again
+    rows = conn.execute('SELECT key, size FROM response ORDER BY accessed_at').fetchall()
+    keys = []
+    for key, size in rows:
+        if excess <= 0:
+            break
+        keys.append((key,))
+        excess -= size
+    conn.executemany('DELETE FROM response WHERE key = ?', keys)
+    logger.debug(f'cache evicted {len(keys)} entries')
+
+
+def clear() -> None:
+    connection().execute('DELETE FROM response')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,246 @@
+'''
+Record every API interaction to a cassette and replay it later without network
+
+    --record DIR   store each request/response in DIR/cassette.db (SQLite, zlib compressed bodies)
+    --replay DIR   answer requests from DIR/cassette.db, optionally with --replay-latency
+
+    --update-snapshot   store the responses of this run in the account snapshot, snapshots/{account}/cassette.db,
+                        keeping only the newest response per request
+    --offline           answer every request with the newest response in the account snapshot
+
+Interactions are keyed by method, path, sorted query string, Accept header and a digest of the
+request body, the host is ignored so a cassette replays without the original edgerc.
+The same request recorded several times (activation polling ...) is replayed in the recorded order.
+
+Recording and replay happen at the connection adapter, below the rate limiter, retries, cache and metrics.
+'''
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+logger = logging.getLogger(__name__)
+
+MODE = None          # None, 'record', 'replay', 'update' (snapshot write-through) or 'offline' (snapshot replay)
+DIRECTORY = None
+SNAPSHOTS = 'snapshots'
+LATENCY = 0.0        # seconds added to every replayed response, or 'recorded'
+FILENAME = 'cassette.db'
+DROP_HEADERS = ['Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection']
+PLACEHOLDER_CREDENTIALS = {'host': 'replay.akamaiapis.invalid',
+                           'client_token': 'akab-replay',
+                           'client_secret': 'replay',
+                           'access_token': 'akab-replay'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS interaction (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    key      TEXT NOT NULL,
+    seq      INTEGER NOT NULL,
+    method   TEXT NOT NULL,
+    url      TEXT NOT NULL,
+    status   INTEGER NOT NULL,
+    headers  TEXT NOT NULL,
+    body     BLOB NOT NULL,
+    elapsed  REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS interaction_key_seq ON interaction (key, seq);
+'''
+
+_local = threading.local()
+_lock = threading.Lock()
+_replayed: dict[str, int] = {}
+_missed: set[str] = set()
+
+
+def configure(mode: str | None = None, directory: str | None = None, latency: str | float | None = None) -> None:
+    global MODE, DIRECTORY, LATENCY
+    MODE = mode
+    DIRECTORY = directory
+    if latency is not None:
+        LATENCY = latency if latency == 'recorded' else float(latency) / 1000
+    if MODE in ['record', 'update']:
+        Path(DIRECTORY).mkdir(parents=True, exist_ok=True)
+        if MODE == 'record':
+            Path(DIRECTORY, FILENAME).unlink(missing_ok=True)
+        logger.warning(f'recording API interactions to {DIRECTORY}/{FILENAME}')
+    elif MODE in ['replay', 'offline']:
+        if not Path(DIRECTORY, FILENAME).exists():
+            raise FileNotFoundError(f'{DIRECTORY}/{FILENAME} not found')
+        logger.warning(f'replaying API interactions from {DIRECTORY}/{FILENAME}')
+
+
+def recording() -> bool:
+    return MODE in ['record', 'update']
+
+
+def replaying() -> bool:
+    return MODE in ['replay', 'offline']
+
+
+def snapshot_directory(account_switch_key: str | None = None) -> str:
+    account = account_switch_key if account_switch_key else 'default'
+    return str(Path(SNAPSHOTS, account.replace(':', '_')))
+
+
+def connection() -> sqlite3.Connection:
+    owner = (os.getpid(), DIRECTORY)
+    if getattr(_local, 'owner', None) != owner:
+        conn = sqlite3.connect(str(Path(DIRECTORY, FILENAME)), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        with _lock:
+            conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.owner = owner
+    return _local.conn
+
+
+def interaction_key(method: str, url: str, body: bytes | str | None, headers) -> str:
+    parsed = urlparse(str(url))
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    if body:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True)
+        except ValueError:
+            pass
+        body = body.encode() if isinstance(body, str) else body
+        digest = hashlib.sha256(body).hexdigest()[:16]
+    else:
+        digest = ''
+    return f'{method.upper()} {parsed.path}?{query} accept={headers.get("Accept", "")} body={digest}'
+
+
+def save(key: str, method: str, url: str, status: int, headers, body: bytes, elapsed: float) -> None:
+    kept = {k: v for k, v in headers.items() if k.title() not in DROP_HEADERS}
+    conn = connection()
+    if MODE == 'update':
+        # a snapshot keeps the newest response only
+        conn.execute('''INSERT OR REPLACE INTO interaction (key, seq, method, url, status, headers, body, elapsed)
+                        VALUES (?, 0, ?, ?, ?, ?, ?, ?)''',
+                     (key, method, str(url), status, json.dumps(kept), zlib.compress(body), elapsed))
+        return
+    conn.execute('''INSERT INTO interaction (key, seq, method, url, status, headers, body, elapsed)
+                    SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ?, ?, ?, ? FROM interaction WHERE key = ?''',
+                 (key, method, str(url), status, json.dumps(kept), zlib.compress(body), elapsed, key))
+
+
+def load(key: str) -> tuple | None:
+    '''
+    Next recorded (status, headers, body, elapsed) for the key, the last one repeats once all were served.
+    Offline, the newest recorded response is always served.
+    '''
+    with _lock:
+        seq = 2 ** 62 if MODE == 'offline' else _replayed.get(key, 0)
+        _replayed[key] = seq + 1
+    row = connection().execute('''SELECT status, headers, body, elapsed FROM interaction
+                                  WHERE key = ? AND seq <= ? ORDER BY seq DESC LIMIT 1''', (key, seq)).fetchone()
+    if row is None:
+        if key not in _missed:
+            _missed.add(key)
+            logger.warning(f'not in cassette: {key}')
+        return None
+    status, headers, body, elapsed = row
+    return status, json.loads(headers), zlib.decompress(body), elapsed
+
+
+def replay_delay(elapsed: float) -> float:
+    return elapsed if LATENCY == 'recorded' else LATENCY
+
+
+def missing(url: str) -> tuple:
+    body = json.dumps({'title': 'Not recorded', 'detail': f'{url} is not in the cassette'}).encode()
+    return 404, {'Content-Type': 'application/problem+json'}, body, 0.0
+
+
+class RecordingAdapter(BaseAdapter):
+    '''
+    Wrap the real adapter and save what went over the wire
+    '''
+    def __init__(self, adapter: BaseAdapter):
+        super().__init__()
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        # resp.elapsed is only set by Session.send once the adapter returned
+        start = time.perf_counter()
+        resp = self.adapter.send(request, **kwargs)
+        elapsed = time.perf_counter() - start
+        key = interaction_key(request.method, request.url, request.body, request.headers)
+        save(key, request.method, request.url, resp.status_code, resp.headers, resp.content, elapsed)
+        resp.raw = io.BytesIO(resp.content)  # saving read the body, a streaming caller reads it again from here
+        return resp
+
+    def close(self):
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        key = interaction_key(request.method, request.url, request.body, request.headers)
+        status, headers, body, elapsed = load(key) or missing(request.url)
+        delay = replay_delay(elapsed)
+        if delay:
+            time.sleep(delay)
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.raw = io.BytesIO(body)
+        resp._content = body
+        resp._content_consumed = True
+        resp.url = request.url
+        resp.request = request
+        resp.reason = 'Replayed'
+        return resp
+
+    def close(self):
+        pass
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = interaction_key(request.method, str(request.url), request.content, request.headers)
+        if replaying():
+            status, headers, body, elapsed = load(key) or missing(request.url)
+            delay = replay_delay(elapsed)
+            if delay:
+                await asyncio.sleep(delay)
+            return httpx.Response(status, headers=headers, content=body, request=request)
+
+        start = time.perf_counter()
+        resp = await self.transport.handle_async_request(request)
+        body = await resp.aread()
+        await resp.aclose()
+        headers = {k: v for k, v in resp.headers.items() if k.title() not in DROP_HEADERS}
+        save(key, request.method, request.url, resp.status_code, headers, body, time.perf_counter() - start)
+        return httpx.Response(resp.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        if self.transport:
+            await self.transport.aclose()
+
+
+if __name__ == '__main__':
+    pass
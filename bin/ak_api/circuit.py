@@ -0,0 +1,106 @@
+'''
+Circuit breaker per endpoint template
+
+After THRESHOLD consecutive failures (connection errors, timeouts or 5xx once retries are spent)
+the endpoint is open: calls return a synthetic 503 right away instead of waiting for the same error.
+After COOL_DOWN seconds one probe request is let through, success closes the circuit,
+failure keeps it open for another COOL_DOWN. 4xx responses are answers, not failures.
+A probe that ends without an answer (429, cancelled, unexpected error) opens the circuit again.
+'''
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+THRESHOLD = 5
+COOL_DOWN = 30
+OPEN_TYPE = 'circuit-open'  # problem type of the synthetic response
+HEADER = 'X-Akamai-Utility-Circuit'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= COOL_DOWN:
+                self.state = HALF_OPEN  # this caller is the probe, everyone else still fails fast
+                logger.warning(f'{self.endpoint} probing after {COOL_DOWN}s')
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.warning(f'{self.endpoint} recovered, circuit closed')
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= THRESHOLD):
+                if self.state == CLOSED:
+                    logger.error(f'{self.endpoint} failed {self.failures} times in a row, skipping it for {COOL_DOWN}s')
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def abort(self) -> None:
+        '''
+        The request ended without telling whether the endpoint is healthy, a probe gives way to the next one
+        '''
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def record(self, status_code: int) -> None:
+        if status_code >= 500:
+            self.failure()
+        elif status_code == 429:
+            self.abort()
+        else:
+            self.success()
+
+    def problem(self) -> dict:
+        return {'type': OPEN_TYPE,
+                'title': 'Circuit open',
+                'status': 503,
+                'detail': f'{self.endpoint} failed {self.failures} times in a row, request not sent'}
+
+
+def breaker_for(method: str, endpoint: str) -> CircuitBreaker:
+    key = f'{method.upper()} {endpoint}'
+    with _lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(key)
+        return _breakers[key]
+
+
+def is_open(json_output) -> bool:
+    '''
+    True when an API method got the synthetic response of an open circuit
+    '''
+    return isinstance(json_output, dict) and json_output.get('type') == OPEN_TYPE
+
+
+if __name__ == '__main__':
+    pass
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator
 
 from ak_api.edge_auth import AkamaiSession
 from utils import _logging as lg
@@ -42,6 +43,14 @@ class CpCode(AkamaiSession):
         resp = self.session.get(f'{self._base_url}/cpcodes', params=params, headers=self.headers)
         return resp.status_code, resp.json()
 
+    def iter_cpcodes(self, contract_id: str | None = None, group_id: str | None = None) -> Iterator[dict]:
+        params = {**self.params}
+        if contract_id:
+            params['contractId'] = contract_id
+        if group_id:
+            params['groupId'] = group_id
+        return self.iter_records(f'{self._base_url}cpcodes', 'cpcodes.item', params=params, headers=self.headers)
+
     def get_cpcode(self, cpcode: str) -> tuple:
         resp = self.session.get(f'{self._base_url}cpcodes/{cpcode}', params=self.params, headers=self.headers)
         return resp.status_code, resp.json()
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator
 from urllib.parse import urlparse
 
 import pandas as pd
-from akamai_api.edge_auth import AkamaiSession
+import requests
+from ak_api.edge_auth import AkamaiSession
 from rich import print_json
 from utils import google_dns as gg
 
@@ -21,18 +23,23 @@ class CpsWrapper(AkamaiSession):
         self.account_switch_key = account_switch_key if account_switch_key else None
         self.logger = logger
 
+    def iter_enrollments(self, contract_id: str) -> Iterator[dict]:
+        params = {**self.params, 'contractId': contract_id}
+        return self.iter_records(f'{self.MODULE}/enrollments', 'enrollments.item', params=params, headers=self.headers)
+
     def list_enrollments(self, contract_id: str, enrollment_ids: list | None = None) -> list:
         self.logger.debug(f'{contract_id=} {enrollment_ids=}')
 
-        params = self.params
-        params['contractId'] = contract_id
-        resp = self.session.get(f'{self.MODULE}/enrollments', params=params, headers=self.headers)
-        enrollments = []
+        try:
+            enrollments = list(self.iter_enrollments(contract_id))
+            status = 200
+        except requests.HTTPError as err:
+            enrollments = []
+            status = err.response.status_code
         empty_df = pd.DataFrame()
-        if resp.status_code == 200:
+        if status == 200:
 
-            self.logger.debug(f'Enrollments for contract {contract_id:<15} {urlparse(resp.url).path:>20} {resp.status_code}')
-            enrollments = resp.json()['enrollments']
+            self.logger.debug(f'Enrollments for contract {contract_id:<15} {len(enrollments):>4} enrollments {status}')
 
             df = pd.DataFrame(enrollments)
             pd.set_option('display.max_rows', 300)
@@ -69,7 +76,7 @@ class CpsWrapper(AkamaiSession):
             else:
                 return [], pd.DataFrame()
         else:
-            self.logger.debug(f'Enrollments for contract {contract_id:<15} {urlparse(resp.url).path:>20} {resp.status_code}')
+            self.logger.debug(f'Enrollments for contract {contract_id:<15} {status}')
             return [], pd.DataFrame()
 
     def collect_enrollments(self, contract_id: str, enrollments: list, enrollment_ids: list | None = None) -> list:
@@ -1,20 +1,88 @@
 from __future__ import annotations
 
+import functools
+import io
 import logging
 import os
 import re
 import sys
+from collections.abc import Iterator
 from configparser import NoOptionError
 from configparser import NoSectionError
 from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
 
 import requests
+from ak_api import transport
 from akamai.edgegrid import EdgeGridAuth
 from akamai.edgegrid import EdgeRc
+from akamai.edgegrid.edgegrid import EdgeGridAuthHeaders
+from akamai.edgegrid.edgegrid import base64_hmac_sha256
+from akamai.edgegrid.edgegrid import base64_sha256
+from utils import jsonio
 
 
 logger = logging.getLogger(__name__)
 
+BODY_HASHES = 256  # distinct POST bodies whose hash is kept
+
+
+class EdgeGridSigner(EdgeGridAuth):
+    '''
+    EdgeGridAuth that does not redo work shared between requests,
+    signatures are identical to the ones of EdgeGridAuth
+    '''
+    def __init__(self, client_token: str, client_secret: str, access_token: str,
+                 headers_to_sign: tuple | list = (), max_body: int = 131072):
+        super().__init__(client_token, client_secret, access_token, headers_to_sign, max_body)
+        self.ah = SigningHeaders(client_token, client_secret, access_token, headers_to_sign, max_body)
+
+    @classmethod
+    def from_edgerc(cls, rcinput: EdgeRc | str, section: str = 'default') -> EdgeGridSigner:
+        ah = EdgeGridAuth.from_edgerc(rcinput, section).ah
+        return cls(ah.client_token, ah.client_secret, ah.access_token, ah.headers_to_sign, ah.max_body)
+
+
+class SigningHeaders(EdgeGridAuthHeaders):
+    '''
+    The signing key only depends on the timestamp, which changes once per second,
+    it is derived once per timestamp. POST bodies sent again (find-by-value, bulk searches)
+    reuse their content hash. The AkamaiCLI User-Agent suffix is read from the environment once.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._signing_key = ('', '')
+        self._version_header = super().get_header_versions({}).get('User-Agent', '')
+
+    def get_header_versions(self, header: dict | None = None) -> dict:
+        header = {} if header is None else header
+        if self._version_header:
+            if 'User-Agent' not in header:
+                header['User-Agent'] = self._version_header
+            else:
+                header['User-Agent'] += f' {self._version_header}'
+        return header
+
+    def make_signing_key(self, timestamp: str) -> str:
+        cached, signing_key = self._signing_key  # one tuple, read and replaced atomically across threads
+        if cached != timestamp:
+            signing_key = base64_hmac_sha256(timestamp, self.client_secret)
+            self._signing_key = (timestamp, signing_key)
+        return signing_key
+
+    def make_content_hash(self, body, method: str) -> str:
+        if method != 'POST' or not body:
+            return ''
+        if isinstance(body, (bytes, str)):
+            return content_hash(body[:self.max_body])
+        return super().make_content_hash(body, method)  # multipart encoder
+
+
+@functools.lru_cache(maxsize=BODY_HASHES)
+def content_hash(body: bytes | str) -> str:
+    return base64_sha256(body)
+
 
 class AkamaiSession:
     def __init__(self, edgerc_file: str | None = None,
@@ -24,7 +92,10 @@ class AkamaiSession:
                  contract_id: int | None = None,
                  group_id: int | None = None):
 
-        self.edgerc_file = edgerc_file if edgerc_file else EdgeRc(f'{str(Path.home())}/.edgerc')
+        if isinstance(edgerc_file, EdgeRc):
+            self.edgerc_file = edgerc_file
+        else:
+            self.edgerc_file = transport.load_edgerc(edgerc_file)
         self.account_switch_key = account_switch_key if account_switch_key else None
         self.contract_id = contract_id if contract_id else None
         self.group_id = group_id if group_id else None
@@ -33,9 +104,9 @@ class AkamaiSession:
 
         try:
             self.host = self.edgerc_file.get(self.section, 'host')
-            self.base_url = f'https://{self.host}'
-            self.session = requests.Session()
-            self.session.auth = EdgeGridAuth.from_edgerc(self.edgerc_file, self.section)
+            self.base_url = transport.BASE_URL if transport.BASE_URL else f'https://{self.host}'
+            # one pooled session per (section, host), shared by all API wrappers
+            self.session = transport.get_session(self.edgerc_file, self.section, self.host)
         except NoSectionError:
             sys.exit(logger.error(f'edgerc section "{self.section}" not found'))
 
@@ -51,6 +122,43 @@ class AkamaiSession:
             account_switch_key = account_switch_key.translate(account_switch_key.maketrans('&', '?'))
             return f'{url}{account_switch_key}'
 
+    def iter_records(self, url: str, prefix: str,
+                     params: dict | None = None,
+                     headers: dict | None = None,
+                     page_size: int | None = None) -> Iterator[Any]:
+        '''
+        Yield the records of a list endpoint while the response is read,
+        prefix locates the array in ijson notation, for example 'properties.items.item'
+
+        Only one record is decoded at a time, so memory stays flat on large accounts and callers
+        can start working before the last byte arrives. With page_size, page/pageSize query parameters
+        are walked until a short page comes back. A failed call raises requests.HTTPError, an error
+        must not read as an empty account.
+        '''
+        page = 1
+        while True:
+            query = {**(params or {})}
+            if page_size:
+                query.update({'page': page, 'pageSize': page_size})
+            count = 0
+            with self.session.get(url, params=query, headers=headers, stream=True) as resp:
+                if resp.status_code != 200:
+                    logger.error(f'{resp.status_code} {urlparse(url).path} {resp.text[:200]}')
+                    raise requests.HTTPError(f'{resp.status_code} {resp.reason} for {urlparse(url).path}', response=resp)
+                if resp._content_consumed:
+                    # cached, coalesced, recorded or replayed responses were read whole already
+                    body = io.BytesIO(resp.content)
+                else:
+                    body = resp.raw
+                    if hasattr(body, 'decode_content'):
+                        body.decode_content = True  # ijson reads the raw stream, let urllib3 gunzip it
+                for record in jsonio.iter_items(body, prefix):
+                    count += 1
+                    yield record
+            if not page_size or count < page_size:
+                return
+            page += 1
+
     def update_account_key(self, account_key: str) -> None:
         self.account_switch_key = account_key
 
@@ -95,4 +203,17 @@ class AkamaiSession:
 
 
 if __name__ == '__main__':
-    pass
+    # python -m ak_api.edge_auth, signing cost of the stock EdgeGridAuth vs EdgeGridSigner
+    import time
+
+    credentials = ('akab-client-token', 'client-secret-of-44-characters-xxxxxxxxxxxx', 'akab-access-token')
+    body = '{"bulkSearchQuery": {"syntax": "JSONPATH", "match": "$..behaviors[?(@.name == \'origin\')]"}}'
+    request = requests.Request('POST', 'https://akab-host.luna.akamaiapis.net/papi/v1/search/find-by-value',
+                               data=body, headers={'Content-Type': 'application/json'}).prepare()
+    for auth in [EdgeGridAuth(*credentials), EdgeGridSigner(*credentials)]:
+        n = 20_000
+        start = time.perf_counter()
+        for _ in range(n):
+            auth(request)
+        elapsed = time.perf_counter() - start
+        print(f'{type(auth).__name__:<15} {n / elapsed:>10,.0f} requests/s {elapsed / n * 1e6:>6.1f} us/request')
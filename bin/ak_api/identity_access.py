@@ -40,9 +40,8 @@ class IdentityAccessManagement(AkamaiSession):
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
         elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            self.logger.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
+            # the session already paused and replayed the request, still blocked
+            sys.exit(self.logger.error(resp.json()['detail']))
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
@@ -72,9 +71,8 @@ class IdentityAccessManagement(AkamaiSession):
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
         elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
+            # the session already paused and replayed the request, still blocked
+            sys.exit(self.logger.error(resp.json()['detail']))
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
@@ -95,9 +93,8 @@ class IdentityAccessManagement(AkamaiSession):
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
         elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
+            # the session already paused and replayed the request, still blocked
+            sys.exit(self.logger.error(resp.json()['detail']))
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
@@ -0,0 +1,142 @@
+'''
+Per endpoint request metrics for one CLI run
+
+Every API call appends one line to a journal (logs/api_requests.jsonl) so calls made inside
+pandarallel worker processes are counted too. summary() aggregates the journal by endpoint
+template: count, latency percentiles, bytes, status codes, retries and cache hits.
+'''
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+from pathlib import Path
+
+from tabulate import tabulate
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = False
+PATH = 'logs/api_requests.jsonl'
+
+
+class Journal:
+    '''
+    Append-only JSON lines file written by the CLI and by the worker processes it forks
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = None
+        self.file = None
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.file:
+                self.file.close()
+            self.pid = None
+            self.file = None
+
+    def reset(self) -> None:
+        self.close()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        open(self.path, 'w').close()
+
+    def write(self, entry: dict) -> None:
+        line = json.dumps(entry)
+        with self._lock:
+            if self.pid != os.getpid():
+                # forked worker, do not share the parent's buffered file object
+                self.file = open(self.path, 'a', buffering=1)
+                self.pid = os.getpid()
+            self.file.write(f'{line}\n')
+
+    def read(self) -> list[dict]:
+        if not Path(self.path).exists():
+            return []
+        with self._lock:
+            if self.file:
+                self.file.flush()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+_journal = Journal(PATH)
+
+
+def start(path: str | None = None) -> None:
+    '''
+    Start a new journal, called once by the CLI before any API call
+    '''
+    global ENABLED, PATH, _journal
+    PATH = path if path else PATH
+    _journal.close()
+    _journal = Journal(PATH)
+    _journal.reset()
+    ENABLED = True
+
+
+def record(method: str, endpoint: str, status: int, elapsed: float, size: int,
+           retries: int = 0, cache_hit: bool = False) -> None:
+    if not ENABLED:
+        return
+    _journal.write({'ts': round(time.time(), 3), 'pid': os.getpid(),
+                    'method': method.upper(), 'endpoint': endpoint, 'status': status,
+                    'elapsed': round(elapsed, 4), 'bytes': size, 'retries': retries, 'cache': cache_hit})
+
+
+def load() -> list[dict]:
+    return _journal.read()
+
+
+def percentile(values: list[float], p: float) -> float:
+    ranked = sorted(values)
+    return ranked[max(0, math.ceil(p / 100 * len(ranked)) - 1)]
+
+
+def summary(records: list[dict] | None = None) -> list[dict]:
+    '''
+    One row per method + endpoint template, slowest total time first
+    '''
+    records = load() if records is None else records
+    groups = defaultdict(list)
+    for x in records:
+        groups[(x['method'], x['endpoint'])].append(x)
+
+    rows = []
+    for (method, endpoint), calls in groups.items():
+        elapsed = [x['elapsed'] for x in calls]
+        network = [x['elapsed'] for x in calls if not x['cache']] or [0.0]
+        status = Counter(x['status'] for x in calls)
+        rows.append({'endpoint': f'{method} {endpoint}',
+                     'calls': len(calls),
+                     'p50_ms': round(percentile(network, 50) * 1000),
+                     'p95_ms': round(percentile(network, 95) * 1000),
+                     'p99_ms': round(percentile(network, 99) * 1000),
+                     'total_s': round(sum(elapsed), 2),
+                     'KB': round(sum(x['bytes'] for x in calls) / 1024, 1),
+                     'status': ' '.join(f'{k}:{v}' for k, v in sorted(status.items(), key=lambda x: str(x[0]))),
+                     'retries': sum(x['retries'] for x in calls),
+                     'cache_hits': sum(x['cache'] for x in calls)})
+    return sorted(rows, key=lambda x: x['total_s'], reverse=True)
+
+
+def print_summary(top: int = 20) -> None:
+    rows = summary()
+    if not rows:
+        return
+    calls = sum(x['calls'] for x in rows)
+    hits = sum(x['cache_hits'] for x in rows)
+    print()
+    print(tabulate(rows[:top], headers='keys', tablefmt='simple', numalign='right', showindex=False))
+    logger.info(f'API calls: {calls}, cache hits: {hits}, endpoints: {len(rows)}, journal: {PATH}')
+
+
+if __name__ == '__main__':
+    pass
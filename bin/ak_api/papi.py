@@ -4,16 +4,31 @@ from __future__ import annotations
 
 import logging
 import sys
+import time
 import xml.etree.ElementTree as ET
 from collections import defaultdict
+from collections.abc import Iterator
 from urllib.parse import urlparse
 
+from ak_api import version_cache
+from ak_api.async_session import AsyncAkamaiSession
 from ak_api.edge_auth import AkamaiSession
-from boltons.iterutils import remap
 from requests.structures import CaseInsensitiveDict
 from rich import print_json
 from utils import _logging as lg
 from utils import files
+from utils import jsonio
+
+
+# ruletree tags we are not interested to compare
+RULETREE_IGNORE_KEYS = ['etag', 'errors', 'warnings', 'ruleFormat', 'comments',
+                        'accountId', 'contractId', 'groupId',
+                        'propertyId', 'propertyName', 'propertyVersion']
+BULK_SEARCH_TIMEOUT = 600       # seconds to wait for a bulk rules search
+BULK_SEARCH_POLL = (1, 15)      # first and longest seconds between polls
+BULK_ACTIVATION_SIZE = 100      # property versions per bulk activation request
+BULK_ACTIVATION_TIMEOUT = 3600  # seconds to wait for a bulk activation to complete
+BULK_ACTIVATION_POLL = (10, 60)  # first and longest seconds between polls
 
 
 class Papi(AkamaiSession):
@@ -77,47 +92,114 @@ class Papi(AkamaiSession):
             return response.json()
 
     # BULK
-    def bulk_search_properties(self):
+    def submit_bulk_search(self, match: str, contract_id: str | None = None, group_id: int | None = None) -> tuple:
+        '''
+        Start a rules search over the latest and active versions of every property, returns the bulkSearchId
+        '''
+        url = self.form_url(f'{self.MODULE}/bulk/rules-search-requests')
+        params = {k: v for k, v in {'contractId': contract_id, 'groupId': group_id}.items() if v}
+        payload = {'bulkSearchQuery': {'syntax': 'JSONPATH', 'match': match}}
+        resp = self.session.post(url, json=payload, params=params, headers=self.headers)
+        self.logger.debug(f'Submitting bulk search {urlparse(resp.url).path:<30} {resp.status_code} {match}')
+        if resp.status_code in [200, 201, 202]:
+            link = resp.json()['bulkSearchLink']
+            return 202, int(urlparse(link).path.rstrip('/').split('/')[-1])
+        else:
+            return resp.status_code, resp.json()
 
-        url = '/bulk/rules-search-requests'
-        if self.contract_id:
-            query_params = f'contractId={self.contract_id}'
-        if self.group_id:
-            query_params = f'?{query_params}&groupId={self.group_id}' if query_params else f'?groupId={self.group_id}'
-        url = self.form_url(f'{self.MODULE}{url}{query_params}')
+    def get_bulk_search(self, bulk_search_id: int) -> tuple:
+        url = self.form_url(f'{self.MODULE}/bulk/rules-search-requests/{bulk_search_id}')
+        resp = self.session.get(url, headers=self.headers)
+        self.logger.debug(f'Polling bulk search {urlparse(resp.url).path:<30} {resp.status_code}')
+        return resp.status_code, resp.json()
 
-        search_query = {'bulkSearchQuery': {'syntax': 'JSONPATH', 'match': '$.name'}}
+    def bulk_search_properties(self, match: str, contract_id: str | None = None, group_id: int | None = None,
+                               timeout: float = BULK_SEARCH_TIMEOUT) -> tuple:
+        '''
+        Submit a JSONPath rules search and wait for it, returns (200, iterator of matches) or (status, error)
 
-        resp = self.session.post(url, json=search_query, headers=self.headers)
-        self.logger.info(resp.status_code)
-        self.logger.info(print_json(data=resp.json()))
+        one match per (property, version, path), ie.
+        {'propertyId': 123, 'propertyName': 'www.example.com', 'propertyVersion': 5,
+         'path': '/rules/children/1/behaviors/0', 'productionStatus': 'ACTIVE', 'stagingStatus': 'INACTIVE', 'isLatest': True}
+        '''
+        status, bulk_search_id = self.submit_bulk_search(match, contract_id, group_id)
+        if status != 202:
+            self.logger.error(f'bulk search {match} {status} {bulk_search_id}')
+            return status, bulk_search_id
+        return self.wait_bulk_search(bulk_search_id, timeout)
 
-    def bulk_activate_properties(self, emails: list,
-                                 contract_id: str,
-                                 group_id: int,
-                                 network: str,
-                                 note: str,
-                                 property_id: str,
-                                 version: str):
+    def wait_bulk_search(self, bulk_search_id: int, timeout: float = BULK_SEARCH_TIMEOUT) -> tuple:
+        '''
+        Poll a submitted search, backing off up to BULK_SEARCH_POLL[1] seconds, until it completes
+        '''
+        deadline = time.monotonic() + timeout
+        interval = BULK_SEARCH_POLL[0]
+        while True:
+            status, search = self.get_bulk_search(bulk_search_id)
+            if status != 200:
+                self.logger.error(f'bulk search {bulk_search_id} {status}')
+                return status, search
+            if search['searchTargetStatus'] == 'COMPLETE':
+                return 200, self._bulk_search_matches(search['results'])
+            if search['searchTargetStatus'] == 'ERROR':
+                self.logger.error(f'bulk search {bulk_search_id} failed {search.get("bulkSearchQuery")}')
+                return 500, search
+            if time.monotonic() + interval > deadline:
+                self.logger.error(f'bulk search {bulk_search_id} still {search["searchTargetStatus"]} after {timeout}s')
+                return 408, search
+            time.sleep(interval)
+            interval = min(interval * 2, BULK_SEARCH_POLL[1])
+
+    @staticmethod
+    def _bulk_search_matches(results: list) -> Iterator[dict]:
+        for result in results:
+            for path in result.get('matchLocations', []):
+                yield {'propertyId': version_cache.property_key(result['propertyId']),
+                       'propertyName': result['propertyName'],
+                       'propertyVersion': int(result['propertyVersion']),
+                       'path': path,
+                       'productionStatus': result.get('productionStatus'),
+                       'stagingStatus': result.get('stagingStatus'),
+                       'isLatest': result.get('isLatest')}
+
+    def bulk_activate_properties(self, activations: list, emails: list,
+                                 contract_id: str | None = None, group_id: int | None = None) -> tuple:
+        '''
+        Submit one batch from activation_batches, returns (202, bulkActivationId) or (status, error)
+        '''
+        url = self.form_url(f'{self.MODULE}/bulk/activations')
+        params = {k: v for k, v in {'contractId': contract_id, 'groupId': group_id}.items() if v}
+        resp = self.session.post(url, json=self.bulk_activation_payload(activations, emails), params=params, headers=self.headers)
+        self.logger.debug(f'Submitting bulk activation {urlparse(resp.url).path:<30} {resp.status_code} {len(activations)} versions')
+        if resp.status_code in [200, 201, 202]:
+            return 202, self.bulk_activation_id(resp.json()['bulkActivationLink'])
+        else:
+            return resp.status_code, resp.json()
 
-        url = f'{self.MODULE}/bulk/activations'
-        params = f'?contractId={contract_id}&groupId={group_id}'
-        url = self.form_url(f'{url}{params}')
-        payload = {'activatePropertyVersions': [{'network': network.upper(),
-                                                 'note': note,
-                                                 'propertyId': property_id,
-                                                 'propertyVersion': version
-                                                }
-                                               ],
-                   'defaultActivationSettings': {'notifyEmails': emails,
-                                                 'acknowledgeAllWarnings': True,
-                                                 'fastPush': True,
-                                                 'useFastFallback': True
-                                                }
-                  }
-        resp = self.session.post(url, json=payload, headers=self.headers)
+    def get_bulk_activation(self, bulk_activation_id: int) -> tuple:
+        url = self.form_url(f'{self.MODULE}/bulk/activations/{bulk_activation_id}')
+        resp = self.session.get(url, headers=self.headers)
+        self.logger.debug(f'Polling bulk activation {urlparse(resp.url).path:<30} {resp.status_code}')
         return resp.status_code, resp.json()
 
+    @staticmethod
+    def bulk_activation_payload(activations: list, emails: list) -> dict:
+        return {'activatePropertyVersions': [{'network': x['network'].upper(),
+                                              'note': x.get('note', ''),
+                                              'propertyId': x['propertyId'],
+                                              'propertyVersion': int(x['propertyVersion'])
+                                             } for x in activations],
+                'defaultActivationSettings': {'notifyEmails': emails,
+                                              'acknowledgeAllWarnings': True,
+                                              'fastPush': True,
+                                              'useFastFallback': True
+                                             }
+               }
+
+    @staticmethod
+    def bulk_activation_id(link: str) -> int:
+        return int(urlparse(link).path.rstrip('/').split('/')[-1])
+
     # GROUPS
     def get_groups(self) -> list:
         response = self.session.get(f'{self.MODULE}/groups', params=self.params, headers=self.headers)
@@ -155,12 +237,14 @@ class Papi(AkamaiSession):
                 self.asset_id = property_items[0]['assetId']
                 self.group_id = int(property_items[0]['groupId'])
                 self.property_id = int(property_items[0]['propertyId'])
+                for item in property_items:
+                    version_cache.remember_property(item)
                 return 200, property_items
 
         elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
+            # the session already paused and replayed the request, still blocked
+            self.logger.error(f"{property_name:<40} {resp.json()['detail']}")
+            return resp.status_code, resp.json()
         else:
             self.logger.info(f'{property_name:<40} {resp.status_code}')
             print_json(data=resp.json())
@@ -190,16 +274,20 @@ class Papi(AkamaiSession):
         response = self.session.get(url, headers=self.headers)
         self.logger.debug(f'Collecting properties {urlparse(response.url).path:<30} {response.status_code} {response.url}')
         if response.status_code == 200:
-            return response.json()['properties']['items']
+            return [version_cache.remember_property(x) for x in response.json()['properties']['items']]
         else:
             return response.json()
 
+    def iter_properties_per_group(self, group_id: int, contract_id: str) -> Iterator[dict]:
+        url = self.form_url(f'{self.MODULE}/properties?contractId={contract_id}&groupId={group_id}')
+        return map(version_cache.remember_property, self.iter_records(url, 'properties.items.item', headers=self.headers))
+
     def get_property_version_latest(self, property_id: int) -> dict:
         url = self.form_url(f'{self.MODULE}/properties/{property_id}')
         response = self.session.get(url, headers=self.headers)
         self.logger.debug(f'Collecting properties {urlparse(response.url).path:<30} {response.status_code} {response.url}')
         if response.status_code == 200:
-            return response.json()['properties']['items'][0]
+            return version_cache.remember_property(response.json()['properties']['items'][0])
         else:
             return response.json()
 
@@ -228,13 +316,7 @@ class Papi(AkamaiSession):
                         }
         }
         '''
-        url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}')
-        response = self.session.get(url)
-        self.logger.debug(f'Collecting properties version detail {urlparse(response.url).path:<30} {response.status_code}')
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return response.json()
+        return self._version_detail(property_id, version)[1]
 
     def get_property_version_detail(self, property_id: int, version: int) -> list:
         '''
@@ -261,18 +343,28 @@ class Papi(AkamaiSession):
                         }
         }
         '''
+        status, detail = self._version_detail(property_id, version)
+        if status == 200:
+            propertyName = detail['propertyName']
+            assetId = detail['assetId'][4:]
+            gid = detail['groupId'][4:]
+            acc_url = f'https://control.akamai.com/apps/property-manager/#/property-version/{assetId}/{version}/edit?gid={gid}'
+            self.logger.debug(f'{propertyName:<46} {acc_url}')
+        return detail
+
+    def _version_detail(self, property_id: int, version: int) -> tuple:
+        '''
+        Version detail with prefixed ids, fetched once per run for every caller
+        '''
+        detail = version_cache.version(property_id, version)
+        if detail is not None:
+            return 200, detail
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}')
         response = self.session.get(url)
         self.logger.debug(f'Collecting properties version detail {urlparse(response.url).path:<30} {response.status_code}')
         if response.status_code == 200:
-            propertyName = response.json()['propertyName']
-            assetId = response.json()['assetId'][4:]
-            gid = response.json()['groupId'][4:]
-            acc_url = f'https://control.akamai.com/apps/property-manager/#/property-version/{assetId}/{version}/edit?gid={gid}'
-            self.logger.debug(f'{propertyName:<46} {acc_url}')
-            return response.json()
-        else:
-            return response.json()
+            version_cache.remember_version(property_id, version, response.json())
+        return response.status_code, response.json()
 
     def get_properties_version_metadata_xml(self,
                                             property_name: str,
@@ -396,14 +488,10 @@ class Papi(AkamaiSession):
     def property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None):
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}/rules')
 
-        try:
-            self.contract_id = self.get_property_version_full_detail(property_id, version, 'contractId')
-        except:
-            self.contract_id = self.get_property_version_full_detail(property_id, version)['contractId'][4:]
-        try:
-            self.group_id = self.get_property_version_full_detail(property_id, version, 'groupId')
-        except:
-            self.group_id = self.get_property_version_full_detail(property_id, version)['groupId'][4:]
+        # contract and group are usually known from the listing which found the property
+        if version_cache.placement(property_id) is None:
+            self._version_detail(property_id, version)
+        self.contract_id, self.group_id = version_cache.placement(property_id) or (None, None)
 
         self.logger.debug(f'{self.contract_id=} {self.group_id=}')
 
@@ -416,17 +504,14 @@ class Papi(AkamaiSession):
         resp = self.session.get(url, headers=self.headers, params=params)
 
         if resp.status_code == 200:
-            # tags we are not interested to compare
             self.property_name = resp.json()['propertyName']
-            ignore_keys = ['etag', 'errors', 'warnings', 'ruleFormat', 'comments',
-                           'accountId', 'contractId', 'groupId',
-                           'propertyId', 'propertyName', 'propertyVersion']
+            ignore_keys = RULETREE_IGNORE_KEYS
             if remove_tags is not None:
                 addl_keys = [tag for tag in remove_tags]
                 if addl_keys is not None:
                     ignore_keys = ignore_keys + addl_keys
             self.logger.debug(f'{ignore_keys}')
-            mod_resp = remap(resp.json(), lambda p, k, v: k not in ignore_keys)
+            mod_resp = jsonio.drop_keys(resp.json(), ignore_keys)
             self.logger.debug(params)
             self.logger.debug(resp.status_code)
             self.logger.debug(mod_resp)
@@ -513,5 +598,131 @@ class Papi(AkamaiSession):
             return resp.status_code, resp.json()
 
 
+class AsyncPapi(AsyncAkamaiSession):
+    '''
+    async variants of the hot PAPI calls used when collecting a whole account
+    '''
+    def __init__(self, account_switch_key: str | None = None, section: str | None = None,
+                 max_in_flight: int | None = None,
+                 logger: logging.Logger = None):
+        super().__init__(account_switch_key=account_switch_key, section=section, max_in_flight=max_in_flight)
+        self.MODULE = f'{self.base_url}/papi/v1'
+        self.headers = {'PAPI-Use-Prefixes': 'false',
+                        'Accept': 'application/json',
+                        'Content-Type': 'application/json'}
+        self.logger = logger
+
+    async def get_property_hostnames(self, property_id: int) -> list:
+        url = f'{self.MODULE}/properties/{property_id}/hostnames'
+        resp = await self.get(url, params=self.params, headers=self.headers)
+        self.logger.debug(f'Collecting hostname for a property {resp.url.path:<30} {resp.status_code}')
+        if resp.status_code == 200:
+            return resp.json()['hostnames']['items']
+        else:
+            return resp.json()
+
+    async def get_property_version_detail(self, property_id: int, version: int) -> tuple:
+        detail = version_cache.version(property_id, version)
+        if detail is not None:
+            return 200, detail
+        url = f'{self.MODULE}/properties/{property_id}/versions/{version}'
+        resp = await self.get(url, params=self.params)
+        self.logger.debug(f'Collecting properties version detail {resp.url.path:<30} {resp.status_code}')
+        if resp.status_code == 200:
+            version_cache.remember_version(property_id, version, resp.json())
+        return resp.status_code, resp.json()
+
+    async def get_property_versions(self, property_id: int) -> tuple:
+        url = f'{self.MODULE}/properties/{property_id}/versions'
+        resp = await self.get(url, params=self.params, headers=self.headers)
+        self.logger.debug(f'Collecting property versions {resp.url.path:<30} {resp.status_code}')
+        if resp.status_code == 200:
+            return 200, version_cache.remember_property(resp.json())['versions']['items']
+        else:
+            return resp.status_code, resp.json()
+
+    async def get_property_version_hostnames(self, property_id: int, version: int) -> tuple:
+        url = f'{self.MODULE}/properties/{property_id}/versions/{version}/hostnames'
+        resp = await self.get(url, params=self.params, headers=self.headers)
+        self.logger.debug(f'Collecting hostname for a property version {resp.url.path:<30} {resp.status_code}')
+        if resp.status_code == 200:
+            return 200, resp.json()['hostnames']['items']
+        else:
+            return resp.status_code, resp.json()
+
+    async def property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None) -> tuple:
+        if version_cache.placement(property_id) is None:
+            status, detail = await self.get_property_version_detail(property_id, version)
+            if status != 200:
+                return status, detail
+        contract_id, group_id = version_cache.placement(property_id)
+
+        url = f'{self.MODULE}/properties/{property_id}/versions/{version}/rules'
+        params = {**self.params,
+                  'contractId': contract_id,
+                  'groupId': group_id,
+                  'validateRules': 'true',
+                  'validateMode': 'full',
+                 }
+        resp = await self.get(url, params=params, headers=self.headers)
+        if resp.status_code == 200:
+            ignore_keys = RULETREE_IGNORE_KEYS + (remove_tags if remove_tags else [])
+            return 200, jsonio.drop_keys(resp.json(), ignore_keys)
+        else:
+            self.logger.error(f'{resp.status_code} {property_id=} {version=} {resp.url}')
+            return resp.status_code, resp.json()
+
+    async def bulk_activate_properties(self, activations: list, emails: list,
+                                       contract_id: str | None = None, group_id: int | None = None) -> tuple:
+        url = f'{self.MODULE}/bulk/activations'
+        params = {**self.params, **{k: v for k, v in {'contractId': contract_id, 'groupId': group_id}.items() if v}}
+        resp = await self.post(url, json=Papi.bulk_activation_payload(activations, emails), params=params, headers=self.headers)
+        self.logger.debug(f'Submitting bulk activation {resp.url.path:<30} {resp.status_code} {len(activations)} versions')
+        if resp.status_code in [200, 201, 202]:
+            return 202, Papi.bulk_activation_id(resp.json()['bulkActivationLink'])
+        else:
+            return resp.status_code, resp.json()
+
+    async def get_bulk_activation(self, bulk_activation_id: int) -> tuple:
+        url = f'{self.MODULE}/bulk/activations/{bulk_activation_id}'
+        resp = await self.get(url, params=self.params, headers=self.headers)
+        self.logger.debug(f'Polling bulk activation {resp.url.path:<30} {resp.status_code}')
+        return resp.status_code, resp.json()
+
+    async def get_activations(self, property_id: int, activation_id: int | str | None = None) -> tuple:
+        '''
+        One activation, or every activation of the property when activation_id is None,
+        returns (status, items or error, seconds the server suggests to wait before polling again or None)
+        '''
+        url = f'{self.MODULE}/properties/{property_id}/activations'
+        url = f'{url}/{activation_id}' if activation_id else url
+        resp = await self.get(url, params=self.params, headers=self.headers)
+        self.logger.debug(f'Polling activations {resp.url.path:<30} {resp.status_code}')
+        retry_after = resp.headers.get('Retry-After', '')
+        retry_after = float(retry_after) if retry_after.isdigit() else None
+        if resp.status_code == 200:
+            return 200, resp.json()['activations']['items'], retry_after
+        else:
+            return resp.status_code, resp.json(), retry_after
+
+
+def activation_batches(activations: list, size: int = BULK_ACTIVATION_SIZE) -> list[list]:
+    '''
+    Split {propertyId, propertyVersion, network, note} into bulk activation requests of at most size,
+    a property appears once per request so its staging and production activations go in different ones
+    '''
+    batches, members = [], []
+    for activation in activations:
+        property_id = version_cache.property_key(activation['propertyId'])
+        batch = next((i for i, x in enumerate(batches) if len(x) < size and property_id not in members[i]), None)
+        if batch is None:
+            batches.append([])
+            members.append(set())
+            batch = len(batches) - 1
+        batches[batch].append(activation)
+        members[batch].add(property_id)
+    return batches
+
+
 if __name__ == '__main__':
     pass
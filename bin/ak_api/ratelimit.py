@@ -0,0 +1,285 @@
+'''
+Adaptive token bucket shared by every API call, one bucket per API family (papi, appsec, identity-management ...)
+
+--rate-limit sets a ceiling from the first request. Without it a family is paced from the first
+X-RateLimit-Limit it sends, its budget per LIMIT_WINDOW, so the first burst is shaped before it spends
+the budget. A family that sends no such header goes out unpaced until the API pushes back.
+A 429 or a WAF IPBLOCK response halves the rate (the one measured over the last WINDOW seconds when
+there was no ceiling) and pauses the family, queued requests then resume instead of the CLI exiting.
+Successful responses slowly raise the rate back to the ceiling.
+
+X-RateLimit-Limit/X-RateLimit-Remaining headers are read on every response. How fast the remaining
+budget went down over the last WINDOW seconds, refills included, gives a forecast of when the family
+runs out. When that is less than HEADROOM seconds away the rate is lowered in proportion, before the API
+answers with 429 or the WAF blocks the IP. headroom() exposes the figures per family.
+'''
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlparse
+
+from tabulate import tabulate
+
+
+logger = logging.getLogger(__name__)
+
+RATE = None           # requests per second per API family, None paces only once throttled
+BURST = 20            # requests allowed back to back before pacing starts
+MIN_RATE = 0.5
+MAX_THROTTLED = 3     # times one request is replayed after being throttled
+THROTTLE_PAUSE = 5    # seconds to pause on a 429 without Retry-After
+IPBLOCK_PAUSE = 540   # WAF deny rule IPBLOCK-BURST blocks the client IP for several minutes
+WINDOW = 60           # seconds of history used to measure request rate and budget drain
+MIN_SPAN = 5          # seconds of remaining-budget samples needed before forecasting
+HEADROOM = 60         # seconds of remaining budget below which the family is slowed down
+LIMIT_WINDOW = 60     # seconds X-RateLimit-Limit is a budget for
+
+_lock = threading.Lock()
+_buckets: dict[str, TokenBucket] = {}
+
+
+class TokenBucket:
+    def __init__(self, family: str, rate: float | None, burst: int):
+        self.family = family
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.limit = None
+        self.remaining = None
+        self.sent = deque()
+        self.samples = deque()  # (monotonic time, X-RateLimit-Remaining)
+        self.low = False
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        '''
+        Take one token and return how long the caller has to wait before sending
+        '''
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate is not None:
+                self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+                self.updated = max(self.updated, now)
+                self.tokens -= 1
+                # requests queued behind a pause are spaced out after it, not released together
+                wait += -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.sent.append(now + wait)
+            while self.sent and self.sent[0] < now - WINDOW:
+                self.sent.popleft()
+            return wait
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttle(self, pause: float) -> bool:
+        '''
+        Back off after the API pushed back, return True when this call started a new pause
+        '''
+        self.pace()
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = 0.0
+            started = self.paused_until <= now
+            self.paused_until = max(self.paused_until, now + pause)
+            self.updated = self.paused_until  # no tokens accrue while paused, resume slowly
+            return started
+
+    def pace(self) -> None:
+        '''
+        Start pacing an unlimited bucket at the rate it was sending at
+        '''
+        if self.rate is None:
+            measured = max(MIN_RATE, self.request_rate())
+            with self._lock:
+                if self.rate is None:
+                    self.max_rate = self.rate = measured
+                    self.tokens = 0.0
+                    self.updated = time.monotonic()
+
+    def seed(self) -> None:
+        '''
+        Pace an unlimited bucket at the budget the API advertises, no more back to back than what is left of it
+        '''
+        with self._lock:
+            if self.rate is None and self.limit:
+                self.max_rate = self.rate = max(MIN_RATE, self.limit / LIMIT_WINDOW)
+                self.tokens = float(min(self.burst, self.remaining))
+                self.updated = time.monotonic()
+
+    def recover(self) -> None:
+        if self.rate is not None and self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def request_rate(self) -> float:
+        '''
+        Requests per second sent over the last WINDOW seconds
+        '''
+        now = time.monotonic()
+        with self._lock:
+            sent = [x for x in self.sent if now - WINDOW <= x <= now]
+        if len(sent) < 2:
+            return 0.0
+        return len(sent) / max(1.0, now - sent[0])
+
+    def drain_rate(self) -> float | None:
+        '''
+        Remaining budget lost per second over the last WINDOW seconds, None until MIN_SPAN seconds were observed
+        '''
+        with self._lock:
+            samples = list(self.samples)
+        if len(samples) < 2 or samples[-1][0] - samples[0][0] < MIN_SPAN:
+            return None
+        (start, first), (end, last) = samples[0], samples[-1]
+        return max(0.0, (first - last) / (end - start))
+
+    def forecast(self) -> float | None:
+        '''
+        Seconds before the remaining budget is spent at the current pace, None when unknown or not draining
+        '''
+        drain = self.drain_rate()
+        if not drain:
+            return None
+        return self.remaining / drain
+
+    def observe(self, headers) -> None:
+        remaining = header_int(headers, 'X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self.samples and remaining > self.samples[-1][1]:
+                self.samples.clear()  # the budget window was reset
+            self.samples.append((now, remaining))
+            while self.samples[0][0] < now - WINDOW:
+                self.samples.popleft()
+            self.remaining = remaining
+            self.limit = header_int(headers, 'X-RateLimit-Limit') or self.limit
+        if self.rate is None:
+            self.seed()
+        eta = self.forecast()
+        low = eta is not None and eta < HEADROOM
+        if low:
+            # the measured rate scaled down so the budget lasts HEADROOM seconds
+            target = self.request_rate() * eta / HEADROOM
+            self.pace()
+            with self._lock:
+                self.rate = max(MIN_RATE, min(self.rate, target))
+        if low and not self.low:
+            logger.warning(f'{self.family} has {remaining}/{self.limit} requests left, about {eta:.0f}s at the current rate, '
+                           f'slowing down to {self.rate:.1f} requests/sec')
+        self.low = low
+
+
+def configure(rate: float | None = None, burst: int | None = None) -> None:
+    global RATE, BURST
+    if rate:
+        RATE = float(rate)
+    if burst:
+        BURST = int(burst)
+    with _lock:
+        _buckets.clear()
+
+
+def api_family(url: str) -> str:
+    path = urlparse(str(url)).path.strip('/')
+    return path.split('/')[0] if path else ''
+
+
+def bucket_for(url: str) -> TokenBucket:
+    family = api_family(url)
+    with _lock:
+        if family not in _buckets:
+            _buckets[family] = TokenBucket(family, RATE, BURST)
+        return _buckets[family]
+
+
+def header_int(headers, name: str) -> int | None:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def headroom() -> list[dict]:
+    '''
+    Rate-limit budget per API family that sent X-RateLimit headers
+    '''
+    with _lock:
+        buckets = list(_buckets.values())
+    rows = []
+    for bucket in buckets:
+        if bucket.remaining is None:
+            continue
+        eta = bucket.forecast()
+        rows.append({'family': bucket.family,
+                     'limit': bucket.limit,
+                     'remaining': bucket.remaining,
+                     'req/s': round(bucket.request_rate(), 1),
+                     'paced_at': round(bucket.rate, 1) if bucket.rate is not None else '',
+                     'exhausted_in_s': round(eta) if eta is not None else ''})
+    return sorted(rows, key=lambda x: x['remaining'])
+
+
+def print_headroom() -> None:
+    rows = headroom()
+    if rows:
+        print()
+        print(tabulate(rows, headers='keys', tablefmt='simple', numalign='right', showindex=False))
+
+
+def retry_after(headers) -> float | None:
+    value = headers.get('Retry-After')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+            return max(0.0, date.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass  # unreadable, the caller falls back to its default backoff
+    # PAPI sends the ISO time the next request is allowed on a 429
+    value = headers.get('X-RateLimit-Next')
+    if value:
+        try:
+            date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return max(0.0, date.timestamp() - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def throttled(status_code: int, headers, text: str) -> float | None:
+    '''
+    Return how long to pause when the response says we are going too fast, otherwise None
+    '''
+    if status_code in [403, 429] and 'IPBLOCK' in text:
+        return IPBLOCK_PAUSE
+    if status_code == 429:
+        pause = retry_after(headers)
+        return pause if pause is not None else THROTTLE_PAUSE
+    return None
+
+
+if __name__ == '__main__':
+    pass
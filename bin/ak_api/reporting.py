@@ -4,7 +4,7 @@ import html
 import logging
 import sys
 
-from akamai_api.edge_auth import AkamaiSession
+from ak_api.edge_auth import AkamaiSession
 from bs4 import BeautifulSoup
 from rich import print_json
 from utils import _logging as lg
@@ -36,9 +36,9 @@ class Reporting(AkamaiSession):
         if resp.status_code == 200:
             return resp.json()
         elif 'WAF deny rule IPBLOCK' in resp.json()['detail']:
+            # the session already paused and replayed the request, still blocked
             self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
+            return resp.json()
         else:
             self.logger.error(print_json(data=resp.json()))
             return resp.json()
@@ -64,10 +64,9 @@ class Reporting(AkamaiSession):
             files.write_json('output/reporting_trace.json', resp.json())
             return resp.json()['data']
         elif 'WAF deny rule IPBLOCK' in resp.json()['detail']:
+            # the session already paused and replayed the request, still blocked
             self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
-
+            return resp.json()
         else:
             self.logger.error(print_json(data=resp.json()))
             return resp.json()
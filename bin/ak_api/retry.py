@@ -0,0 +1,106 @@
+'''
+Retry policy for transient API failures: 5xx, gateway timeouts and dropped connections
+
+Only idempotent calls are replayed after the server may have acted on them. POST is retried
+when the server says it did not process the request (503 with Retry-After) or the connection
+never opened. Backoff is exponential with full jitter and never shorter than Retry-After.
+Each endpoint has a retry budget so a failing endpoint cannot double the load at high concurrency.
+'''
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+from urllib.parse import urlparse
+
+from ak_api import ratelimit
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5     # seconds, doubled on every attempt
+BACKOFF_CAP = 30
+RETRY_STATUS = [500, 502, 503, 504]
+IDEMPOTENT_METHODS = ['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']
+# POST endpoints that only read data
+IDEMPOTENT_POSTS = [r'/papi/v1/search/find-by-value$',
+                    r'/papi/v1/bulk/rules-search-requests',
+                    r'/reporting-api/v1/reports/.+/report-data$']
+BUDGET_RATIO = 0.2     # every request earns 0.2 retries for its endpoint
+BUDGET_MIN = 10        # retries available before any request succeeded
+BUDGET_MAX = 100
+
+_lock = threading.Lock()
+_budgets: dict[str, RetryBudget] = {}
+
+
+class RetryBudget:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.tokens = float(BUDGET_MIN)
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(BUDGET_MAX, self.tokens + BUDGET_RATIO)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.exhausted = False
+                return True
+            if not self.exhausted:
+                self.exhausted = True
+                logger.warning(f'retry budget exhausted for {self.endpoint}, failing fast')
+            return False
+
+
+class RetryPolicy:
+    def __init__(self, method: str, url: str, endpoint: str):
+        path = urlparse(str(url)).path
+        self.method = method.upper()
+        self.endpoint = endpoint
+        self.idempotent = self.method in IDEMPOTENT_METHODS or any(re.search(x, path) for x in IDEMPOTENT_POSTS)
+        self.budget = budget_for(endpoint)
+        self.budget.deposit()
+        self.attempt = 0
+
+    def delay(self, status_code: int, headers) -> float | None:
+        '''
+        Seconds to wait before sending the request again, None when the response should go back to the caller
+        '''
+        if status_code not in RETRY_STATUS:
+            return None
+        if not self.idempotent and not (status_code == 503 and 'Retry-After' in headers):
+            return None
+        return self._next(ratelimit.retry_after(headers))
+
+    def delay_error(self, connect_failed: bool) -> float | None:
+        '''
+        Same as delay() for a request that raised, connect_failed means nothing reached the server
+        '''
+        if not self.idempotent and not connect_failed:
+            return None
+        return self._next(None)
+
+    def _next(self, retry_after: float | None) -> float | None:
+        if self.attempt >= MAX_RETRIES or not self.budget.withdraw():
+            return None
+        backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** self.attempt))
+        self.attempt += 1
+        return max(backoff, retry_after or 0)
+
+
+def budget_for(endpoint: str) -> RetryBudget:
+    with _lock:
+        if endpoint not in _budgets:
+            _budgets[endpoint] = RetryBudget(endpoint)
+        return _budgets[endpoint]
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,165 @@
+'''
+One in-flight budget for every API call of the run, whatever the API family or the caller
+
+A request takes a slot while it is on the wire. When all slots are busy, waiting requests are
+served by priority: small interactive lookups (groups, contracts, account switch keys, cpcode names)
+before ordinary calls, bulk downloads (ruletrees, appsec exports, reports) last.
+
+Threads and asyncio tasks share the same budget. pandarallel workers forked from the CLI also
+share it through a process-shared semaphore, priorities apply within each process.
+'''
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import multiprocessing
+import re
+import threading
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+LIMIT = 10
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITIES = [(INTERACTIVE, [r'^/papi/v1/(groups|contracts|products)$',
+                             r'^/papi/v1/search/',
+                             r'^/identity-management/',
+                             r'^/cprg/v1/cpcodes/\d+$',
+                             r'^/appsec/v1/configs(/\d+)?$']),
+              (BULK, [r'/versions/\d+/rules$',
+                      r'^/appsec/v1/export/',
+                      r'/report-data$',
+                      r'^/papi/v1/bulk/'])]
+
+
+class Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.cancelled = False
+        self.granted = False
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Scheduler:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, int, Waiter]] = []
+        self._order = itertools.count()
+        self._shared = multiprocessing.BoundedSemaphore(limit)
+
+    def _enqueue(self, priority: int, waiter: Waiter) -> bool:
+        '''
+        Take a slot right away when one is free, otherwise queue the waiter, return True when granted
+        '''
+        with self._lock:
+            if self.in_flight < self.limit and not self._queue:
+                self.in_flight += 1
+                return True
+            heapq.heappush(self._queue, (priority, next(self._order), waiter))
+            return False
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if not waiter.cancelled:
+                    waiter.grant()  # the slot goes to the waiter, in_flight is unchanged
+                    return
+            self.in_flight -= 1
+
+    @contextmanager
+    def slot(self, priority: int = NORMAL):
+        waiter = Waiter()
+        if not self._enqueue(priority, waiter):
+            waiter.event.wait()
+        try:
+            self._shared.acquire()
+        except BaseException:
+            self._release()
+            raise
+        try:
+            yield
+        finally:
+            self._shared.release()
+            self._release()
+
+    @asynccontextmanager
+    async def slot_async(self, priority: int = NORMAL):
+        waiter = Waiter(asyncio.get_running_loop())
+        if not self._enqueue(priority, waiter):
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    waiter.cancelled = True
+                    granted = waiter.granted
+                if granted:
+                    self._release()
+                raise
+        # another process may hold the shared slots, poll instead of blocking the event loop
+        try:
+            while not self._shared.acquire(block=False):
+                await asyncio.sleep(0.01)
+        except BaseException:
+            self._release()  # cancelled while polling, the slot of this process goes to the next waiter
+            raise
+        try:
+            yield
+        finally:
+            self._shared.release()
+            self._release()
+
+
+def priority_for(url: str) -> int:
+    path = urlparse(str(url)).path
+    for priority, patterns in PRIORITIES:
+        if any(re.search(x, path) for x in patterns):
+            return priority
+    return NORMAL
+
+
+_scheduler = Scheduler(LIMIT)
+
+
+def configure(limit: int | None = None) -> None:
+    '''
+    Set the global in-flight limit, call before any request or worker process is started
+    '''
+    global LIMIT, _scheduler
+    if limit:
+        LIMIT = int(limit)
+        _scheduler = Scheduler(LIMIT)
+        logger.debug(f'API in-flight limit {LIMIT}')
+
+
+def slot(url: str):
+    return _scheduler.slot(priority_for(url))
+
+
+def slot_async(url: str):
+    return _scheduler.slot_async(priority_for(url))
+
+
+if __name__ == '__main__':
+    pass
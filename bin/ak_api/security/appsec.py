@@ -4,12 +4,13 @@ from __future__ import annotations
 
 import logging
 import sys
+from collections.abc import Iterator
 
 from ak_api.edge_auth import AkamaiSession
-from boltons.iterutils import remap
 from rich import print_json
 from utils import _logging as lg
 from utils import files
+from utils import jsonio
 
 
 class Appsec(AkamaiSession):
@@ -34,6 +35,10 @@ class Appsec(AkamaiSession):
         # print_json(data=response.json())
         return response.status_code, response.json()['configurations']
 
+    def iter_waf_configs(self) -> Iterator[dict]:
+        url = self.form_url(f'{self.MODULE}/configs?includeHostnames=true&includeContractGroup=true')
+        return self.iter_records(url, 'configurations.item', headers=self.headers)
+
     def get_config_detail(self, config_id: int):
         url = self.form_url(f'{self.MODULE}/configs/{config_id}')
         response = self.session.get(url, headers=self.headers)
@@ -53,7 +58,7 @@ class Appsec(AkamaiSession):
         self.logger.debug(f'{ignore_keys}')
 
         if resp.status_code == 200:
-            mod_resp = remap(resp.json(), lambda p, k, v: k not in ignore_keys)
+            mod_resp = jsonio.drop_keys(resp.json(), ignore_keys)
             return 200, mod_resp
         else:
             return resp.status_code, resp.json()
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import sys
+from collections.abc import Iterator
 
 from ak_api.edge_auth import AkamaiSession
 from boltons.iterutils import remap
@@ -30,6 +31,10 @@ class NetworkList(AkamaiSession):
         response = self.session.get(url, headers=self.headers)
         return response.status_code, response.json()
 
+    def iter_network_lists(self) -> Iterator[dict]:
+        url = self.form_url(f'{self.MODULE}/network-lists')
+        return self.iter_records(url, 'networkLists.item', headers=self.headers)
+
     def get_network_list(self, id: str):
         url = self.form_url(f'{self.MODULE}/network-lists/{id}')
         response = self.session.get(url, headers=self.headers)
@@ -0,0 +1,95 @@
+'''
+Coalesce identical GET requests that are in flight at the same time
+
+The first caller for a key sends the request, callers arriving before it finishes wait and
+receive the same response object. Works for threads (do) and asyncio tasks (do_async).
+Processes do not share flights, pandarallel workers rely on the response cache instead.
+
+The shared response parses its body once, callers must treat resp.json() as read-only.
+'''
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any
+from typing import Callable
+
+from utils import jsonio
+
+
+class ParsedOnce:
+    '''
+    Mixin for response classes, json() is decoded on first use and reused afterwards
+    '''
+    def json(self, **kwargs):
+        if '_parsed' not in self.__dict__:
+            self._parsed = jsonio.loads(self.content) if not kwargs else super().json(**kwargs)
+        return self._parsed
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, Flight] = {}
+        self._futures: dict[tuple[int, str], asyncio.Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def do_async(self, key: str, fn: Callable[[], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        future = self._futures.get(loop_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._futures[loop_key] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            future.exception()  # retrieved, no warning when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._futures[loop_key]
+        return result
+
+
+flights = SingleFlight()
+
+
+if __name__ == '__main__':
+    pass
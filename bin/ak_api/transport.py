@@ -0,0 +1,455 @@
+'''
+Process-wide HTTP transport shared by every AkamaiSession subclass.
+
+Sessions are keyed by (edgerc section, host) so Papi, Appsec, CpCode, IAM ... running
+against the same credentials reuse one connection pool instead of opening their own.
+'''
+from __future__ import annotations
+
+import io
+import logging
+import os
+import re
+import socket
+import ssl
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlparse
+
+import certifi
+import httpx
+import requests
+from ak_api import audit
+from ak_api import cache
+from ak_api import cassette
+from ak_api import circuit
+from ak_api import edge_auth
+from ak_api import metrics
+from ak_api import ratelimit
+from ak_api import retry
+from ak_api import scheduler
+from ak_api import singleflight
+from akamai.edgegrid import EdgeRc
+from requests.adapters import BaseAdapter
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from requests.utils import select_proxy
+from utils import _logging as lg
+from utils import jsonio
+
+
+logger = logging.getLogger(__name__)
+logging.getLogger('httpx').setLevel(logging.WARNING)  # httpx logs every request at INFO
+
+POOL_CONNECTIONS = 4  # number of distinct hosts kept in the pool manager
+POOL_MAXSIZE = 64     # keep-alive connections per host, urllib3 default is 10
+POOL_BLOCK = True     # wait for a free connection rather than open a throwaway one
+KEEP_ALIVE = True
+HTTP2 = False         # multiplex requests over HTTP/2 with httpx instead of one HTTP/1.1 connection per request
+TIMEOUT = (10, 120)   # connect, read, without it a stalled connection hangs the CLI and is never retried
+BASE_URL = None       # send every API call to this URL instead of the edgerc host, ie. the ak_mock server
+
+_lock = threading.Lock()
+_edgercs: dict[str, EdgeRc] = {}
+_sessions: dict[tuple[str, str], requests.Session] = {}
+
+
+class PooledAdapter(HTTPAdapter):
+    __attrs__ = HTTPAdapter.__attrs__ + ['keep_alive']  # survive pickling into worker processes
+
+    def __init__(self, keep_alive: bool = True, **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keep_alive:
+            # keep idle pooled connections from being dropped by NAT/firewalls between calls
+            options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+                       (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60))
+            kwargs['socket_options'] = options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class Http2Adapter(BaseAdapter):
+    '''
+    Send requests prepared and EdgeGrid signed by requests over an HTTP/2 httpx.Client,
+    concurrent requests are multiplexed as streams on a few connections.
+    verify, cert and proxies are honoured as HTTPAdapter does, one client per combination
+    '''
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE):
+        super().__init__()
+        self.pool_maxsize = pool_maxsize
+        self._clients: dict[tuple, httpx.Client] = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'pool_maxsize': self.pool_maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def client(self, verify: bool | str = True, cert: str | tuple | None = None, proxy: str | None = None) -> httpx.Client:
+        key = (verify, cert, proxy)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._clients = {}  # a forked worker does not share the parent's connections
+                self._pid = os.getpid()
+            if key not in self._clients:
+                limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+                # requests already merged the environment into verify and proxies
+                adapter = httpx.HTTPTransport(http2=True, limits=limits, verify=self.ssl_context(verify, cert),
+                                              proxy=httpx.Proxy(proxy) if proxy else None)
+                self._clients[key] = httpx.Client(transport=adapter, trust_env=False)
+            return self._clients[key]
+
+    @staticmethod
+    def ssl_context(verify: bool | str, cert: str | tuple | None) -> ssl.SSLContext:
+        '''
+        verify and cert as requests takes them: a CA bundle file or directory, and a client cert with its key
+        '''
+        if isinstance(verify, str):
+            ctx = ssl.create_default_context(**{'capath' if os.path.isdir(verify) else 'cafile': verify})
+        else:
+            ctx = ssl.create_default_context(cafile=certifi.where())
+            if not verify:
+                ctx.check_hostname = False
+                ctx.verify_mode = ssl.CERT_NONE
+        if cert:
+            ctx.load_cert_chain(*([cert] if isinstance(cert, str) else cert))
+        return ctx
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        client = self.client(verify, tuple(cert) if isinstance(cert, list) else cert, select_proxy(request.url, proxies))
+        req = client.build_request(request.method, request.url, content=request.body,
+                                   headers=dict(request.headers), timeout=timeout)
+        try:
+            r = client.send(req, stream=True)
+        except httpx.ConnectTimeout as err:
+            raise requests.ConnectTimeout(err, request=request)
+        except httpx.TimeoutException as err:
+            raise requests.ReadTimeout(err, request=request)
+        except httpx.TransportError as err:
+            raise requests.ConnectionError(err, request=request)
+
+        resp = requests.Response()
+        resp.status_code = r.status_code
+        resp.headers = CaseInsensitiveDict(r.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.reason = r.reason_phrase
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        if stream:
+            resp.raw = Http2Body(r)
+        else:
+            resp._content = r.read()
+            resp._content_consumed = True
+            r.close()
+        return resp
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+class Http2Body:
+    '''
+    File-like body of a streamed HTTP/2 response, what requests and ijson expect in resp.raw
+    '''
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.chunks = response.iter_bytes()
+        self.buffer = b''
+
+    def read(self, amt: int | None = None) -> bytes:
+        while amt is None or len(self.buffer) < amt:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if amt is None:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:amt], self.buffer[amt:]
+        return data
+
+    def close(self):
+        self.response.close()
+
+    def release_conn(self):
+        self.response.close()
+
+
+class CachingBody:
+    '''
+    resp.raw of a streamed response that is cached, the caller parses the body as it arrives and
+    the bytes it read are stored once it reaches the end, a body read part way is not stored
+    '''
+    def __init__(self, raw, store: Callable[[bytes], None]):
+        self.raw = raw
+        self.decode_content = True  # no readinto() or other passthrough, every byte goes through read()
+        if hasattr(raw, 'decode_content'):
+            raw.decode_content = True  # the cache keeps the decoded body
+        self.store = store
+        self.chunks = []
+        self.stored = False
+
+    def read(self, amt: int | None = None) -> bytes:
+        data = self.raw.read(amt)
+        if data:
+            self.chunks.append(data)
+        elif not self.stored and amt != 0:
+            self.stored = True
+            self.store(b''.join(self.chunks))
+            self.chunks = []
+        return data
+
+    def close(self):
+        self.raw.close()
+
+    def release_conn(self):
+        if hasattr(self.raw, 'release_conn'):
+            self.raw.release_conn()
+
+
+class AkamaiTransport(requests.Session):
+    '''
+    requests.Session used by every AkamaiSession, all API calls go through request()
+    '''
+    def request(self, method, url, *args, **kwargs):
+        if not audit.ENABLED:
+            return self.dispatch(method, url, *args, **kwargs)
+        start = time.perf_counter()
+        resp = self.dispatch(method, url, *args, **kwargs)
+        audit.record(method, url, kwargs, kwargs.get('headers') or {}, resp.status_code, resp.headers, time.perf_counter() - start)
+        return resp
+
+    def dispatch(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET':
+            return shared(self.send_with_retry(method, url, *args, **kwargs))
+
+        full_url = requests.Request(method, url, params=kwargs.get('params')).prepare().url
+        key = cache.cache_key(method, full_url, {**self.headers, **(kwargs.get('headers') or {})})
+        if kwargs.get('stream'):
+            # a streamed body is read once by its caller so it is not shared, a cached listing is stored as it is read
+            return self.cached_get(key, full_url, method, url, *args, **kwargs)
+        # concurrent threads asking for the same resource share one round trip
+        return singleflight.flights.do(key, lambda: self.cached_get(key, full_url, method, url, *args, **kwargs))
+
+    def cached_get(self, key, full_url, method, url, *args, **kwargs):
+        rule = cache.policy(method, url)
+        if rule is None:
+            return shared(self.send_with_retry(method, url, *args, **kwargs))
+
+        entry = cache.lookup(key, rule == 'immutable')
+        if entry and entry.fresh:
+            metrics.record(method, endpoint_template(url), entry.status, 0.0, len(entry.body), cache_hit=True)
+            return cached_response(entry, full_url)
+        if entry and entry.etag:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': entry.etag}
+
+        resp = self.send_with_retry(method, url, *args, **kwargs)
+        if entry and resp.status_code == 304:
+            resp.close()
+            cache.touch(key)
+            return cached_response(entry, full_url)
+        if resp.status_code == 200:
+            if kwargs.get('stream') and not resp._content_consumed:
+                resp.raw = CachingBody(resp.raw, lambda body: cache.store(key, full_url, 200, resp.headers, body, rule == 'immutable'))
+            else:
+                cache.store(key, full_url, resp.status_code, resp.headers, resp.content, rule == 'immutable')
+        return shared(resp)
+
+    def send_with_retry(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', TIMEOUT)
+        bucket = ratelimit.bucket_for(url)
+        policy = retry.RetryPolicy(method, url, endpoint_template(url))
+        breaker = circuit.breaker_for(method, policy.endpoint)
+        if not breaker.allow():
+            metrics.record(method, policy.endpoint, circuit.OPEN, 0.0, 0)
+            return circuit_open_response(breaker, url)
+        throttled = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                bucket.acquire()
+                try:
+                    with scheduler.slot(url):
+                        resp = super().request(method, url, *args, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as err:
+                    delay = policy.delay_error(connect_failed=isinstance(err, requests.ConnectTimeout))
+                    if delay is None:
+                        breaker.failure()
+                        metrics.record(method, policy.endpoint, type(err).__name__, time.perf_counter() - start, 0, policy.attempt + throttled)
+                        raise
+                    logger.warning(f'{method} {policy.endpoint} {type(err).__name__}, retry {policy.attempt} in {delay:.1f}s')
+                    time.sleep(delay)
+                    continue
+
+                pause = ratelimit.throttled(resp.status_code, resp.headers, resp.text if resp.status_code in [403, 429] else '')
+                if pause is not None:
+                    if throttled >= ratelimit.MAX_THROTTLED:
+                        break
+                    throttled += 1
+                    throttle(bucket, pause)
+                    continue
+
+                bucket.recover()
+                bucket.observe(resp.headers)
+                delay = policy.delay(resp.status_code, resp.headers)
+                if delay is None:
+                    break
+                logger.warning(f'{method} {policy.endpoint} {resp.status_code}, retry {policy.attempt} in {delay:.1f}s')
+                resp.close()
+                time.sleep(delay)
+        except BaseException:
+            breaker.abort()
+            raise
+
+        breaker.record(resp.status_code)
+        size = int(resp.headers.get('Content-Length', 0)) if kwargs.get('stream') else len(resp.content)
+        metrics.record(method, policy.endpoint, resp.status_code, time.perf_counter() - start, size, policy.attempt + throttled)
+        return resp
+
+
+class SharedResponse(singleflight.ParsedOnce, requests.Response):
+    pass
+
+
+def shared(resp: requests.Response) -> SharedResponse:
+    resp.__class__ = SharedResponse
+    return resp
+
+
+def cached_response(entry: cache.Entry, url: str) -> SharedResponse:
+    resp = SharedResponse()
+    resp.status_code = entry.status
+    resp._content = entry.body
+    resp.raw = io.BytesIO(entry.body)
+    resp.headers = CaseInsensitiveDict({**entry.headers, cache.HIT_HEADER: 'HIT'})
+    resp.url = url
+    resp.encoding = 'utf-8'
+    resp.reason = 'OK'
+    return resp
+
+
+def circuit_open_response(breaker: circuit.CircuitBreaker, url: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 503
+    resp._content = jsonio.dumps(breaker.problem()).encode()
+    resp.raw = io.BytesIO(resp._content)
+    resp.headers = CaseInsensitiveDict({'Content-Type': 'application/problem+json', circuit.HEADER: circuit.OPEN})
+    resp.url = url
+    resp.encoding = 'utf-8'
+    resp.reason = 'Circuit Open'
+    return resp
+
+
+def throttle(bucket: ratelimit.TokenBucket, pause: float) -> None:
+    '''
+    Slow the API family down, the request that hit the limit is sent again once the pause is over
+    '''
+    if bucket.throttle(pause):
+        if pause >= 60:
+            lg.countdown(int(pause), msg=f'Oopsie! You just hit rate limit on {bucket.family}, requests resume after', logger=logger)
+        else:
+            logger.warning(f'rate limited on {bucket.family}, slowing down to {bucket.rate:.1f} requests/sec')
+
+
+def endpoint_template(url: str) -> str:
+    '''
+    /papi/v1/properties/prp_123/versions/4/rules -> /papi/v1/properties/{id}/versions/{v}/rules
+    '''
+    segments = urlparse(str(url)).path.rstrip('/').split('/')
+    template = []
+    for i, segment in enumerate(segments):
+        if i > 0 and segments[i - 1] == 'versions' and segment:
+            template.append('{v}')
+        elif re.search(r'\d', segment) and not re.fullmatch(r'v\d+', segment):
+            template.append('{id}')
+        else:
+            template.append(segment)
+    return '/'.join(template)
+
+
+def configure(pool_maxsize: int | None = None, keep_alive: bool | None = None, http2: bool | None = None,
+              base_url: str | None = None) -> None:
+    global POOL_MAXSIZE, KEEP_ALIVE, HTTP2, BASE_URL
+    if base_url:
+        BASE_URL = base_url.rstrip('/')
+        logger.warning(f'API calls go to {BASE_URL}')
+    if pool_maxsize:
+        POOL_MAXSIZE = int(pool_maxsize)
+    if keep_alive is not None:
+        KEEP_ALIVE = keep_alive
+    if http2 is not None:
+        HTTP2 = http2
+    with _lock:
+        for session in _sessions.values():
+            mount_adapter(session)
+
+
+def mount_adapter(session: requests.Session) -> None:
+    if cassette.replaying():
+        adapter = cassette.ReplayAdapter()
+    elif HTTP2:
+        adapter = Http2Adapter(pool_maxsize=POOL_MAXSIZE)
+    else:
+        adapter = PooledAdapter(keep_alive=KEEP_ALIVE,
+                                pool_connections=POOL_CONNECTIONS,
+                                pool_maxsize=POOL_MAXSIZE,
+                                pool_block=POOL_BLOCK,
+                                max_retries=0)
+    if cassette.recording():
+        adapter = cassette.RecordingAdapter(adapter)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if KEEP_ALIVE:
+        session.headers['Connection'] = 'keep-alive'
+    else:
+        session.headers['Connection'] = 'close'
+
+
+def load_edgerc(edgerc_file: str | None = None) -> EdgeRc:
+    filepath = edgerc_file if edgerc_file else f'{str(Path.home())}/.edgerc'
+    with _lock:
+        if filepath not in _edgercs:
+            _edgercs[filepath] = EdgeRc(filepath)
+            if (cassette.replaying() or BASE_URL) and not _edgercs[filepath].has_section('default'):
+                # replay and a local API server do not need real credentials
+                _edgercs[filepath].read_dict({'default': cassette.PLACEHOLDER_CREDENTIALS})
+        return _edgercs[filepath]
+
+
+def get_session(edgerc: EdgeRc, section: str, host: str) -> requests.Session:
+    key = (section, host)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = AkamaiTransport()
+            session.auth = edge_auth.EdgeGridSigner.from_edgerc(edgerc, section)
+            mount_adapter(session)
+            _sessions[key] = session
+            logger.debug(f'new transport for [{section}] {host} pool_maxsize={POOL_MAXSIZE} keep_alive={KEEP_ALIVE}')
+        return session
+
+
+def close_all() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+if __name__ == '__main__':
+    pass
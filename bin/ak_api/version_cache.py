@@ -0,0 +1,91 @@
+'''
+Property version metadata shared by every Papi and AsyncPapi caller of the run
+
+version detail   /papi/v1/properties/{id}/versions/{v} responses keyed by (propertyId, version),
+                 the productId, ruleFormat and updatedDate lookups and the ruletree calls share one request
+placement        contractId and groupId of a property, learned from any listing or search that returns them
+                 (properties per group, latest version, search, version detail) so a ruletree download
+                 needs no extra round trip to find them
+locked           versions seen activated on staging or production, they can no longer be edited
+                 and the response cache keeps their ruletree for good
+
+Entries live for the run only, ids are kept without prefix.
+'''
+from __future__ import annotations
+
+import threading
+
+
+_lock = threading.Lock()
+_versions: dict[tuple[int, int], dict] = {}
+_placements: dict[int, tuple[str, str]] = {}
+_locked: set[tuple[int, int]] = set()
+
+
+def unprefix(value) -> str:
+    value = str(value)
+    return value.split('_', 1)[1] if value[:4] in ['prp_', 'ctr_', 'grp_'] else value
+
+
+def property_key(property_id) -> int:
+    return int(unprefix(property_id))
+
+
+def version(property_id, version: int) -> dict | None:
+    with _lock:
+        return _versions.get((property_key(property_id), int(version)))
+
+
+def remember_version(property_id, version: int, detail: dict) -> None:
+    with _lock:
+        _versions[(property_key(property_id), int(version))] = detail
+    remember_property(detail)
+
+
+def placement(property_id) -> tuple[str, str] | None:
+    '''
+    (contractId, groupId) of the property without prefix, None until a response mentioned it
+    '''
+    with _lock:
+        return _placements.get(property_key(property_id))
+
+
+def remember_property(item: dict) -> dict:
+    if isinstance(item, dict) and all(item.get(x) for x in ['propertyId', 'contractId', 'groupId']):
+        with _lock:
+            _placements[property_key(item['propertyId'])] = (unprefix(item['contractId']), unprefix(item['groupId']))
+    if isinstance(item, dict) and item.get('propertyId'):
+        remember_locked(item)
+    return item
+
+
+def remember_locked(item: dict) -> None:
+    '''
+    stagingVersion and productionVersion of a property listing, and versions with an activation status
+    other than INACTIVE in a search result, a version listing or a version detail
+    '''
+    versions = [item.get('stagingVersion'), item.get('productionVersion')]
+    listed = item['versions'].get('items', []) if isinstance(item.get('versions'), dict) else []
+    versions.extend(x.get('propertyVersion') for x in [item, *listed] if activated(x))
+    with _lock:
+        _locked.update((property_key(item['propertyId']), int(x)) for x in versions if x)
+
+
+def activated(item: dict) -> bool:
+    return any(item.get(x) not in [None, 'INACTIVE'] for x in ['stagingStatus', 'productionStatus'])
+
+
+def locked(property_id, version: int) -> bool:
+    with _lock:
+        return (property_key(property_id), int(version)) in _locked
+
+
+def clear() -> None:
+    with _lock:
+        _versions.clear()
+        _placements.clear()
+        _locked.clear()
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,400 @@
+'''
+Synthetic Akamai account served by the ak_mock server
+
+The account is generated from a handful of parameters and a seed, the same parameters always
+produce the same account. Listings are built up front, ruletrees and security exports are
+generated when requested so a 10,000 property account starts in a second.
+'''
+from __future__ import annotations
+
+import hashlib
+import random
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+
+PREFIXED_KEYS = ['accountId', 'activationId', 'assetId', 'contractId', 'edgeHostnameId', 'groupId', 'parentGroupId', 'productId', 'propertyId']
+PRODUCTS = [('prd_Fresca', 'Ion Standard'), ('prd_SPM', 'Ion Premier'), ('prd_Site_Accel', 'DSA'),
+            ('prd_Download_Delivery', 'Download Delivery')]
+RULE_FORMATS = ['latest', 'v2023-01-05', 'v2023-05-30', 'v2023-10-30', 'v2024-01-09']
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def iso(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def unprefix(obj):
+    '''
+    Response as sent with PAPI-Use-Prefixes: false, 'prp_123' becomes '123'
+    '''
+    if isinstance(obj, list):
+        return [unprefix(x) for x in obj]
+    if not isinstance(obj, dict):
+        return obj
+    result = {}
+    for key, value in obj.items():
+        if key in PREFIXED_KEYS and isinstance(value, str) and '_' in value:
+            result[key] = value.split('_', 1)[1]
+        elif key == 'contractIds':
+            result[key] = [x.split('_', 1)[1] for x in value]
+        else:
+            result[key] = unprefix(value)
+    return result
+
+
+def strip_prefix(value) -> str:
+    return str(value).split('_', 1)[1] if '_' in str(value) else str(value)
+
+
+def match_locations(rule: dict, key: str, name: str, ignore_case: bool, path: str = '/rules'):
+    '''
+    JSON pointers of the behaviors or criteria named name, as in bulk search matchLocations
+    '''
+    for i, item in enumerate(rule.get(key, [])):
+        found = item.get('name', '')
+        if found == name or (ignore_case and found.lower() == name.lower()):
+            yield f'{path}/{key}/{i}'
+    for i, child in enumerate(rule.get('children', [])):
+        yield from match_locations(child, key, name, ignore_case, f'{path}/children/{i}')
+
+
+class Account:
+    def __init__(self, properties: int = 100,
+                 contracts: int = 1,
+                 group_depth: int = 2,
+                 group_fanout: int = 3,
+                 versions: int = 3,
+                 hostnames: int = 2,
+                 rules: int = 10,
+                 behaviors: int = 5,
+                 security_configs: int = 5,
+                 network_lists: int = 10,
+                 enrollments: int = 10,
+                 seed: int = 1):
+        self.seed = seed
+        self.rules = rules
+        self.behaviors = behaviors
+        self.account_id = 'act_1-MOCK'
+        self.account_name = 'Mock Account'
+        self.switch_key = '1-MOCK'
+        self.contracts = [f'ctr_C-MOCK{i}' for i in range(1, contracts + 1)]
+        self.groups = self._build_groups(group_depth, group_fanout)
+        self.properties = {}
+        self.by_name = {}
+        self.by_hostname = {}
+        rng = random.Random(seed)
+        for n in range(1, properties + 1):
+            prop = self._build_property(n, versions, hostnames, rng)
+            self.properties[strip_prefix(prop['propertyId'])] = prop
+            self.by_name[prop['propertyName']] = prop
+            for hostname in prop['hostnames']:
+                self.by_hostname[hostname['cnameFrom']] = prop
+        self.configs = [self._build_config(i, security_configs, rng) for i in range(1, security_configs + 1)]
+        self.network_lists = [self._build_network_list(i, rng) for i in range(1, network_lists + 1)]
+        self.enrollments = [self._build_enrollment(i, enrollments) for i in range(1, enrollments + 1)]
+        self.activations = {}  # propertyId without prefix -> activations, newest first
+        self.activation_count = 0
+
+    def summary(self) -> str:
+        return (f'{len(self.properties)} properties in {len(self.groups)} groups, {len(self.contracts)} contracts, '
+                f'{len(self.configs)} security configs, {len(self.network_lists)} network lists, '
+                f'{len(self.enrollments)} enrollments, ruletrees of {self.rules} rules x {self.behaviors} behaviors')
+
+    # BUILD
+    def _build_groups(self, depth: int, fanout: int) -> list:
+        top = {'groupId': 'grp_10000', 'groupName': self.account_name, 'contractIds': self.contracts}
+        groups = [top]
+        level = [top]
+        next_id = 10001
+        for _ in range(depth):
+            children = []
+            for parent in level:
+                for _ in range(fanout):
+                    child = {'groupId': f'grp_{next_id}', 'groupName': f'{parent["groupName"]} {next_id}',
+                             'parentGroupId': parent['groupId'], 'contractIds': self.contracts}
+                    next_id += 1
+                    children.append(child)
+            groups.extend(children)
+            level = children
+        return groups
+
+    def _build_property(self, n: int, versions: int, hostnames: int, rng: random.Random) -> dict:
+        group = self.groups[n % len(self.groups)]
+        contract = self.contracts[n % len(self.contracts)]
+        name = f'mock-{n:05}.example.com'
+        latest = rng.randint(1, versions) if versions > 1 else 1
+        production = max(1, latest - 1)
+        product_id = PRODUCTS[n % len(PRODUCTS)][0]
+        updated = START + timedelta(minutes=n * 7)
+        items = []
+        for version in range(1, latest + 1):
+            items.append({'propertyVersion': version,
+                          'updatedByUser': 'mock@example.com',
+                          'updatedDate': iso(updated + timedelta(days=version)),
+                          'productionStatus': 'ACTIVE' if version == production else 'INACTIVE',
+                          'stagingStatus': 'ACTIVE' if version == latest else 'INACTIVE',
+                          'etag': hashlib.sha1(f'{n}-{version}'.encode()).hexdigest(),
+                          'productId': product_id,
+                          'ruleFormat': RULE_FORMATS[n % len(RULE_FORMATS)],
+                          'note': f'version {version}'})
+        return {'accountId': self.account_id,
+                'contractId': contract,
+                'groupId': group['groupId'],
+                'propertyId': f'prp_{100000 + n}',
+                'propertyName': name,
+                'assetId': f'aid_{200000 + n}',
+                'latestVersion': latest,
+                'stagingVersion': latest,
+                'productionVersion': production,
+                'productId': product_id,
+                'cpcode': 500000 + n,
+                'note': '',
+                'versions': items,
+                'hostnames': [{'cnameType': 'EDGE_HOSTNAME',
+                               'edgeHostnameId': f'ehn_{300000 + n * 10 + i}',
+                               'cnameFrom': f'www{i}.{name}' if i else name,
+                               'cnameTo': f'{name}.edgekey.net',
+                               'certProvisioningType': 'CPS_MANAGED'} for i in range(hostnames)]}
+
+    def _build_config(self, i: int, count: int, rng: random.Random) -> dict:
+        # every config protects a slice of the properties
+        props = list(self.properties.values())[i - 1::count][:20]
+        hosts = [h['cnameFrom'] for p in props for h in p['hostnames']]
+        latest = rng.randint(2, 20)
+        return {'id': 70000 + i,
+                'name': f'mock_waf_{i}',
+                'description': f'mock security configuration {i}',
+                'latestVersion': latest,
+                'productionVersion': latest - 1,
+                'stagingVersion': latest,
+                'productionHostnames': hosts,
+                'targetProduct': 'KSD',
+                'fileType': 'WAF',
+                'groupId': int(strip_prefix(self.groups[i % len(self.groups)]['groupId'])),
+                'contractId': strip_prefix(self.contracts[0])}
+
+    def _build_network_list(self, i: int, rng: random.Random) -> dict:
+        size = rng.randint(1, 200)
+        return {'uniqueId': f'{90000 + i}_MOCKLIST{i}',
+                'name': f'MOCK_LIST_{i}',
+                'type': 'IP',
+                'elementCount': size,
+                'syncPoint': rng.randint(1, 50),
+                'readOnly': False,
+                'list': [f'10.{i % 256}.{k // 256}.{k % 256}' for k in range(size)]}
+
+    def _build_enrollment(self, i: int, count: int) -> dict:
+        props = list(self.properties.values())[i - 1::count][:50]
+        sans = [h['cnameFrom'] for p in props for h in p['hostnames']]
+        return {'id': 40000 + i,
+                'ra': 'lets-encrypt' if i % 2 else 'symantec',
+                'validationType': 'dv' if i % 2 else 'ov',
+                'certificateType': 'san',
+                'productionSlots': [60000 + i],
+                'csr': {'cn': sans[0] if sans else f'cert{i}.example.com', 'sans': sans},
+                'networkConfiguration': {'sniOnly': bool(i % 3), 'geography': 'core'},
+                'location': f'/cps/v2/enrollments/{40000 + i}'}
+
+    # LOOKUP
+    def property(self, property_id) -> dict | None:
+        return self.properties.get(strip_prefix(property_id))
+
+    def version(self, prop: dict, version) -> dict | None:
+        version = int(version)
+        return next((x for x in prop['versions'] if x['propertyVersion'] == version), None)
+
+    def header(self, prop: dict) -> dict:
+        return {k: prop[k] for k in ['accountId', 'contractId', 'groupId', 'propertyId', 'propertyName', 'assetId']}
+
+    def listing(self, prop: dict) -> dict:
+        return {k: prop[k] for k in ['accountId', 'contractId', 'groupId', 'propertyId', 'propertyName', 'assetId',
+                                     'latestVersion', 'stagingVersion', 'productionVersion', 'note']}
+
+    def search_items(self, prop: dict) -> list:
+        return [{**self.header(prop), **{k: v[k] for k in ['propertyVersion', 'updatedByUser', 'updatedDate',
+                                                               'productionStatus', 'stagingStatus', 'etag']},
+                 'isLatest': v['propertyVersion'] == prop['latestVersion'],
+                 'lastModifiedTime': v['updatedDate']}
+                for v in prop['versions']
+                if v['propertyVersion'] == prop['latestVersion'] or 'ACTIVE' in [v['productionStatus'], v['stagingStatus']]]
+
+    # RULETREE
+    def ruletree(self, prop: dict, version: dict) -> dict:
+        n = int(strip_prefix(prop['propertyId']))
+        rng = random.Random(self.seed * 1_000_003 + n * 101 + version['propertyVersion'])
+        origin = f'origin-{n}.example.com'
+        default = {'name': 'default',
+                   'children': [self._rule(rng, i, depth=0) for i in range(self.rules)],
+                   'behaviors': [{'name': 'origin', 'options': {'originType': 'CUSTOMER', 'hostname': origin,
+                                                                'forwardHostHeader': 'REQUEST_HOST_HEADER',
+                                                                'cacheKeyHostname': 'ORIGIN_HOSTNAME',
+                                                                'httpPort': 80, 'httpsPort': 443}},
+                                 {'name': 'cpCode', 'options': {'value': {'id': prop['cpcode'], 'name': prop['propertyName']}}},
+                                 {'name': 'caching', 'options': {'behavior': 'MAX_AGE', 'ttl': '1d'}}],
+                   'options': {'is_secure': True},
+                   'criteria': [],
+                   'variables': []}
+        return {**self.header(prop),
+                'propertyVersion': version['propertyVersion'],
+                'etag': version['etag'],
+                'ruleFormat': version['ruleFormat'],
+                'rules': default}
+
+    def rules_search(self, key: str, name: str, ignore_case: bool = False) -> list:
+        '''
+        Bulk search results, latest and active versions with a behavior or criterion (key) of that name
+        '''
+        results = []
+        for prop in self.properties.values():
+            for item in self.search_items(prop):
+                rules = self.ruletree(prop, self.version(prop, item['propertyVersion']))['rules']
+                locations = list(match_locations(rules, key, name, ignore_case))
+                if locations:
+                    results.append({**{k: item[k] for k in ['accountId', 'contractId', 'groupId', 'propertyId', 'propertyName',
+                                                            'propertyVersion', 'isLatest', 'productionStatus', 'stagingStatus',
+                                                            'lastModifiedTime']},
+                                    'isLocked': False,
+                                    'isSecure': True,
+                                    'matchLocations': locations})
+        return results
+
+    def _rule(self, rng: random.Random, i: int, depth: int) -> dict:
+        rule = {'name': f'Rule {depth}.{i}',
+                'children': [],
+                'behaviors': [self._behavior(rng) for _ in range(self.behaviors)],
+                'criteria': [self._criterion(rng)],
+                'criteriaMustSatisfy': 'all',
+                'comments': ''}
+        if depth == 0 and i % 3 == 2:
+            rule['children'] = [self._rule(rng, k, depth + 1) for k in range(2)]
+        return rule
+
+    def _behavior(self, rng: random.Random) -> dict:
+        choice = rng.randrange(8)
+        if choice == 0:
+            return {'name': 'caching', 'options': {'behavior': 'MAX_AGE', 'mustRevalidate': False, 'ttl': f'{rng.randint(1, 30)}m'}}
+        if choice == 1:
+            return {'name': 'modifyOutgoingResponseHeader',
+                    'options': {'action': 'ADD', 'standardAddHeaderName': 'OTHER',
+                                'customHeaderName': f'X-Mock-{rng.randint(1, 99)}', 'headerValue': 'on'}}
+        if choice == 2:
+            return {'name': 'sureRoute', 'options': {'enabled': True, 'type': 'PERFORMANCE', 'testObjectUrl': '/sureroute.html'}}
+        if choice == 3:
+            return {'name': 'gzipResponse', 'options': {'behavior': 'ALWAYS'}}
+        if choice == 4:
+            return {'name': 'allowPost', 'options': {'enabled': True, 'allowWithoutContentLength': False}}
+        if choice == 5:
+            return {'name': 'http2', 'options': {'enabled': ''}}
+        if choice == 6:
+            return {'name': 'origin', 'options': {'originType': 'CUSTOMER', 'hostname': f'api-{rng.randint(1, 999)}.example.com',
+                                                  'forwardHostHeader': 'ORIGIN_HOSTNAME'}}
+        return {'name': 'cpCode', 'options': {'value': {'id': 500000 + rng.randint(1, len(self.properties))}}}
+
+    def _criterion(self, rng: random.Random) -> dict:
+        choice = rng.randrange(3)
+        if choice == 0:
+            return {'name': 'path', 'options': {'matchOperator': 'MATCHES_ONE_OF', 'values': [f'/api/{rng.randint(1, 99)}/*']}}
+        if choice == 1:
+            return {'name': 'fileExtension', 'options': {'matchOperator': 'IS_ONE_OF', 'values': ['jpg', 'png', 'css', 'js']}}
+        return {'name': 'requestHeader', 'options': {'headerName': 'X-Mock', 'matchOperator': 'EXISTS'}}
+
+    # SECURITY
+    def config(self, config_id) -> dict | None:
+        return next((x for x in self.configs if x['id'] == int(config_id)), None)
+
+    def export(self, config: dict, version: int) -> dict:
+        rng = random.Random(self.seed * 7919 + config['id'] * 31 + int(version))
+        policies = [{'id': f'MOCK_{k}', 'name': f'{config["name"]} policy {k}',
+                     'hasCustomRuleActions': False, 'hasRatePolicyActions': True,
+                     'applyApplicationLayerControls': True, 'applyNetworkLayerControls': True,
+                     'ipGeoFirewall': {'block': 'blockSpecificIPGeo',
+                                       'ipControls': {'blockedIPNetworkLists': {'networkList': [self.network_lists[0]['uniqueId']]}}
+                                       if self.network_lists else {}}}
+                    for k in range(1, rng.randint(2, 4))]
+        return {'configId': config['id'],
+                'configName': config['name'],
+                'version': int(version),
+                'basedOn': int(version) - 1,
+                'staging': {'status': 'Active' if int(version) == config['stagingVersion'] else 'Inactive'},
+                'production': {'status': 'Active' if int(version) == config['productionVersion'] else 'Inactive'},
+                'createdBy': 'mock@example.com',
+                'versionNotes': f'version {version}',
+                'advancedOptions': {'logging': {'allowSampling': True, 'cookies': {'type': 'all'}},
+                                    'prefetch': {'allExtensions': False, 'enableAppLayer': True, 'extensions': ['cgi', 'php']}},
+                'siem': {'enableSiem': True, 'siemDefinitionId': 1},
+                'securityPolicies': policies,
+                'customRules': [{'id': 60000 + k, 'name': f'custom rule {k}', 'description': '',
+                                 'conditions': [{'type': 'pathMatch', 'positiveMatch': True, 'value': [f'/admin/{k}']}]}
+                                for k in range(rng.randint(0, 5))],
+                'ratePolicies': [{'id': 80000 + k, 'name': f'rate policy {k}', 'averageThreshold': 100, 'burstThreshold': 200,
+                                  'type': 'WAF', 'additionalMatchOptions': []} for k in range(rng.randint(0, 3))],
+                'matchTargets': {'websiteTargets': [{'id': 1, 'hostnames': config['productionHostnames'][:10],
+                                                     'securityPolicy': {'policyId': policies[0]['id']}}]},
+                'selectedHosts': config['productionHostnames'],
+                'selectableHosts': [x for x in self.by_hostname if x not in config['productionHostnames']][:20],
+                'customDenyList': [],
+                'responseActions': {},
+                'rulesets': []}
+
+    def network_list(self, list_id: str) -> dict | None:
+        return next((x for x in self.network_lists if x['uniqueId'] == list_id), None)
+
+    # ACTIVATION
+    def activate(self, prop: dict, version: int, network: str, note: str = '', emails: list | None = None) -> dict | None:
+        '''
+        Record a PENDING activation, None while another one of the property is pending on that network
+        '''
+        history = self.activations.setdefault(strip_prefix(prop['propertyId']), [])
+        if any(x['network'] == network and x['status'] in ['PENDING', 'ZONE_1', 'ZONE_2', 'ZONE_3'] for x in history):
+            return None
+        self.activation_count += 1
+        now = iso(datetime.now(timezone.utc))
+        activation = {**self.header(prop),
+                      'activationId': f'atv_{self.activation_count}',
+                      'propertyVersion': int(version),
+                      'network': network,
+                      'activationType': 'ACTIVATE',
+                      'status': 'PENDING',
+                      'submitDate': now,
+                      'updateDate': now,
+                      'note': note,
+                      'notifyEmails': emails if emails else []}
+        history.insert(0, activation)
+        return activation
+
+    def go_live(self, activation: dict) -> None:
+        '''
+        Activation done, the version becomes the ACTIVE one of its network
+        '''
+        prop = self.property(activation['propertyId'])
+        network = activation['network'].lower()
+        for version in prop['versions']:
+            if version['propertyVersion'] == activation['propertyVersion']:
+                version[f'{network}Status'] = 'ACTIVE'
+            elif version[f'{network}Status'] == 'ACTIVE':
+                version[f'{network}Status'] = 'DEACTIVATED'
+        prop[f'{network}Version'] = activation['propertyVersion']
+        activation['status'] = 'ACTIVE'
+        activation['updateDate'] = iso(datetime.now(timezone.utc))
+
+    # CPCODE
+    def cpcodes(self) -> list:
+        return [self.cpcode(prop) for prop in self.properties.values()]
+
+    def cpcode(self, prop: dict) -> dict:
+        return {'cpcodeId': prop['cpcode'],
+                'cpcodeName': prop['propertyName'],
+                'contracts': [{'contractId': strip_prefix(prop['contractId']), 'status': 'ongoing'}],
+                'products': [{'productId': strip_prefix(prop['productId']),
+                              'productName': dict(PRODUCTS)[prop['productId']]}],
+                'accessGroup': {'groupId': int(strip_prefix(prop['groupId'])), 'contractId': strip_prefix(prop['contractId'])}}
+
+    def cpcode_by_id(self, cpcode) -> dict | None:
+        prop = self.properties.get(str(int(cpcode) - 500000 + 100000))
+        return self.cpcode(prop) if prop else None
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,667 @@
+'''
+Local stand-in for the Akamai APIs used by ak_api, for load and scale tests without a real account
+
+    python -m ak_mock.server --properties 10000 --latency 80 --jitter 40 --rate-limit 1000 --error-rate 0.01
+    python ak-utility.py --base-url http://127.0.0.1:8080 delivery-config ...
+
+Serves PAPI (groups, contracts, products, properties, versions, rules, hostnames, search, bulk rules search,
+bulk activations, activation status),
+appsec (configs, export, policies), network lists, cpcodes, CPS enrollments, reporting and the
+account switch key lookup from a synthetic Account. Every request needs an EdgeGrid Authorization
+header, the signature itself is not verified. On top of the responses the server can add latency,
+enforce a per API family rate limit (429 with X-RateLimit headers, or the WAF IPBLOCK-BURST 403)
+and inject 5xx errors.
+'''
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from ak_mock.account import Account
+from ak_mock.account import iso
+from ak_mock.account import PRODUCTS
+from ak_mock.account import RULE_FORMATS
+from ak_mock.account import strip_prefix
+from ak_mock.account import unprefix
+
+
+logger = logging.getLogger(__name__)
+
+ERROR_STATUS = [500, 502, 503, 504]
+SEARCH_DELAY = 1.0  # seconds a bulk rules search stays PENDING
+# the JSONPath forms the bulk search emulation understands
+SEARCH_QUERY = re.compile(r'''^\$\.\.(behaviors|criteria)\[\?\(@\.name (?:== ['"]([\w-]+)['"]|=~ /\^([\w-]+)\$/(i?))\)\]$''')
+
+ACTIVATION_DELAY = 5.0  # seconds from submission to ACTIVE, through PENDING and ZONE_1 to ZONE_3
+ACTIVATION_STEPS = ['PENDING', 'ZONE_1', 'ZONE_2', 'ZONE_3']
+BULK_ACTIVATION_DELAY = 1.0  # seconds a bulk activation takes to create its activations
+BULK_ACTIVATION_LIMIT = 100  # property versions per bulk activation request
+
+_search_lock = threading.Lock()
+_search_ids = itertools.count(1)
+_searches: dict[int, dict] = {}
+
+_activation_lock = threading.Lock()
+_bulk_activation_ids = itertools.count(1)
+_bulk_activations: dict[int, dict] = {}
+_activation_started: dict[str, float] = {}  # activationId -> monotonic submit time
+
+
+def problem(status: int, title: str, detail: str = '') -> tuple[int, dict]:
+    return status, {'type': f'https://problems.luna.akamaiapis.net/mock/{status}', 'title': title,
+                    'status': status, 'detail': detail}
+
+
+class Routes:
+    '''
+    (method, path pattern) -> handler(account, query, body, **path parameters) returning a payload, (status, payload)
+    or (status, payload, headers)
+    '''
+    def __init__(self):
+        self.table: list[tuple[str, re.Pattern, Callable]] = []
+
+    def add(self, method: str, pattern: str):
+        def register(fn: Callable) -> Callable:
+            self.table.append((method, re.compile(f'^{pattern}$'), fn))
+            return fn
+        return register
+
+    def match(self, method: str, path: str) -> tuple[Callable | None, dict]:
+        for route_method, pattern, fn in self.table:
+            found = pattern.match(path)
+            if found and route_method == method:
+                return fn, found.groupdict()
+        return None, {}
+
+
+routes = Routes()
+
+
+# PAPI
+@routes.add('GET', '/papi/v1/build')
+def build(account, query, body):
+    return {'buildVersion': 'mock', 'apiVersion': 'v1'}
+
+
+@routes.add('GET', '/papi/v1/groups')
+def groups(account, query, body):
+    return {'accountId': account.account_id, 'accountName': account.account_name, 'groups': {'items': account.groups}}
+
+
+@routes.add('GET', '/papi/v1/contracts')
+def contracts(account, query, body):
+    return {'accountId': account.account_id,
+            'contracts': {'items': [{'contractId': x, 'contractTypeName': 'DIRECT_CUSTOMER'} for x in account.contracts]}}
+
+
+@routes.add('GET', '/papi/v1/products')
+def products(account, query, body):
+    return {'accountId': account.account_id,
+            'products': {'items': [{'productId': k, 'productName': v} for k, v in PRODUCTS]}}
+
+
+@routes.add('GET', '/papi/v1/rule-formats')
+def rule_formats(account, query, body):
+    return {'ruleFormats': {'items': RULE_FORMATS}}
+
+
+@routes.add('GET', '/papi/v1/custom-behaviors')
+def custom_behaviors(account, query, body):
+    return {'accountId': account.account_id, 'customBehaviors': {'items': []}}
+
+
+@routes.add('GET', '/papi/v1/edgehostnames')
+def edgehostnames(account, query, body):
+    items = [{'edgeHostnameId': h['edgeHostnameId'], 'edgeHostnameDomain': h['cnameTo'],
+              'productId': prop['productId'], 'domainPrefix': prop['propertyName'], 'domainSuffix': 'edgekey.net',
+              'secure': True, 'ipVersionBehavior': 'IPV6_COMPLIANCE'}
+             for prop in account.properties.values()
+             if strip_prefix(prop['groupId']) == strip_prefix(query.get('groupId', prop['groupId']))
+             for h in prop['hostnames'][:1]]
+    return {'accountId': account.account_id, 'edgeHostnames': {'items': items}}
+
+
+@routes.add('GET', '/papi/v1/properties')
+def properties(account, query, body):
+    if 'groupId' not in query or 'contractId' not in query:
+        return problem(400, 'Bad Request', 'contractId and groupId are required')
+    group_id, contract_id = strip_prefix(query['groupId']), strip_prefix(query['contractId'])
+    items = [account.listing(x) for x in account.properties.values()
+             if strip_prefix(x['groupId']) == group_id and strip_prefix(x['contractId']) == contract_id]
+    return {'properties': {'items': items}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)')
+def property_latest(account, query, body, property_id):
+    prop = account.property(property_id)
+    if prop is None:
+        return problem(404, 'Not Found', f'property {property_id} not found')
+    return {'properties': {'items': [account.listing(prop)]}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/versions')
+def property_versions(account, query, body, property_id):
+    prop = account.property(property_id)
+    if prop is None:
+        return problem(404, 'Not Found', f'property {property_id} not found')
+    return {**account.header(prop), 'versions': {'items': list(reversed(prop['versions']))}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/versions/(?P<version>\d+)')
+def property_version(account, query, body, property_id, version):
+    prop = account.property(property_id)
+    detail = account.version(prop, version) if prop else None
+    if detail is None:
+        return problem(404, 'Not Found', f'property {property_id} version {version} not found')
+    return {**account.header(prop), 'versions': {'items': [detail]}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/versions/(?P<version>\d+)/rules')
+def property_rules(account, query, body, property_id, version):
+    prop = account.property(property_id)
+    detail = account.version(prop, version) if prop else None
+    if detail is None:
+        return problem(404, 'Not Found', f'property {property_id} version {version} not found')
+    return account.ruletree(prop, detail)
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/hostnames')
+def property_hostnames(account, query, body, property_id):
+    prop = account.property(property_id)
+    if prop is None:
+        return problem(404, 'Not Found', f'property {property_id} not found')
+    return {**account.header(prop), 'hostnames': {'items': prop['hostnames']}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/versions/(?P<version>\d+)/hostnames')
+def property_version_hostnames(account, query, body, property_id, version):
+    prop = account.property(property_id)
+    if prop is None or account.version(prop, version) is None:
+        return problem(404, 'Not Found', f'property {property_id} version {version} not found')
+    items = [{**x, 'certStatus': {'production': [{'status': 'DEPLOYED'}], 'staging': [{'status': 'DEPLOYED'}]}}
+             for x in prop['hostnames']]
+    return {**account.header(prop), 'propertyVersion': int(version), 'hostnames': {'items': items}}
+
+
+@routes.add('POST', '/papi/v1/search/find-by-value')
+def find_by_value(account, query, body):
+    if 'propertyName' in body:
+        prop = account.by_name.get(body['propertyName'])
+    elif 'hostname' in body:
+        prop = account.by_hostname.get(body['hostname'])
+    elif 'edgeHostname' in body:
+        prop = next((x for x in account.properties.values()
+                     if any(h['cnameTo'] == body['edgeHostname'] for h in x['hostnames'])), None)
+    else:
+        return problem(400, 'Bad Request', 'one of propertyName, hostname or edgeHostname is required')
+    return {'versions': {'items': account.search_items(prop) if prop else []}}
+
+
+@routes.add('POST', '/papi/v1/bulk/rules-search-requests')
+def bulk_search_submit(account, query, body):
+    search_query = body.get('bulkSearchQuery', {})
+    found = SEARCH_QUERY.match(search_query.get('match', ''))
+    if search_query.get('syntax') != 'JSONPATH' or found is None:
+        return problem(400, 'Bad Request', f"unsupported bulk search query {search_query.get('match')}")
+    key, exact, pattern, flag = found.groups()
+    with _search_lock:
+        search_id = next(_search_ids)
+        _searches[search_id] = {'query': search_query,
+                                'key': key,
+                                'name': exact or pattern,
+                                'ignore_case': bool(flag),
+                                'submitted': time.monotonic(),
+                                'submitDate': iso(datetime.now(timezone.utc)),
+                                'results': None}
+    return 202, {'bulkSearchLink': f'/papi/v1/bulk/rules-search-requests/{search_id}'}
+
+
+@routes.add('GET', r'/papi/v1/bulk/rules-search-requests/(?P<search_id>\d+)')
+def bulk_search_status(account, query, body, search_id):
+    search = _searches.get(int(search_id))
+    if search is None:
+        return problem(404, 'Not Found', f'bulk search {search_id} not found')
+    complete = time.monotonic() - search['submitted'] >= SEARCH_DELAY
+    if complete and search['results'] is None:
+        search['results'] = account.rules_search(search['key'], search['name'], search['ignore_case'])
+    return {'bulkSearchId': int(search_id),
+            'searchTargetStatus': 'COMPLETE' if complete else 'PENDING',
+            'searchSubmitDate': search['submitDate'],
+            'bulkSearchQuery': search['query'],
+            'results': search['results'] if complete else []}
+
+
+@routes.add('POST', '/papi/v1/bulk/activations')
+def bulk_activation_submit(account, query, body):
+    requested = body.get('activatePropertyVersions', [])
+    if not requested or len(requested) > BULK_ACTIVATION_LIMIT:
+        return problem(400, 'Bad Request', f'between 1 and {BULK_ACTIVATION_LIMIT} activatePropertyVersions, {len(requested)} sent')
+    emails = body.get('defaultActivationSettings', {}).get('notifyEmails', [])
+    items = []
+    with _activation_lock:
+        for x in requested:
+            item = {k: x.get(k) for k in ['propertyId', 'propertyVersion', 'network', 'note']}
+            prop = account.property(x.get('propertyId', ''))
+            activation = None
+            if prop is None:
+                item['fatalError'] = f"property {x.get('propertyId')} not found"
+            elif account.version(prop, x.get('propertyVersion', 0)) is None:
+                item['fatalError'] = f"version {x.get('propertyVersion')} not found"
+            else:
+                activation = account.activate(prop, x['propertyVersion'], x.get('network', 'STAGING').upper(),
+                                              x.get('note', ''), x.get('notifyEmails', emails))
+                if activation is None:
+                    item['fatalError'] = 'property has a pending activation on that network'
+                else:
+                    _activation_started[activation['activationId']] = time.monotonic()
+            items.append((item, activation))
+        bulk_id = next(_bulk_activation_ids)
+        _bulk_activations[bulk_id] = {'submitted': time.monotonic(),
+                                      'submitDate': iso(datetime.now(timezone.utc)),
+                                      'items': items}
+    return 202, {'bulkActivationLink': f'/papi/v1/bulk/activations/{bulk_id}'}
+
+
+@routes.add('GET', r'/papi/v1/bulk/activations/(?P<bulk_id>\d+)')
+def bulk_activation_status(account, query, body, bulk_id):
+    job = _bulk_activations.get(int(bulk_id))
+    if job is None:
+        return problem(404, 'Not Found', f'bulk activation {bulk_id} not found')
+    items = []
+    with _activation_lock:
+        for item, activation in job['items']:
+            if activation is None:
+                items.append({**item, 'taskStatus': 'FAILED'})
+                continue
+            advance(account, activation)
+            items.append({**item,
+                          'activationId': activation['activationId'],
+                          'activationStatus': activation['status'],
+                          'taskStatus': 'COMPLETE' if time.monotonic() - job['submitted'] >= BULK_ACTIVATION_DELAY else 'SUBMITTED'})
+    elapsed = time.monotonic() - job['submitted']
+    status = 'COMPLETE' if elapsed >= BULK_ACTIVATION_DELAY else 'IN_PROGRESS' if elapsed >= BULK_ACTIVATION_DELAY / 2 else 'SUBMITTED'
+    return {'bulkActivationId': int(bulk_id),
+            'bulkActivationStatus': status,
+            'bulkActivationSubmitDate': job['submitDate'],
+            'activatePropertyVersions': items}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/activations')
+def property_activations(account, query, body, property_id):
+    prop = account.property(property_id)
+    if prop is None:
+        return problem(404, 'Not Found', f'property {property_id} not found')
+    with _activation_lock:
+        history = account.activations.get(strip_prefix(property_id), [])
+        for activation in history:
+            advance(account, activation)
+        return {**account.header(prop), 'activations': {'items': [dict(x) for x in history]}}
+
+
+@routes.add('GET', r'/papi/v1/properties/(?P<property_id>[\w-]+)/activations/(?P<activation_id>[\w-]+)')
+def property_activation(account, query, body, property_id, activation_id):
+    prop = account.property(property_id)
+    activation_id = f'atv_{strip_prefix(activation_id)}'
+    with _activation_lock:
+        activation = next((x for x in account.activations.get(strip_prefix(property_id), [])
+                           if x['activationId'] == activation_id), None)
+        if prop is None or activation is None:
+            return problem(404, 'Not Found', f'activation {activation_id} of property {property_id} not found')
+        remaining = advance(account, activation)
+        payload = {**account.header(prop), 'activations': {'items': [dict(activation)]}}
+    return (200, payload, {'Retry-After': str(max(1, round(remaining)))}) if remaining else payload
+
+
+def advance(account, activation: dict) -> float:
+    '''
+    Move the activation along, ACTIVE ACTIVATION_DELAY seconds after it was submitted,
+    returns the seconds left or 0 once done. Call with _activation_lock held
+    '''
+    started = _activation_started.get(activation['activationId'])
+    if activation['status'] not in ACTIVATION_STEPS or started is None:
+        return 0.0
+    elapsed = time.monotonic() - started
+    if elapsed >= ACTIVATION_DELAY:
+        account.go_live(activation)
+        return 0.0
+    step = ACTIVATION_STEPS[int(elapsed / ACTIVATION_DELAY * len(ACTIVATION_STEPS))]
+    if step != activation['status']:
+        activation['status'] = step
+        activation['updateDate'] = iso(datetime.now(timezone.utc))
+    return ACTIVATION_DELAY - elapsed
+
+
+# APPSEC
+@routes.add('GET', '/appsec/v1/configs')
+def waf_configs(account, query, body):
+    return {'configurations': account.configs}
+
+
+@routes.add('GET', r'/appsec/v1/configs/(?P<config_id>\d+)')
+def waf_config(account, query, body, config_id):
+    config = account.config(config_id)
+    if config is None:
+        return problem(404, 'Not Found', f'config {config_id} not found')
+    return config
+
+
+@routes.add('GET', r'/appsec/v1/export/configs/(?P<config_id>\d+)/versions/(?P<version>\d+)')
+def waf_export(account, query, body, config_id, version):
+    config = account.config(config_id)
+    if config is None or int(version) > config['latestVersion']:
+        return problem(404, 'Not Found', f'config {config_id} version {version} not found')
+    return account.export(config, version)
+
+
+@routes.add('GET', r'/appsec/v1/configs/(?P<config_id>\d+)/versions/(?P<version>\d+)/security-policies')
+def waf_policies(account, query, body, config_id, version):
+    config = account.config(config_id)
+    if config is None:
+        return problem(404, 'Not Found', f'config {config_id} not found')
+    policies = account.export(config, version)['securityPolicies']
+    return {'configId': config['id'], 'version': int(version),
+            'policies': [{'policyId': x['id'], 'policyName': x['name']} for x in policies]}
+
+
+@routes.add('GET', r'/appsec/v1/configs/(?P<config_id>\d+)/custom-rules')
+def waf_custom_rules(account, query, body, config_id):
+    config = account.config(config_id)
+    if config is None:
+        return problem(404, 'Not Found', f'config {config_id} not found')
+    return {'customRules': account.export(config, config['latestVersion'])['customRules']}
+
+
+@routes.add('GET', r'/appsec/v1/configs/(?P<config_id>\d+)/versions/(?P<version>\d+)/bypass-network-lists')
+def waf_bypass_lists(account, query, body, config_id, version):
+    return {'networkLists': [{'id': x['uniqueId'], 'name': x['name']} for x in account.network_lists[:2]]}
+
+
+@routes.add('GET', r'/appsec/v1/configs/(?P<config_id>\d+)/versions/(?P<version>\d+)/security-policies/(?P<policy_id>\w+)/ip-geo-firewall')
+def waf_ip_geo(account, query, body, config_id, version, policy_id):
+    config = account.config(config_id)
+    if config is None:
+        return problem(404, 'Not Found', f'config {config_id} not found')
+    policy = next((x for x in account.export(config, version)['securityPolicies'] if x['id'] == policy_id), None)
+    if policy is None:
+        return problem(404, 'Not Found', f'policy {policy_id} not found')
+    return policy['ipGeoFirewall']
+
+
+# NETWORK LISTS
+@routes.add('GET', '/network-list/v2/network-lists')
+def network_lists(account, query, body):
+    return {'networkLists': [{k: v for k, v in x.items() if k != 'list'} for x in account.network_lists]}
+
+
+@routes.add('GET', r'/network-list/v2/network-lists/(?P<list_id>[\w-]+)')
+def network_list(account, query, body, list_id):
+    found = account.network_list(list_id)
+    return found if found else problem(404, 'Not Found', f'network list {list_id} not found')
+
+
+# CPCODES
+@routes.add('GET', '/cprg/v1/cpcodes')
+def cpcodes(account, query, body):
+    items = account.cpcodes()
+    if 'contractId' in query:
+        items = [x for x in items if x['contracts'][0]['contractId'] == strip_prefix(query['contractId'])]
+    if 'groupId' in query:
+        items = [x for x in items if str(x['accessGroup']['groupId']) == strip_prefix(query['groupId'])]
+    return {'cpcodes': items}
+
+
+@routes.add('GET', r'/cprg/v1/cpcodes/(?P<cpcode>\d+)')
+def cpcode(account, query, body, cpcode):
+    found = account.cpcode_by_id(cpcode)
+    return found if found else problem(404, 'Not Found', f'cpcode {cpcode} not found')
+
+
+# CPS
+@routes.add('GET', '/cps/v2/enrollments')
+def enrollments(account, query, body):
+    return {'enrollments': account.enrollments}
+
+
+@routes.add('GET', r'/cps/v2/enrollments/(?P<enrollment_id>\d+)')
+def enrollment(account, query, body, enrollment_id):
+    found = next((x for x in account.enrollments if x['id'] == int(enrollment_id)), None)
+    return found if found else problem(404, 'Not Found', f'enrollment {enrollment_id} not found')
+
+
+# REPORTING
+@routes.add('GET', '/reporting-api/v1/reports')
+def reports(account, query, body):
+    return [{'name': x, 'version': '1'} for x in ['hostname-hits-by-hostname', 'urlhits-by-url', 'traffic-by-responseclass']]
+
+
+@routes.add('POST', r'/reporting-api/v1/reports/(?P<report>[\w-]+)/versions/1/report-data')
+def report_data(account, query, body, report):
+    rng = random.Random(f'{report}{query.get("start")}{query.get("end")}')
+    hostnames = list(account.by_hostname)[:int(body.get('limit', query.get('limit', 10000)))]
+    if report == 'urlhits-by-url':
+        data = [{'hostname.url': f'{x}/index.html', 'allEdgeHits': rng.randint(0, 10**6),
+                 'allHitsOffload': round(rng.uniform(50, 100), 2), 'allOriginHits': rng.randint(0, 10**4)} for x in hostnames]
+    elif report == 'traffic-by-responseclass':
+        data = [{'responseClass': f'{k}xx', 'edgeHits': rng.randint(0, 10**7)} for k in range(2, 6)]
+    else:
+        data = [{'hostname': x, 'edgeHits': rng.randint(0, 10**6)} for x in hostnames]
+    return {'metadata': {'name': report, 'version': '1', 'start': query.get('start'), 'end': query.get('end'),
+                         'rowCount': len(data)},
+            'data': data}
+
+
+# IDENTITY
+@routes.add('GET', '/identity-management/v3/api-clients/self/account-switch-keys')
+def account_switch_keys(account, query, body):
+    search = query.get('search', '').upper()
+    keys = [{'accountSwitchKey': account.switch_key, 'accountName': account.account_name}]
+    return [x for x in keys if search in x['accountSwitchKey'].upper() or search in x['accountName'].upper()]
+
+
+class RateLimit:
+    '''
+    Fixed window request budget per API family
+    '''
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._windows: dict[str, tuple[float, int]] = {}
+
+    def take(self, family: str) -> tuple[bool, int, float]:
+        '''
+        Count one request, return (allowed, remaining, seconds until the window resets)
+        '''
+        now = time.monotonic()
+        with self._lock:
+            start, used = self._windows.get(family, (now, 0))
+            if now - start >= self.window:
+                start, used = now, 0
+            used += 1
+            self._windows[family] = (start, used)
+        return used <= self.limit, max(0, self.limit - used), self.window - (now - start)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, account: Account,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 rate_limit: int | None = None,
+                 rate_window: float = 60,
+                 ipblock: bool = False,
+                 error_rate: float = 0.0,
+                 error_status: list[int] | None = None,
+                 error_path: str | None = None):
+        super().__init__((host, port), MockHandler)
+        self.account = account
+        self.latency = latency        # seconds
+        self.jitter = jitter          # seconds, standard deviation around latency
+        self.limiter = RateLimit(rate_limit, rate_window) if rate_limit else None
+        self.ipblock = ipblock        # exceeding the limit gets the WAF 403 instead of a 429
+        self.error_rate = error_rate
+        self.error_status = error_status if error_status else ERROR_STATUS
+        self.error_path = re.compile(error_path) if error_path else None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> MockServer:
+        '''
+        Serve from a daemon thread, for tests and benchmarks driven from the same process
+        '''
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def count(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, the client pool is part of what is being measured
+    server: MockServer
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} {format % args}')
+
+    def do_GET(self):
+        self.handle_api('GET')
+
+    def do_POST(self):
+        self.handle_api('POST')
+
+    def do_PUT(self):
+        self.handle_api('PUT')
+
+    def handle_api(self, method: str) -> None:
+        server = self.server
+        server.count()
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        headers = {}
+
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+
+        if not self.headers.get('Authorization', '').startswith('EG1-HMAC-SHA256 '):
+            return self.send_json(*problem(401, 'Not authorized', 'missing EdgeGrid Authorization header'))
+
+        if server.limiter:
+            allowed, remaining, reset = server.limiter.take(path.strip('/').split('/')[0])
+            headers.update({'X-RateLimit-Limit': str(server.limiter.limit), 'X-RateLimit-Remaining': str(remaining)})
+            if not allowed:
+                if server.ipblock:
+                    return self.send_json(*problem(403, 'Forbidden', 'WAF deny rule IPBLOCK-BURST4-54013'), headers)
+                headers['Retry-After'] = str(max(1, round(reset)))
+                return self.send_json(*problem(429, 'Too Many Requests', 'rate limit exceeded'), headers)
+
+        if server.error_rate and random.random() < server.error_rate:
+            if server.error_path is None or server.error_path.search(path):
+                status = random.choice(server.error_status)
+                return self.send_json(*problem(status, 'Injected error', f'mock {status} for {path}'), headers)
+
+        handler, params = routes.match(method, path)
+        if handler is None:
+            return self.send_json(*problem(404, 'Not Found', f'{method} {path} is not emulated'), headers)
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self.send_json(*problem(400, 'Bad Request', 'body is not JSON'), headers)
+
+        result = handler(server.account, query, body, **params)
+        status, payload, *extra = result if isinstance(result, tuple) else (200, result)
+        headers.update(*extra)
+        if path.startswith('/papi/') and self.headers.get('PAPI-Use-Prefixes', 'true').lower() == 'false':
+            payload = unprefix(payload)
+        self.send_json(status, payload, headers)
+
+    def send_json(self, status: int, payload, headers: dict | None = None) -> None:
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        headers = headers if headers else {}
+        if status == 200 and self.command == 'GET':
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/problem+json' if status >= 400 else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local stand-in for the Akamai APIs used by ak_api')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--properties', type=int, default=1000)
+    parser.add_argument('--contracts', type=int, default=1)
+    parser.add_argument('--group-depth', type=int, default=2, help='levels of groups below the top group')
+    parser.add_argument('--group-fanout', type=int, default=3, help='child groups per group')
+    parser.add_argument('--versions', type=int, default=3, help='maximum versions per property')
+    parser.add_argument('--hostnames', type=int, default=2, help='hostnames per property')
+    parser.add_argument('--rules', type=int, default=10, help='child rules per ruletree')
+    parser.add_argument('--behaviors', type=int, default=5, help='behaviors per rule')
+    parser.add_argument('--security-configs', type=int, default=5)
+    parser.add_argument('--network-lists', type=int, default=10)
+    parser.add_argument('--enrollments', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0, metavar='MS', help='mean added latency')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS', help='standard deviation of the added latency')
+    parser.add_argument('--rate-limit', type=int, metavar='N', help='requests per window per API family')
+    parser.add_argument('--rate-window', type=float, default=60, metavar='SECONDS')
+    parser.add_argument('--ipblock', action='store_true', help='answer over-limit requests with the WAF IPBLOCK-BURST 403')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with a 5xx')
+    parser.add_argument('--error-status', type=int, nargs='+', default=ERROR_STATUS)
+    parser.add_argument('--error-path', metavar='REGEX', help='only inject errors on matching paths')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format='%(asctime)s %(message)s')
+    account = Account(properties=args.properties, contracts=args.contracts,
+                      group_depth=args.group_depth, group_fanout=args.group_fanout,
+                      versions=args.versions, hostnames=args.hostnames,
+                      rules=args.rules, behaviors=args.behaviors,
+                      security_configs=args.security_configs, network_lists=args.network_lists,
+                      enrollments=args.enrollments, seed=args.seed)
+    server = MockServer(account, host=args.host, port=args.port,
+                        latency=args.latency / 1000, jitter=args.jitter / 1000,
+                        rate_limit=args.rate_limit, rate_window=args.rate_window, ipblock=args.ipblock,
+                        error_rate=args.error_rate, error_status=args.error_status, error_path=args.error_path)
+    logger.info(account.summary())
+    logger.info(f'serving on {server.url}, use: ak-utility.py --base-url {server.url} -a {account.switch_key} ...')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f'{server.requests} requests served')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+'''
+Follow many property activations at once until they are done
+
+Each tick polls the properties whose next poll is due, concurrently, one request per property
+whatever the number of its activations being followed (staging and production of the same property).
+The next poll of a property is set from the Retry-After the API sends back, else from how far the
+activation is from its typical duration: half the remaining time, doubled once it is overdue,
+between ACTIVATION_POLL seconds. A client error other than 429 (unknown property or activation, no access)
+will not go away by polling again, its activations end as ERROR. A live table summarizes the statuses per network.
+'''
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections import defaultdict
+from datetime import datetime
+from datetime import timezone
+
+import pandas as pd
+from ak_api import version_cache
+from ak_api.papi import AsyncPapi
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+
+
+ACTIVATION_POLL = (15, 300)     # shortest and longest seconds between polls of a property
+ACTIVATION_TIMEOUT = 7200       # seconds to follow activations before giving up
+ACTIVATION_ETA = {'STAGING': 420, 'PRODUCTION': 900}  # typical seconds from submission to ACTIVE
+DONE = ['ACTIVE', 'INACTIVE', 'DEACTIVATED', 'ABORTED', 'FAILED', 'ERROR']  # ERROR: the API refused to report it
+COLUMNS = ['propertyId', 'propertyName', 'propertyVersion', 'network', 'activationId', 'status', 'submitDate', 'updateDate']
+
+
+class ActivationTracker:
+    def __init__(self, account_switch_key: str | None = None,
+                 concurrency: int | None = None,
+                 logger: logging.Logger = None):
+        self.account_switch_key = account_switch_key
+        self.concurrency = concurrency
+        self.logger = logger
+        self.activations: dict[str, dict] = {}        # activationId -> latest known state
+        self.by_property: dict[int, list] = defaultdict(list)
+        self.next_poll: dict[int, float] = {}
+        self.delay: dict[int, float] = {}
+        self.requests = 0
+        self.started = None
+
+    def add(self, property_id, activation_id, network: str | None = None,
+            property_name: str | None = None, version: int | None = None) -> None:
+        property_id = version_cache.property_key(property_id)
+        activation_id = str(activation_id).removeprefix('atv_')
+        self.activations[activation_id] = {'propertyId': property_id,
+                                           'propertyName': property_name,
+                                           'propertyVersion': version,
+                                           'network': network.upper() if network else None,
+                                           'activationId': activation_id,
+                                           'status': None,
+                                           'submitDate': None,
+                                           'updateDate': None}
+        self.by_property[property_id].append(activation_id)
+        self.next_poll[property_id] = 0.0
+        self.delay[property_id] = ACTIVATION_POLL[0]
+
+    def run(self, timeout: float = ACTIVATION_TIMEOUT) -> pd.DataFrame:
+        '''
+        Poll until every activation is done or timeout, one row per activation with its last status
+        '''
+        if self.activations:
+            asyncio.run(self._run(timeout))
+        return pd.DataFrame(list(self.activations.values()), columns=COLUMNS)
+
+    def pending(self) -> list[int]:
+        return [property_id for property_id, ids in self.by_property.items()
+                if any(self.activations[x]['status'] not in DONE for x in ids)]
+
+    async def _run(self, timeout: float) -> None:
+        self.started = time.monotonic()
+        deadline = self.started + timeout
+        async with AsyncPapi(account_switch_key=self.account_switch_key, max_in_flight=self.concurrency,
+                             logger=self.logger) as papi:
+            with Live(self.table(), console=Console(), refresh_per_second=1) as live:
+                while pending := self.pending():
+                    if time.monotonic() >= deadline:
+                        self.logger.error(f'{len(pending)} properties still activating after {timeout}s')
+                        break
+                    due = [x for x in pending if self.next_poll[x] <= time.monotonic()]
+                    polled = await asyncio.gather(*[self._poll(papi, x) for x in due], return_exceptions=True)
+                    for property_id, error in zip(due, polled):
+                        if isinstance(error, Exception):
+                            # a connection lost past its retries must not end hours of following
+                            self.logger.error(f'{property_id=} activations {error!r}')
+                            self.next_poll[property_id] = time.monotonic() + self._next_delay(property_id, None)
+                    pending = self.pending()
+                    live.update(self.table())
+                    if pending:
+                        # wake up every second to keep the countdown of the table current
+                        wake = min(self.next_poll[x] for x in pending)
+                        await asyncio.sleep(max(0.0, min(wake - time.monotonic(), 1.0)))
+
+    async def _poll(self, papi: AsyncPapi, property_id: int) -> None:
+        ids = self.by_property[property_id]
+        # a single activation has its own endpoint, several of a property come from one listing
+        status, items, retry_after = await papi.get_activations(property_id, ids[0] if len(ids) == 1 else None)
+        self.requests += 1
+        if status == 200:
+            for item in items:
+                activation_id = str(item['activationId']).removeprefix('atv_')
+                if activation_id in self.activations:
+                    self._update(self.activations[activation_id], item)
+        elif 400 <= status < 500 and status != 429:
+            self.logger.error(f'{property_id=} activations {status} {items}, no longer followed')
+            for activation_id in ids:
+                self.activations[activation_id]['status'] = 'ERROR'
+        else:
+            self.logger.error(f'{property_id=} activations {status} {items}')
+        self.next_poll[property_id] = time.monotonic() + self._next_delay(property_id, retry_after)
+
+    def _update(self, state: dict, item: dict) -> None:
+        previous = state['status']
+        state.update({'propertyName': item.get('propertyName', state['propertyName']),
+                      'propertyVersion': item.get('propertyVersion', state['propertyVersion']),
+                      'network': item.get('network', state['network']),
+                      'status': item['status'],
+                      'submitDate': item.get('submitDate'),
+                      'updateDate': item.get('updateDate')})
+        if state['status'] != previous and state['status'] in ['FAILED', 'ABORTED']:
+            self.logger.error(f"{state['propertyName']} v{state['propertyVersion']} {state['network']} {state['status']}")
+
+    def _next_delay(self, property_id: int, retry_after: float | None) -> float:
+        '''
+        Retry-After when given, else half the time left to the typical duration, doubling once overdue
+        '''
+        low, high = ACTIVATION_POLL
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            pending = [self.activations[x] for x in self.by_property[property_id] if self.activations[x]['status'] not in DONE]
+            remaining = min(self._remaining(x) for x in pending) if pending else 0.0
+            delay = remaining / 2 if remaining > 0 else self.delay[property_id] * 2
+        self.delay[property_id] = min(max(delay, low), high)
+        return self.delay[property_id]
+
+    @staticmethod
+    def _remaining(state: dict) -> float:
+        if not state['submitDate']:
+            return 0.0
+        submitted = datetime.fromisoformat(state['submitDate'].replace('Z', '+00:00'))
+        elapsed = (datetime.now(timezone.utc) - submitted).total_seconds()
+        return ACTIVATION_ETA.get(state['network'], ACTIVATION_ETA['PRODUCTION']) - elapsed
+
+    def table(self) -> Table:
+        counts = Counter((x['network'] or '', x['status'] or 'UNKNOWN') for x in self.activations.values())
+        statuses = sorted({status for _, status in counts}, key=lambda x: (x in DONE, x))
+        elapsed = time.monotonic() - self.started if self.started else 0
+        upcoming = [self.next_poll[x] - time.monotonic() for x in self.pending()]
+        next_poll = f'next poll in {max(0, min(upcoming)):.0f}s' if upcoming else 'done'
+        table = Table(title=f'{len(self.activations)} activations on {len(self.by_property)} properties',
+                      caption=f'{elapsed:.0f}s elapsed, {self.requests} requests, {next_poll}')
+        table.add_column('network')
+        for status in statuses:
+            table.add_column(status, justify='right')
+        table.add_column('total', justify='right')
+        for network in sorted({network for network, _ in counts}):
+            row = [counts.get((network, status), 0) for status in statuses]
+            table.add_row(network, *[str(x) for x in row], str(sum(row)))
+        return table
+
+
+if __name__ == '__main__':
+    pass
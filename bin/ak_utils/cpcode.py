@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from ak_api import circuit
 from ak_api.cpcode import CpCode
 
 
@@ -25,6 +26,8 @@ class CpCodeWrapper(CpCode):
         status, json_output = super().get_cpcode(cpcode)
         if status == 200:
             return json_output['cpcodeName']
+        elif circuit.is_open(json_output):
+            return 'ERROR_CIRCUIT_OPEN'
         else:
             return ''
 
@@ -1,17 +1,28 @@
 from __future__ import annotations
 
-import concurrent.futures
+import asyncio
 import copy
 import json
 import logging
 import re
+import threading
 import time
+from collections import Counter
+from collections import defaultdict
+from collections.abc import Iterator
 from pathlib import Path
 from time import perf_counter
 
+import httpx
 import numpy as np
 import pandas as pd
+import requests
+from ak_api import version_cache
+from ak_api.papi import AsyncPapi
+from ak_api.papi import BULK_ACTIVATION_POLL
+from ak_api.papi import BULK_ACTIVATION_TIMEOUT
 from ak_api.papi import Papi
+from ak_api.papi import activation_batches
 from pandarallel import pandarallel
 from rich import print_json
 from rich.console import Console
@@ -20,12 +31,87 @@ from utils import dataframe
 from utils import files
 
 
+# --behavior audits which read option values, they need the ruletrees
+VALUE_BEHAVIORS = ['origin', 'siteshield', 'sureroute', 'custombehavior', 'cpcode']
+
+_group_lock = threading.Lock()
+_group_indexes: dict[str | None, GroupIndex] = {}
+
+
+class GroupIndex:
+    '''
+    Group list of an account loaded once per run, lookups by groupId in O(1)
+    '''
+    def __init__(self, groups: list):
+        self.groups = groups
+        self.by_id = {int(x['groupId']): x for x in groups}
+        self.children = defaultdict(list)
+        for group in groups:
+            self.children[self.parent(group['groupId'])].append(int(group['groupId']))
+        self._paths: dict[int, str] = {}
+
+    def __contains__(self, group_id) -> bool:
+        return int(group_id) in self.by_id
+
+    def get(self, group_id) -> dict:
+        return self.by_id.get(int(group_id), {})
+
+    def name(self, group_id) -> str:
+        return self.get(group_id).get('groupName', '')
+
+    def contracts(self, group_id) -> list:
+        return self.get(group_id).get('contractIds', [])
+
+    def parent(self, group_id) -> int | None:
+        parent = self.get(group_id).get('parentGroupId')
+        return int(parent) if parent else None
+
+    def child_ids(self, group_id) -> list:
+        return self.children.get(int(group_id), [])
+
+    def top_ids(self) -> list:
+        return self.children.get(None, [])
+
+    def ancestors(self, group_id) -> list:
+        '''
+        groupIds from the top group down to the parent of group_id
+        '''
+        ancestors = []
+        parent = self.parent(group_id)
+        while parent is not None and parent in self.by_id and parent not in ancestors and parent != int(group_id):
+            ancestors.append(parent)
+            parent = self.parent(parent)
+        return ancestors[::-1]
+
+    def path(self, group_id) -> str:
+        '''
+        group names from the top group, ie. 'Account > Division > Team'
+        '''
+        group_id = int(group_id)
+        if group_id not in self._paths:
+            self._paths[group_id] = ' > '.join(self.name(x) for x in self.ancestors(group_id) + [group_id])
+        return self._paths[group_id]
+
+
 class PapiWrapper(Papi):
     def __init__(self, account_switch_key: str | None = None, logger: logging.Logger = None):
         super().__init__()
         self.account_switch_key = account_switch_key
         self.logger = logger
 
+    @property
+    def group_index(self) -> GroupIndex | None:
+        '''
+        Shared by every PapiWrapper of the account, None when the group list cannot be loaded
+        '''
+        with _group_lock:
+            if self.account_switch_key not in _group_indexes:
+                status, groups = super().get_groups()
+                if status != 200:
+                    return None
+                _group_indexes[self.account_switch_key] = GroupIndex(groups)
+            return _group_indexes[self.account_switch_key]
+
     def get_contracts(self):
         contracts = super().get_contracts()
         df = pd.DataFrame(contracts)
@@ -44,22 +130,14 @@ class PapiWrapper(Papi):
 
     def create_groups_dataframe(self, groups: list) -> pd.dataframe:
         df = pd.DataFrame(groups)
-        df['path'] = df.apply(lambda row: self.build_path(row, groups), axis=1)
+        index = GroupIndex(groups)
+        df['path'] = [index.path(x) for x in df['groupId']]
         df['level'] = df['path'].str.count('>')
         max_levels = df['level'].max() + 1
         for level in range(max_levels):
             df[f'L{level}'] = df['path'].apply(lambda x: self.get_level_value(x, level))
         return df
 
-    def build_path(self, row, groups: list) -> str:
-        path = row['groupName']
-        parent_group_id = row.get('parentGroupId')
-        while parent_group_id and parent_group_id in [group['groupId'] for group in groups]:
-            parent_group = next(group for group in groups if group['groupId'] == parent_group_id)
-            path = f"{parent_group['groupName']} > {path}"
-            parent_group_id = parent_group.get('parentGroupId')
-        return path
-
     def update_path(self, df, row, column_name):
         '''
         Function to update the path based on contractId
@@ -116,10 +194,9 @@ class PapiWrapper(Papi):
             return ''
 
     def get_top_groups(self) -> tuple:
-        status, groups = super().get_groups()
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df = df[df['parentGroupId'].isnull()]  # group with empty parent
+        index = self.group_index
+        if index is not None:
+            df = pd.DataFrame([index.get(x) for x in index.top_ids()], columns=pd.DataFrame(index.groups).columns)
             df['groupname'] = df['groupName'].str.lower()
             df.sort_values(by=['parentGroupId', 'groupname'], inplace=True, na_position='first')
             df = df.reset_index(drop=True)
@@ -132,17 +209,16 @@ class PapiWrapper(Papi):
         return groups, df
 
     def get_all_groups(self):
-        return super().get_groups()
+        index = self.group_index
+        return (200, index.groups) if index is not None else super().get_groups()
 
     def get_groups(self) -> tuple:
-        status, groups = super().get_groups()
-        if status == 200:
-            df = pd.DataFrame(groups)
+        index = self.group_index
+        if index is not None:
+            df = pd.DataFrame(index.groups)
             df = df[~df['parentGroupId'].isnull()]  # group with parent
-            df['groupname'] = df['groupName'].str.lower()
             df.sort_values(by=['parentGroupId', 'groupId'], inplace=True, na_position='first')
             df.reset_index(inplace=True, drop=True)
-            df.drop(['groupname'], axis=1, inplace=True)
             groups = df['groupId'].unique()
             self.logger.debug(groups)
         else:
@@ -151,88 +227,53 @@ class PapiWrapper(Papi):
         return groups, df
 
     def get_group_name(self, group_id: int) -> str:
-        status, groups = super().get_groups()
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df['groupId'] = df['groupId'].astype(int)
-            df = df[df['groupId'] == group_id]
-            self.logger.debug(f'Group Detail\n{df}')
-            try:
-                group_name = df['groupName'].values[0]
-            except:
-                group_name = ''
-            return group_name
+        index = self.group_index
+        if index is not None:
+            return index.name(group_id)
 
     def get_group_contract_id(self, group_id: int) -> list:
-        status, groups = super().get_groups()
-        contract_id = []
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df.sort_values(by=['groupId'], inplace=True)
-            # df['groupId'] = df['groupId'].astype(int)
-            df = df[df['groupId'] == str(group_id)]
-            self.logger.debug(f'Group Detail\n{df}')
-            try:
-                contract_id = df['contractIds'].values.tolist()[0]
-            except:
-                contract_id = []
-
-        return contract_id
+        index = self.group_index
+        return index.contracts(group_id) if index is not None else []
 
     def get_parent_group_id(self, group_id: int) -> int:
         '''
         sample
         df['parentGroupId'] = df[['groupId']].parallel_apply(lambda x: papi.get_parent_group_id(*x), axis=1)
         '''
-        status, groups = super().get_groups()
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df['groupId'] = df['groupId'].astype(int)
-            df = df[df['groupId'] == group_id]
-            try:
-                parent_group_id = df['parentGroupId'].values[0]
-            except:
-                parent_group_id = None
-            return parent_group_id
+        index = self.group_index
+        if index is not None:
+            return index.get(group_id).get('parentGroupId')
 
     def get_child_group_id(self, parent_group_id: int) -> list:
-        status, groups = super().get_groups()
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df['groupId'] = df['groupId'].astype(int)
-            df = df[df['parentGroupId'] == str(parent_group_id)]
-            try:
-                child_group_id = df['groupId'].values.tolist()
-            except:
-                child_group_id = None
-            return child_group_id
+        index = self.group_index
+        if index is not None:
+            return index.child_ids(parent_group_id)
 
     def get_child_groups(self, parent_group_id: int) -> list:
-        status, groups = super().get_groups()
-
-        if status == 200:
-            df = pd.DataFrame(groups)
-            df = df[df['parentGroupId'] == str(parent_group_id)]
-            childs = df['groupName'].values.tolist()
-            return childs
+        index = self.group_index
+        if index is not None:
+            return [index.name(x) for x in index.child_ids(parent_group_id)]
 
     def get_properties_count_in_group(self, group_id: int, contract_id: str) -> int:
-        properties = self.get_propertyname_per_group(group_id, contract_id)
-        return len(properties)
+        return sum(1 for _ in self.iter_group_properties(group_id, contract_id))
+
+    def iter_group_properties(self, group_id: int, contract_id: str) -> Iterator[dict]:
+        '''
+        Properties of a group, none when the group cannot be listed (no access, unknown group ...)
+        so one group does not stop an account wide report
+        '''
+        try:
+            yield from super().iter_properties_per_group(group_id, contract_id)
+        except requests.HTTPError as err:
+            self.logger.error(f'{group_id=} {contract_id=} properties not listed {err.response.status_code}')
 
     def get_propertyname_per_group(self, group_id: int, contract_id: str) -> list:
         self.logger.debug(f'{group_id=} {contract_id=}')
-        properties_json = super().get_propertyname_per_group(group_id, contract_id)
-        property_df = pd.DataFrame(properties_json)
-        properties = []
-        if not property_df.empty:
-            properties = property_df['propertyName'].values.tolist()
-        return properties
+        return [x['propertyName'] for x in self.iter_group_properties(group_id, contract_id)]
 
     def get_properties_detail_per_group(self, group_id: int, contract_id: str) -> pd.DataFrame:
         self.logger.debug(f'{group_id=} {contract_id=}')
-        properties_json = super().get_propertyname_per_group(group_id, contract_id)
-        property_df = pd.DataFrame(properties_json)
+        property_df = pd.DataFrame.from_records(self.iter_group_properties(group_id, contract_id))
         if not property_df.empty:
             property_df = property_df.sort_values(by='propertyName')
             self.logger.debug(property_df)
@@ -252,7 +293,7 @@ class PapiWrapper(Papi):
                     count = 0
                     for i, contract_id in enumerate(contracts, 1):
                         self.logger.debug(f'{group_name} {group_id} {contract_id}')
-                        properties = super().get_propertyname_per_group(group_id, contract_id)
+                        properties = list(self.iter_group_properties(group_id, contract_id))
                         count += len(properties)
 
                         if not bool(properties):
@@ -529,7 +570,7 @@ class PapiWrapper(Papi):
                     account_properties.append(properties)
         return account_properties
 
-    def property_summary(self, df: pd.DataFrame, concurrency: int | None = 1) -> list:
+    def property_summary(self, df: pd.DataFrame, concurrency: int | None = None) -> list:
         account_properties = []
 
         def process_row(row):
@@ -544,40 +585,63 @@ class PapiWrapper(Papi):
                 if not properties.empty:
                     properties['propertyId'] = properties['propertyId'].astype('Int64')
                     properties['groupName'] = row['groupName']
-
-                    # with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-                    with concurrent.futures.ProcessPoolExecutor(max_workers=concurrency) as executor:
-                        # 'collecting hostname'
-                        properties['hostname'] = list(executor.map(self.get_property_hostnames, properties['propertyId']))
-                        properties['hostname_count'] = properties['hostname'].str.len()
-                        time.sleep(3)
-
-                        # 'collecting productId'
-                        properties['productId'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['productionVersion'].fillna(properties['latestVersion']),
-                                                                    ['productId'] * len(properties)))
-
-                        # 'collecting ruleFormat'
-                        properties['ruleFormat'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['productionVersion'].fillna(properties['latestVersion']),
-                                                                    ['ruleFormat'] * len(properties)))
-                        time.sleep(3)
-
-                        # 'collecting property url'
-                        properties['propertyURL'] = list(executor.map(self.property_url, properties['assetId'], properties['groupId']))
-                        properties['url'] = list(executor.map(files.make_xlsx_hyperlink_to_external_link,
-                                                              properties['propertyURL'], properties['propertyName']))
-
-                        # 'collecting updatedDate'
-                        properties['updatedDate'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['latestVersion'],
-                                                                    ['updatedDate'] * len(properties)))
-                        time.sleep(3)
-
                     account_properties.append(properties)
         df.apply(process_row, axis=1)
+
+        # one event loop for the whole account instead of a process pool per group
+        if account_properties:
+            asyncio.run(self.collect_properties_detail(account_properties, concurrency))
         return account_properties
 
+    async def collect_properties_detail(self, account_properties: list, concurrency: int | None = None) -> None:
+        async with AsyncPapi(account_switch_key=self.account_switch_key, max_in_flight=concurrency,
+                             logger=self.logger) as papi:
+            tasks, property_ids = [], []
+            for properties in account_properties:
+                versions = properties['productionVersion'].fillna(properties['latestVersion'])
+                for property_id, version, latest in zip(properties['propertyId'], versions, properties['latestVersion']):
+                    tasks.append(self._property_detail(papi, int(property_id), int(version), int(latest)))
+                    property_ids.append(int(property_id))
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        for i, (property_id, result) in enumerate(zip(property_ids, results)):
+            if isinstance(result, Exception):
+                # the marker version_value() leaves when a detail cannot be read
+                self.logger.error(f'{property_id=} detail not collected {result!r}')
+                results[i] = {'hostname': [], 'productId': property_id, 'ruleFormat': property_id, 'updatedDate': property_id}
+
+        start = 0
+        for properties in account_properties:
+            rows = results[start:start + len(properties)]
+            start += len(properties)
+            properties['hostname'] = [row['hostname'] for row in rows]
+            properties['hostname_count'] = properties['hostname'].str.len()
+            properties['productId'] = [row['productId'] for row in rows]
+            properties['ruleFormat'] = [row['ruleFormat'] for row in rows]
+            properties['propertyURL'] = list(map(self.property_url, properties['assetId'], properties['groupId']))
+            properties['url'] = list(map(files.make_xlsx_hyperlink_to_external_link,
+                                         properties['propertyURL'], properties['propertyName']))
+            properties['updatedDate'] = [row['updatedDate'] for row in rows]
+
+    async def _property_detail(self, papi: AsyncPapi, property_id: int, version: int, latest: int) -> dict:
+        def version_value(detail: dict, dict_key: str):
+            try:
+                return detail['versions']['items'][0][dict_key]
+            except:
+                return property_id
+
+        hostnames, (_, detail) = await asyncio.gather(papi.get_property_hostnames(property_id),
+                                                      papi.get_property_version_detail(property_id, version))
+        if latest == version:
+            latest_detail = detail
+        else:
+            _, latest_detail = await papi.get_property_version_detail(property_id, latest)
+
+        cnames = [] if not isinstance(hostnames, list) else [x['cnameFrom'] for x in hostnames if 'cnameFrom' in x]
+        return {'hostname': list(dict.fromkeys(cnames)),
+                'productId': version_value(detail, 'productId'),
+                'ruleFormat': version_value(detail, 'ruleFormat'),
+                'updatedDate': version_value(latest_detail, 'updatedDate')}
+
     # RULETREE
     def get_properties_ruletree_digest(self, property_id: int, version: int):
         '''
@@ -595,8 +659,34 @@ class PapiWrapper(Papi):
         if status == 200:
             return ruletree
         else:
-            self.logger.error(f'{property_id=} {version=}')
-            return 'XXX'
+            self.logger.error(f'{property_id=} {version=} {status}')
+            return {'rules': {}}
+
+    def get_property_ruletrees(self, df: pd.DataFrame, concurrency: int | None = None) -> list:
+        '''
+        sample
+        df['ruletree'] = papi.get_property_ruletrees(df, concurrency)
+        '''
+        versions = df['productionVersion'].where(pd.notnull(df['productionVersion']), df['latestVersion'])
+        properties = [(int(property_id), int(version)) for property_id, version in zip(df['propertyId'], versions)]
+        return asyncio.run(self._collect_ruletrees(properties, concurrency))
+
+    async def _collect_ruletrees(self, properties: list, concurrency: int | None = None) -> list:
+        async with AsyncPapi(account_switch_key=self.account_switch_key, max_in_flight=concurrency,
+                             logger=self.logger) as papi:
+            responses = await asyncio.gather(*[papi.property_ruletree(property_id, version)
+                                               for property_id, version in properties], return_exceptions=True)
+        ruletrees = []
+        for (property_id, version), response in zip(properties, responses):
+            if isinstance(response, Exception):
+                self.logger.error(f'{property_id=} {version=} {response!r}')
+                ruletrees.append({'rules': {}})
+            elif response[0] == 200:
+                ruletrees.append(response[1])
+            else:
+                self.logger.error(f'{property_id=} {version=} {response[0]}')
+                ruletrees.append({'rules': {}})
+        return ruletrees
 
     def get_property_behavior(self, data: dict) -> list:
         behavior_names = []
@@ -814,7 +904,37 @@ class PapiWrapper(Papi):
             else:
                 return value
 
-    def check_behavior(self, behaviors: list, df: pd.DataFrame, cpcode):
+    def bulk_behavior_counts(self, behaviors: list, df: pd.DataFrame) -> dict:
+        '''
+        Occurrences of each behavior in the audited version of each property, one bulk search per behavior,
+        all submitted before waiting. None for a behavior the search could not answer, count it from the ruletrees
+        '''
+        submitted = {}
+        for behavior in behaviors:
+            status, bulk_search_id = (None, None)
+            if re.fullmatch(r'\w+', behavior):
+                status, bulk_search_id = self.submit_bulk_search(f'$..behaviors[?(@.name =~ /^{behavior}$/i)]')
+            submitted[behavior] = bulk_search_id if status == 202 else None
+
+        versions = df['productionVersion'].where(pd.notnull(df['productionVersion']), df['latestVersion'])
+        audited = [(int(property_id), int(version)) for property_id, version in zip(df['propertyId'], versions)]
+        counts = {}
+        for behavior, bulk_search_id in submitted.items():
+            status, matches = self.wait_bulk_search(bulk_search_id) if bulk_search_id else (None, None)
+            if status != 200:
+                self.logger.warning(f'{behavior} bulk search not available, counting from ruletrees')
+                counts[behavior] = None
+            else:
+                found = Counter((x['propertyId'], x['propertyVersion']) for x in matches)
+                counts[behavior] = [found.get(x, 0) for x in audited]
+        return counts
+
+    def check_behavior(self, behaviors: list, df: pd.DataFrame, cpcode, concurrency: int | None = None):
+        # count audits are answered by bulk search, ruletrees are downloaded for value audits or as fallback
+        counts = self.bulk_behavior_counts([x for x in behaviors if x not in VALUE_BEHAVIORS], df)
+        if 'ruletree' not in df.columns and (set(behaviors) & set(VALUE_BEHAVIORS) or None in counts.values()):
+            df['ruletree'] = self.get_property_ruletrees(df, concurrency)
+
         for behavior in behaviors:
             self.logger.debug(behavior)
             if behavior == 'origin':
@@ -825,7 +945,7 @@ class PapiWrapper(Papi):
                 df[behavior] = df.parallel_apply(lambda row: self.siteshield_value(row['propertyName'], row['ruletree']['rules']), axis=1)
                 df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
             elif behavior == 'sureroute':
-                df[behavior] = df.parallel_apply(lambda row: self.sureroute_value_value(row['propertyName'], row['ruletree']['rules']), axis=1)
+                df[behavior] = df.parallel_apply(lambda row: self.sureroute_value(row['propertyName'], row['ruletree']['rules']), axis=1)
                 df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
             elif behavior == 'custombehavior':
                 try:
@@ -841,6 +961,8 @@ class PapiWrapper(Papi):
                     lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
                 df['cpcode_name'] = df[['cpcode_name']].parallel_apply(
                     lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
+            elif counts[behavior] is not None:
+                df[behavior] = counts[behavior]
             else:
                 df[behavior] = df.parallel_apply(
                     lambda row: self.behavior_count(row['propertyName'],
@@ -977,14 +1099,89 @@ class PapiWrapper(Papi):
         if activation_id > 0 and version > 0:
             status, response = super().activation_status(property_id, activation_id)
             self.logger.debug(f'{activation_id=} {version=} {property_id=} {status}')
-            df = pd.DataFrame(response)
-            self.logger.debug(f'BEFORE\n{df}')
-            df = df[df['propertyVersion'] == version].copy()
-            self.logger.debug(f'FILTERED\n{df}')
-            return df.status.values[0]
+            item = next((x for x in response if x['propertyVersion'] == version), None) if status == 200 else None
+            return item['status'] if item else ' '
         else:
             return ' '
 
+    def bulk_activate(self, activations: list, emails: list, concurrency: int | None = None,
+                      timeout: float = BULK_ACTIVATION_TIMEOUT) -> pd.DataFrame:
+        '''
+        activations [{'propertyId': 123, 'propertyVersion': 5, 'network': 'staging', 'note': '...'}]
+        submitted in batches within the API limits, all at once, then followed until every batch has created
+        its activations, ActivationTracker follows them to ACTIVE. One row per activation with bulkActivationId, activationId, activationStatus, taskStatus and fatalError
+        '''
+        batches = activation_batches(activations)
+        self.logger.warning(f'{len(activations)} activations in {len(batches)} bulk requests')
+        rows = asyncio.run(self._bulk_activate(batches, emails, concurrency, timeout))
+        return pd.DataFrame(rows)
+
+    async def _bulk_activate(self, batches: list, emails: list, concurrency: int | None, timeout: float) -> list:
+        async with AsyncPapi(account_switch_key=self.account_switch_key, max_in_flight=concurrency,
+                             logger=self.logger) as papi:
+            # one failed submit must not lose the ids of the batches the server accepted
+            submitted = await asyncio.gather(*[papi.bulk_activate_properties(x, emails) for x in batches],
+                                             return_exceptions=True)
+            results = await asyncio.gather(*[self._track_bulk_activation(papi, batch, response, timeout)
+                                             for batch, response in zip(batches, submitted)])
+        return [row for rows in results for row in rows]
+
+    async def _track_bulk_activation(self, papi: AsyncPapi, batch: list, submitted: tuple | BaseException,
+                                     timeout: float) -> list:
+        if isinstance(submitted, BaseException):
+            # activation is not idempotent, the POST may have gone through without its answer reaching us
+            self.logger.error(f'bulk activation of {len(batch)} versions, no answer {submitted!r}, '
+                              'check the activations of these properties before submitting again')
+            return [{**x, 'bulkActivationId': None, 'activationId': None, 'activationStatus': None,
+                     'taskStatus': 'UNKNOWN', 'fatalError': repr(submitted)} for x in batch]
+
+        status, bulk_activation_id = submitted
+        if status != 202:
+            detail = bulk_activation_id.get('detail', bulk_activation_id) if isinstance(bulk_activation_id, dict) else bulk_activation_id
+            self.logger.error(f'bulk activation of {len(batch)} versions rejected {status} {detail}')
+            return [{**x, 'bulkActivationId': None, 'activationId': None, 'activationStatus': None,
+                     'taskStatus': 'REJECTED', 'fatalError': detail} for x in batch]
+
+        deadline = time.monotonic() + timeout
+        interval = BULK_ACTIVATION_POLL[0]
+        job, progress = {}, None
+        while True:
+            try:
+                status, response = await papi.get_bulk_activation(bulk_activation_id)
+            except httpx.HTTPError as err:
+                status, response = None, repr(err)  # the job is accepted, keep following it until timeout
+            if status == 200:
+                job = response
+                items = job.get('activatePropertyVersions', [])
+                current = (job['bulkActivationStatus'], Counter(x.get('activationStatus') or x.get('taskStatus') for x in items))
+                if current != progress:
+                    progress = current
+                    counts = ', '.join(f'{v} {k}' for k, v in sorted(current[1].items(), key=lambda x: str(x[0])))
+                    self.logger.info(f'bulk activation {bulk_activation_id:<10} {current[0]:<12} {counts}')
+                if job['bulkActivationStatus'] == 'COMPLETE':
+                    break
+            else:
+                self.logger.error(f'bulk activation {bulk_activation_id} {status} {response}')
+            if time.monotonic() + interval > deadline:
+                self.logger.error(f'bulk activation {bulk_activation_id} still {job.get("bulkActivationStatus")} after {timeout}s')
+                break
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, BULK_ACTIVATION_POLL[1])
+
+        # a property is only once per network in a batch
+        items = {(version_cache.property_key(x['propertyId']), x['network'].upper()): x
+                 for x in job.get('activatePropertyVersions', [])}
+        rows = []
+        for activation in batch:
+            item = items.get((version_cache.property_key(activation['propertyId']), activation['network'].upper()), {})
+            rows.append({**activation,
+                         'bulkActivationId': bulk_activation_id,
+                         'activationId': item.get('activationId'),
+                         'activationStatus': item.get('activationStatus'),
+                         'taskStatus': item.get('taskStatus', job.get('bulkActivationStatus')),
+                         'fatalError': item.get('fatalError')})
+        return rows
+
     # CUSTOM BEHAVIOR
     def list_custom_behaviors(self):
         return super().list_custom_behaviors()
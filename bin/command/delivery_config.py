@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 from ak_api.identity_access import IdentityAccessManagement
 from ak_utils import cpcode as cp
+from ak_utils.activation import ActivationTracker
 from ak_utils import papi as p
 from ak_utils import siteshield as ss
 from pandarallel import pandarallel
@@ -64,8 +65,9 @@ def main(args, logger):
 
         properties_df = pd.DataFrame(all_properties, columns=['accountId', 'contractId', 'groupId', 'propertyName', 'propertyId', 'stagingVersion', 'productionVersion'])
         properties_df['groupName'] = properties_df['groupId'].apply(lambda x: papi.get_group_name(x))
-        properties_df['latestVersion'] = properties_df['propertyId'].apply(lambda x: papi.get_property_version_latest(x)['latestVersion'])
-        properties_df['assetId'] = properties_df['propertyId'].apply(lambda x: papi.get_property_version_latest(x)['assetId'])
+        latest = properties_df['propertyId'].apply(papi.get_property_version_latest)
+        properties_df['latestVersion'] = latest.apply(lambda x: x['latestVersion'])
+        properties_df['assetId'] = latest.apply(lambda x: x['assetId'])
 
         logger.debug('Collecting hostname')
         properties_df['hostname'] = properties_df[['propertyId']].apply(lambda x: papi.get_property_hostnames(*x), axis=1)
@@ -92,14 +94,11 @@ def main(args, logger):
         properties_df = properties_df.rename(columns={'url': 'propertyName(hyperlink)'})  # show column with hyperlink instead
         properties_df = properties_df.rename(columns={'groupName_url': 'groupName'})  # show column with hyperlink instead
         properties_df = properties_df.sort_values(by=['groupName', 'propertyName'])
-        properties_df['ruletree'] = properties_df.apply(
-                        lambda row: papi.get_property_ruletree(row['propertyId'], int(row['productionVersion'])
-                                                            if pd.notnull(row['productionVersion']) else row['latestVersion']), axis=1)
         # properties.loc[pd.notnull(properties['cpcode_unique_value']) & (properties['cpcode_unique_value'] == ''), 'cpcode'] = '0'
 
         if args.behavior:
             pandarallel.initialize(progress_bar=False, verbose=0)
-            properties_df = papi.check_behavior(original_behaviors, properties_df, cpc)
+            properties_df = papi.check_behavior(original_behaviors, properties_df, cpc, concurrency)
 
         # columns = ['accountId', 'groupId', 'groupName',
         columns = ['propertyName', 'propertyId', 'latestVersion', 'stagingVersion', 'productionVersion',
@@ -182,11 +181,6 @@ def main(args, logger):
                 account_properties = papi.property_summary(group_df, concurrency)
                 if len(account_properties) > 0:
                     df = pd.concat(account_properties, axis=0)
-                    df['ruletree'] = df.parallel_apply(
-                        lambda row: papi.get_property_ruletree(int(row['propertyId']),
-                                                                int(row['productionVersion'])
-                                                                if pd.notnull(row['productionVersion'])
-                                                                else row['latestVersion']), axis=1)
                     df = df.rename(columns={'url': 'propertyName(hyperlink)'})  # show column with hyperlink instead
                     df = df.rename(columns={'groupName_url': 'groupName'})  # show column with hyperlink instead
                     df = df.sort_values(by=['groupName', 'propertyName'])
@@ -196,13 +190,13 @@ def main(args, logger):
 
                     columns = ['accountId', 'groupId', 'groupName', 'propertyName', 'propertyId',
                                'latestVersion', 'stagingVersion', 'productionVersion', 'updatedDate',
-                               'productId', 'ruleFormat', 'hostname_count', 'hostname', 'ruletree']
+                               'productId', 'ruleFormat', 'hostname_count', 'hostname']
 
                     if args.behavior:
                         print()
                         logger.critical('collecting behavior ...')
                         t0 = perf_counter()
-                        df = papi.check_behavior(original_behaviors, df, cpc)
+                        df = papi.check_behavior(original_behaviors, df, cpc, concurrency)
                         columns.extend(sorted(original_behaviors))
                         if 'cpcode' in original_behaviors:
                             columns.remove('cpcode')
@@ -216,12 +210,11 @@ def main(args, logger):
 
                     columns.extend(['propertyName(hyperlink)'])
                     df['propertyId'] = df['propertyId'].astype(str)  # for excel format
-                    df = df[columns].copy()
+                    df = df[columns + (['ruletree'] if 'ruletree' in df.columns else [])].copy()
                     df = df.reset_index(drop=True)
                     df['hostname'] = df[['hostname']].parallel_apply(lambda x: dataframe.split_elements_newline(x[0])
                                                         if len(x[0]) > 0 else '', axis=1)
 
-                    columns.remove('ruletree')
                     properties_df = df[columns]
                     sheet['properties'] = properties_df
 
@@ -252,7 +245,8 @@ def main(args, logger):
 
     files.write_xlsx(filepath, sheet, freeze_column=1) if not properties_df.empty else None
     files.open_excel_application(filepath, args.show, properties_df)
-    columns.append('ruletree')
+    if 'ruletree' in df.columns:
+        columns.append('ruletree')
     properties_with_ruletree_df = df[columns]
     return properties_with_ruletree_df
 
@@ -478,6 +472,98 @@ def get_custom_behavior(args, logger):
                 logger.warning('remove --hidexml to show XML')
 
 
+def activate(args, logger):
+    '''
+    python bin/ak-utility.py -a 1-5BYUG1 delivery-config activate \
+        --property-version 123456:5 234567:12 --network staging production \
+        --email me@example.com --note "JIRA-1234 origin change"
+
+    or the versions from the stagingVersion/productionVersion columns of an excel with a propertyId column
+    python bin/ak-utility.py -a 1-5BYUG1 delivery-config activate --input output/activate.xlsx --network production --email me@example.com
+    '''
+    papi = p.PapiWrapper(account_switch_key=args.account_switch_key, logger=logger)
+    concurrency = int(args.concurrency) if args.concurrency else None
+    networks = [x.lower() for x in args.network]
+
+    activations = []
+    if args.input:
+        df = pd.read_excel(args.input, sheet_name=0, index_col=None)
+        columns = ['propertyId'] + [f'{network}Version' for network in networks]
+        if not set(columns).issubset(df.columns):
+            sys.exit(logger.error(f'{args.input} needs {", ".join(columns)} columns'))
+        for row in df.to_dict('records'):
+            property_id = int(str(row['propertyId']).removeprefix('prp_'))
+            for network in networks:
+                version = row[f'{network}Version']
+                if pd.isna(version):
+                    # ie. a property never activated on production
+                    logger.warning(f"{property_id} {row.get('propertyName', '')} has no {network}Version, skipped")
+                    continue
+                activations.append({'propertyId': property_id,
+                                    'propertyName': row.get('propertyName'),
+                                    'propertyVersion': int(version),
+                                    'network': network,
+                                    'note': args.note})
+    for value in args.property_version or []:
+        property_id, _, version = value.partition(':')
+        property_id = property_id.removeprefix('prp_')
+        if not property_id.isdigit() or not version.isdigit():
+            sys.exit(logger.error(f'{value} is not propertyId:version'))
+        activations.extend({'propertyId': int(property_id),
+                            'propertyVersion': int(version),
+                            'network': network,
+                            'note': args.note} for network in networks)
+    if not activations:
+        sys.exit(logger.error('Please provide --property-version or --input'))
+
+    unique = {(x['propertyId'], x['network']): x for x in activations}
+    if len(unique) < len(activations):
+        logger.warning(f'{len(activations) - len(unique)} duplicate property and network, the last version is activated')
+
+    df = papi.bulk_activate(list(unique.values()), args.email, concurrency)
+    if not args.no_wait:
+        tracker = ActivationTracker(account_switch_key=args.account_switch_key, concurrency=concurrency, logger=logger)
+        for row in df[df['activationId'].notnull()].to_dict('records'):
+            tracker.add(row['propertyId'], row['activationId'], row['network'], row.get('propertyName'), row['propertyVersion'])
+        tracked = tracker.run().set_index('activationId')
+        df['activationStatus'] = [tracked['status'].get(str(x), status) if x else status
+                                  for x, status in zip(df['activationId'], df['activationStatus'])]
+    show_activations(df, ['propertyId', 'propertyName', 'propertyVersion', 'network', 'bulkActivationId', 'activationId',
+                          'activationStatus', 'taskStatus', 'fatalError'], args.output, logger)
+    return df
+
+
+def activation_status(args, logger):
+    '''
+    python bin/ak-utility.py -a 1-5BYUG1 delivery-config activation-status --property-activation 123456:8765432 234567:8765499
+
+    or the propertyId and activationId columns of an excel, ie. saved by activate --output
+    python bin/ak-utility.py -a 1-5BYUG1 delivery-config activation-status --input output/activation.xlsx
+    '''
+    concurrency = int(args.concurrency) if args.concurrency else None
+    tracker = ActivationTracker(account_switch_key=args.account_switch_key, concurrency=concurrency, logger=logger)
+    if args.input:
+        df = pd.read_excel(args.input, index_col=None)
+        if not {'propertyId', 'activationId'}.issubset(df.columns):
+            sys.exit(logger.error(f'{args.input} needs propertyId and activationId columns'))
+        df = df[df['activationId'].notnull()].astype({'propertyId': int, 'activationId': int})
+        for row in df.to_dict('records'):
+            tracker.add(row['propertyId'], row['activationId'], property_name=row.get('propertyName'))
+    for value in args.property_activation or []:
+        property_id, _, activation_id = value.partition(':')
+        if not activation_id:
+            sys.exit(logger.error(f'{value} is not propertyId:activationId'))
+        tracker.add(property_id, activation_id)
+    if not tracker.activations:
+        sys.exit(logger.error('Please provide --property-activation or --input'))
+
+    df = tracker.run()
+    show_activations(df.rename(columns={'status': 'activationStatus'}),
+                     ['propertyId', 'propertyName', 'propertyVersion', 'network', 'activationId', 'activationStatus',
+                      'submitDate', 'updateDate'], args.output, logger)
+    return df
+
+
 # BEGIN helper method
 def load_config_from_xlsx(papi, filepath: str, sheet_name: str | None = None, filter: str | None = None, logger=None):
     '''
@@ -502,11 +588,23 @@ def load_config_from_xlsx(papi, filepath: str, sheet_name: str | None = None, fi
     return df[columns]
 
 
+def show_activations(df: pd.DataFrame, columns: list, output: str | None, logger=None) -> None:
+    columns = [x for x in columns if x in df.columns]
+    print()
+    print(tabulate(df[columns], headers=columns, tablefmt='github', showindex=False))
+    failed = df[df['activationStatus'] != 'ACTIVE']
+    if not failed.empty:
+        logger.error(f'{len(failed)} of {len(df)} activations are not ACTIVE')
+    if output:
+        files.write_xlsx(f'output/{output}', {'activation': df[columns]}, freeze_column=1)
+
+
 def add_group_url(df: pd.DataFrame, papi) -> pd.DataFrame:
-    pandarallel.initialize(progress_bar=False, nb_workers=5, verbose=0)
+    # no API call here, building the links in worker processes costs more than it saves
     df['accountId'] = papi.account_switch_key
-    df['groupURL'] = df.parallel_apply(lambda row: papi.group_url(row['groupId']), axis=1)
-    df['groupName_url'] = df.parallel_apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['groupURL'], row['propertyCount']) if row['propertyCount'] else '', axis=1)
+    df['groupURL'] = df['groupId'].map(papi.group_url)
+    df['groupName_url'] = [files.make_xlsx_hyperlink_to_external_link(url, count) if count else ''
+                           for url, count in zip(df['groupURL'], df['propertyCount'])]
     del df['groupURL']
     del df['propertyCount']
     df = df.rename(columns={'groupName_url': 'propertyCount'})  # show column with hyperlink instead
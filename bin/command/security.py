@@ -28,8 +28,7 @@ def list_config(args, logger):
     network = sec.NetworkListWrapper(account_switch_key=args.account_switch_key, logger=logger)
     bot = sec.BotManagerWrapper(account_switch_key=args.account_switch_key, logger=logger)
 
-    _, resp = appsec.list_waf_configs()
-    df = pd.DataFrame(resp)
+    df = pd.DataFrame.from_records(appsec.iter_waf_configs())
     df = df.rename(columns={'id': 'configId', 'name': 'configName'})
     df['groupId'] = df['groupId'].apply(lambda x: str(int(x)) if pd.notna(x) else x)
     df = df.fillna('')
@@ -229,8 +228,7 @@ def audit_hostname(args, logger):
     Path(account_folder).mkdir(parents=True, exist_ok=True)
 
     appsec = sec.AppsecWrapper(account_switch_key=args.account_switch_key, logger=logger)
-    _, resp = appsec.list_waf_configs()
-    df = pd.DataFrame(resp)
+    df = pd.DataFrame.from_records(appsec.iter_waf_configs())
     df = df.rename(columns={'id': 'configId', 'name': 'configName'})
     df = df.sort_values(by=['groupId', 'configName'], na_position='first')
     df = df.reset_index(drop=True)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from time import perf_counter
+
+import pandas as pd
+from ak_api import cassette
+from ak_api.papi import AsyncPapi
+from ak_utils import appsec as sec
+from ak_utils import cpcode as cp
+from ak_utils import papi as p
+from tabulate import tabulate
+from utils import files
+from utils import inventory
+from yaspin import yaspin
+
+
+def main(args, logger):
+    '''
+    python bin/ak-utility.py -a 1-5BYUG1 snapshot
+    python bin/ak-utility.py -a 1-5BYUG1 snapshot --group-id 116576 66711 --concurrency 20
+
+    add --update-snapshot to also save the API responses for --offline
+    '''
+    concurrency = int(args.concurrency) if args.concurrency else None
+    store = inventory.Inventory(cassette.snapshot_directory(args.account_switch_key))
+    papi = p.PapiWrapper(account_switch_key=args.account_switch_key, logger=logger)
+
+    t0 = perf_counter()
+    logger.critical('collecting group structure ...')
+    with yaspin() as sp:
+        allgroups_df, _ = papi.account_group_summary()
+    if allgroups_df is None:
+        sys.exit(logger.error('unable to collect groups'))
+    groups = [group_row(row) for row in allgroups_df.to_dict('records')]
+    if args.group_id:
+        groups = [x for x in groups if str(x['groupId']) in args.group_id]
+    store.replace('groups', groups)
+    lap(logger, 'collecting group structure', t0)
+
+    t0 = perf_counter()
+    logger.critical('collecting properties ...')
+    properties = []
+    for group in groups:
+        if group['propertyCount'] and group['contractId']:
+            properties.extend(papi.iter_properties_per_group(group['groupId'], group['contractId']))
+    properties = list({int(x['propertyId']): x for x in properties}.values())
+    details = asyncio.run(collect_properties(properties, args.account_switch_key, concurrency, logger))
+    store_properties(store, properties, details)
+    lap(logger, f'collecting {len(properties)} properties', t0)
+
+    t0 = perf_counter()
+    logger.critical('collecting custom behaviors, security configs, network lists and cpcodes ...')
+    status, custom_behaviors = papi.list_custom_behaviors()
+    store.replace('custom_behaviors', custom_behaviors if status == 200 else [])
+
+    appsec = sec.AppsecWrapper(account_switch_key=args.account_switch_key, logger=logger)
+    configs = [config_row(x) for x in appsec.iter_waf_configs()]
+    store.replace('security_configs', configs)
+    store.replace('security_hostnames', [{'configId': x['configId'], 'hostname': hostname}
+                                         for x in configs for hostname in x['productionHostnames'] or []])
+
+    network = sec.NetworkListWrapper(account_switch_key=args.account_switch_key, logger=logger)
+    store.replace('network_lists', network.iter_network_lists())
+
+    cpc = cp.CpCodeWrapper(account_switch_key=args.account_switch_key)
+    store.replace('cpcodes', (cpcode_row(x) for x in cpc.iter_cpcodes()))
+    lap(logger, 'collecting account objects', t0)
+
+    print()
+    print(tabulate(store.captures(), headers='keys', tablefmt='github', showindex=False))
+    logger.warning(f'inventory saved to {store.path}')
+    store.close()
+
+
+def query(args, logger):
+    '''
+    python bin/ak-utility.py -a 1-5BYUG1 snapshot query --tables
+    python bin/ak-utility.py -a 1-5BYUG1 snapshot query --sql "SELECT p.propertyName, g.groupName, b.rulePath
+        FROM behaviors b JOIN properties p USING (propertyId) JOIN groups g ON g.groupId = p.groupId
+        WHERE b.name = 'origin' AND json_extract(b.options, '$.hostname') LIKE 'origin.%'"
+    '''
+    store = inventory.Inventory(cassette.snapshot_directory(args.account_switch_key))
+    if not store.exists():
+        sys.exit(logger.error(f'{store.path} not found, capture it first with the snapshot command'))
+    if store.captured('ruletrees') and not store.captured('behaviors'):
+        logger.warning('indexing behaviors and criteria of the captured ruletrees')
+        store.index_rules()
+
+    if args.tables or not args.sql:
+        tables = [(table, store.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0], ', '.join(columns))
+                  for table, columns in store.tables().items()]
+        print(tabulate(tables, headers=['table', 'rows', 'columns'], tablefmt='github'))
+        store.close()
+        return None
+
+    t0 = perf_counter()
+    try:
+        df = store.query(args.sql)
+    except Exception as err:
+        store.close()
+        sys.exit(logger.error(err))
+    elapsed = (perf_counter() - t0) * 1000
+    store.close()
+
+    print(tabulate(df, headers='keys', tablefmt='github', showindex=False))
+    logger.info(f'{len(df)} rows in {elapsed:.1f} ms from {store.path}')
+    if args.output:
+        filepath = f'output/{args.output}'
+        files.write_xlsx(filepath, {'query': df}, freeze_column=1) if not df.empty else None
+    return df
+
+
+def lap(logger, msg: str, t0: float) -> None:
+    logger.critical(f'{msg:<40} finished  {perf_counter() - t0:.2f} seconds')
+
+
+async def collect_properties(properties: list, account_switch_key: str | None,
+                             concurrency: int | None, logger) -> list:
+    async with AsyncPapi(account_switch_key=account_switch_key, max_in_flight=concurrency, logger=logger) as papi:
+        details = await asyncio.gather(*[property_detail(papi, x) for x in properties], return_exceptions=True)
+    for i, (prop, detail) in enumerate(zip(properties, details)):
+        if isinstance(detail, Exception):
+            # one property past its retries loses its row details, not the whole account
+            logger.error(f"{prop['propertyId']} {prop.get('propertyName', '')} not collected {detail!r}")
+            details[i] = {'version': int(prop['productionVersion'] or prop['latestVersion']),
+                          'versions': [], 'hostnames': [], 'rules': None}
+    return details
+
+
+async def property_detail(papi: AsyncPapi, prop: dict) -> dict:
+    '''
+    Version history, hostnames and ruletree of the production version, latest when never activated
+    '''
+    property_id = int(prop['propertyId'])
+    version = int(prop['productionVersion'] or prop['latestVersion'])
+    (_, versions), (_, hostnames), (status, ruletree) = await asyncio.gather(
+        papi.get_property_versions(property_id),
+        papi.get_property_version_hostnames(property_id, version),
+        papi.property_ruletree(property_id, version))
+    return {'version': version,
+            'versions': versions if isinstance(versions, list) else [],
+            'hostnames': hostnames if isinstance(hostnames, list) else [],
+            'rules': ruletree['rules'] if status == 200 else None}
+
+
+def store_properties(store: inventory.Inventory, properties: list, details: list) -> None:
+    property_rows, versions, hostnames, ruletrees = [], [], [], []
+    for prop, detail in zip(properties, details):
+        property_id = int(prop['propertyId'])
+        by_version = {x['propertyVersion']: x for x in detail['versions']}
+        active = by_version.get(detail['version'], {})
+        latest = by_version.get(prop['latestVersion'], {})
+        property_rows.append({**prop,
+                              'propertyId': property_id,
+                              'groupId': int(prop['groupId']),
+                              'productId': active.get('productId'),
+                              'ruleFormat': active.get('ruleFormat'),
+                              'updatedDate': latest.get('updatedDate')})
+        versions.extend({**x, 'propertyId': property_id} for x in detail['versions'])
+        hostnames.extend({**x, 'propertyId': property_id, 'propertyVersion': detail['version']} for x in detail['hostnames'])
+        if detail['rules'] is not None:
+            ruletrees.append({'propertyId': property_id,
+                              'propertyVersion': detail['version'],
+                              'ruleFormat': active.get('ruleFormat'),
+                              'rules': detail['rules']})
+    store.replace('properties', property_rows)
+    store.replace('versions', versions)
+    store.replace('hostnames', hostnames)
+    store.replace('ruletrees', ruletrees)
+    store.index_rules()
+
+
+def group_row(row: dict) -> dict:
+    parent = int(row['parentGroupId']) if str(row.get('parentGroupId', '')).isdigit() else 0
+    return {'groupId': int(row['groupId']),
+            'groupName': row['groupName'],
+            'parentGroupId': parent if parent else None,
+            'contractId': row['contractId'] if isinstance(row['contractId'], str) else '',
+            'path': row['group_structure'],
+            'propertyCount': int(row['propertyCount'])}
+
+
+def config_row(config: dict) -> dict:
+    return {**config,
+            'configId': config['id'],
+            'configName': config['name'],
+            'groupId': int(config['groupId']) if pd.notna(config.get('groupId')) else None,
+            'productionHostnames': config.get('productionHostnames', [])}
+
+
+def cpcode_row(cpcode: dict) -> dict:
+    contracts = cpcode.get('contracts') or [{}]
+    products = cpcode.get('products') or [{}]
+    return {'cpcodeId': int(cpcode['cpcodeId']),
+            'cpcodeName': cpcode.get('cpcodeName'),
+            'contractId': contracts[0].get('contractId'),
+            'groupId': cpcode.get('accessGroup', {}).get('groupId'),
+            'productId': products[0].get('productId'),
+            'productName': products[0].get('productName')}
+
+
+if __name__ == '__main__':
+    pass
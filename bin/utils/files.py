@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import gzip
-import json
 import logging
 import platform
 import re
@@ -12,6 +11,7 @@ from pathlib import Path
 import pandas as pd
 from lxml import etree
 from UliPlot.XLSX import auto_adjust_xlsx_column_width
+from utils import jsonio
 
 
 logger = logging.getLogger(__name__)
@@ -24,8 +24,7 @@ def get_line_count(filename):
 
 
 def write_json(filepath: str, json_object: dict) -> None:
-    with open(filepath, 'w') as f:
-        json.dump(dict(json_object), f, indent=4)
+    jsonio.write(filepath, dict(json_object))
     filepath = Path(f'{filepath}').absolute()
     logger.debug(f'JSON file is saved locally at {str(filepath)}')
 
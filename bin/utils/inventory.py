@@ -0,0 +1,289 @@
+'''
+Local inventory of an account, captured by the snapshot command into snapshots/{account}/inventory.db
+
+One SQLite table per object type, keyed and indexed on the ids and names analyses join on.
+Column names follow the API field names (propertyId, cnameFrom ...). Nested values (ruletree rules,
+production hostnames of a security config) are kept as JSON text, usable with SQLite json_extract.
+Each capture replaces a table whole, the capture table records when and how many rows.
+
+Behaviors and criteria are flattened out of the ruletrees, one row per occurrence with its rule path:
+
+    SELECT p.propertyName, b.rulePath FROM behaviors b JOIN properties p USING (propertyId)
+    WHERE b.name = 'origin' AND json_extract(b.options, '$.hostname') LIKE '%.example.com'
+'''
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import time
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+FILENAME = 'inventory.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS capture (
+    tableName    TEXT PRIMARY KEY,
+    rowCount     INTEGER NOT NULL,
+    capturedAt   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    groupId        INTEGER NOT NULL,
+    groupName      TEXT NOT NULL,
+    parentGroupId  INTEGER,
+    contractId     TEXT NOT NULL DEFAULT '',
+    path           TEXT,
+    propertyCount  INTEGER,
+    PRIMARY KEY (groupId, contractId)
+);
+CREATE INDEX IF NOT EXISTS groups_parent ON groups (parentGroupId);
+CREATE INDEX IF NOT EXISTS groups_name ON groups (groupName);
+
+CREATE TABLE IF NOT EXISTS properties (
+    propertyId         INTEGER PRIMARY KEY,
+    propertyName       TEXT NOT NULL,
+    accountId          TEXT,
+    contractId         TEXT,
+    groupId            INTEGER,
+    assetId            TEXT,
+    latestVersion      INTEGER,
+    stagingVersion     INTEGER,
+    productionVersion  INTEGER,
+    productId          TEXT,
+    ruleFormat         TEXT,
+    updatedDate        TEXT
+);
+CREATE INDEX IF NOT EXISTS properties_name ON properties (propertyName);
+CREATE INDEX IF NOT EXISTS properties_group ON properties (groupId, contractId);
+CREATE INDEX IF NOT EXISTS properties_product ON properties (productId);
+
+CREATE TABLE IF NOT EXISTS versions (
+    propertyId        INTEGER NOT NULL,
+    propertyVersion   INTEGER NOT NULL,
+    updatedByUser     TEXT,
+    updatedDate       TEXT,
+    productionStatus  TEXT,
+    stagingStatus     TEXT,
+    etag              TEXT,
+    productId         TEXT,
+    ruleFormat        TEXT,
+    note              TEXT,
+    PRIMARY KEY (propertyId, propertyVersion)
+);
+CREATE INDEX IF NOT EXISTS versions_updated ON versions (updatedDate);
+
+CREATE TABLE IF NOT EXISTS hostnames (
+    propertyId            INTEGER NOT NULL,
+    propertyVersion       INTEGER NOT NULL,
+    cnameFrom             TEXT NOT NULL,
+    cnameTo               TEXT,
+    cnameType             TEXT,
+    edgeHostnameId        TEXT,
+    certProvisioningType  TEXT
+);
+CREATE INDEX IF NOT EXISTS hostnames_property ON hostnames (propertyId, propertyVersion);
+CREATE INDEX IF NOT EXISTS hostnames_cname_from ON hostnames (cnameFrom);
+CREATE INDEX IF NOT EXISTS hostnames_cname_to ON hostnames (cnameTo);
+
+CREATE TABLE IF NOT EXISTS ruletrees (
+    propertyId       INTEGER NOT NULL,
+    propertyVersion  INTEGER NOT NULL,
+    ruleFormat       TEXT,
+    rules            TEXT NOT NULL,
+    PRIMARY KEY (propertyId, propertyVersion)
+);
+
+CREATE TABLE IF NOT EXISTS behaviors (
+    propertyId       INTEGER NOT NULL,
+    propertyVersion  INTEGER NOT NULL,
+    rulePath         TEXT NOT NULL,
+    ruleName         TEXT,
+    position         INTEGER NOT NULL,
+    name             TEXT NOT NULL,
+    options          TEXT
+);
+CREATE INDEX IF NOT EXISTS behaviors_name ON behaviors (name, propertyId);
+CREATE INDEX IF NOT EXISTS behaviors_property ON behaviors (propertyId, propertyVersion);
+
+CREATE TABLE IF NOT EXISTS criteria (
+    propertyId           INTEGER NOT NULL,
+    propertyVersion      INTEGER NOT NULL,
+    rulePath             TEXT NOT NULL,
+    ruleName             TEXT,
+    position             INTEGER NOT NULL,
+    name                 TEXT NOT NULL,
+    options              TEXT,
+    criteriaMustSatisfy  TEXT
+);
+CREATE INDEX IF NOT EXISTS criteria_name ON criteria (name, propertyId);
+CREATE INDEX IF NOT EXISTS criteria_property ON criteria (propertyId, propertyVersion);
+
+CREATE TABLE IF NOT EXISTS custom_behaviors (
+    behaviorId     TEXT PRIMARY KEY,
+    name           TEXT,
+    displayName    TEXT,
+    description    TEXT,
+    status         TEXT,
+    sharingLevel   TEXT,
+    updatedDate    TEXT,
+    xml            TEXT
+);
+CREATE INDEX IF NOT EXISTS custom_behaviors_name ON custom_behaviors (name);
+
+CREATE TABLE IF NOT EXISTS security_configs (
+    configId             INTEGER PRIMARY KEY,
+    configName           TEXT NOT NULL,
+    description          TEXT,
+    latestVersion        INTEGER,
+    stagingVersion       INTEGER,
+    productionVersion    INTEGER,
+    contractId           TEXT,
+    groupId              INTEGER,
+    productionHostnames  TEXT
+);
+CREATE INDEX IF NOT EXISTS security_configs_name ON security_configs (configName);
+
+CREATE TABLE IF NOT EXISTS security_hostnames (
+    configId  INTEGER NOT NULL,
+    hostname  TEXT NOT NULL,
+    PRIMARY KEY (configId, hostname)
+);
+CREATE INDEX IF NOT EXISTS security_hostnames_hostname ON security_hostnames (hostname);
+
+CREATE TABLE IF NOT EXISTS network_lists (
+    uniqueId      TEXT PRIMARY KEY,
+    name          TEXT NOT NULL,
+    type          TEXT,
+    elementCount  INTEGER,
+    syncPoint     INTEGER,
+    readOnly      INTEGER
+);
+CREATE INDEX IF NOT EXISTS network_lists_name ON network_lists (name);
+
+CREATE TABLE IF NOT EXISTS cpcodes (
+    cpcodeId     INTEGER PRIMARY KEY,
+    cpcodeName   TEXT,
+    contractId   TEXT,
+    groupId      INTEGER,
+    productId    TEXT,
+    productName  TEXT
+);
+CREATE INDEX IF NOT EXISTS cpcodes_name ON cpcodes (cpcodeName);
+'''
+
+
+class Inventory:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = Path(directory, FILENAME)
+        self._conn = None
+        self._reader = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.directory).mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        '''
+        Read-only connection, the SQL given to snapshot query cannot change the store
+        '''
+        if self._reader is None:
+            self._reader = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True)
+        return self._reader
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def close(self) -> None:
+        for conn in [self._conn, self._reader]:
+            if conn is not None:
+                conn.close()
+        self._conn = self._reader = None
+
+    def columns(self, table: str) -> list[str]:
+        return [x[1] for x in self.conn.execute(f'PRAGMA table_info({table})')]
+
+    def replace(self, table: str, rows: Iterable[dict]) -> int:
+        '''
+        Swap the content of a table for rows in one transaction, keys missing from a row are stored as NULL
+        '''
+        columns = self.columns(table)
+        values = ([value(row.get(x)) for x in columns] for row in rows)
+        sql = f'INSERT OR REPLACE INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {table}')
+            count = self.conn.executemany(sql, values).rowcount
+            self.conn.execute('INSERT OR REPLACE INTO capture VALUES (?, ?, ?)',
+                              (table, count, time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())))
+        logger.debug(f'{table:<20} {count:>8} rows')
+        return count
+
+    def query(self, sql: str, params: tuple | dict = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.reader, params=params)
+
+    def captures(self) -> pd.DataFrame:
+        return self.query('SELECT * FROM capture ORDER BY tableName')
+
+    def captured(self, table: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM capture WHERE tableName = ?', (table,)).fetchone() is not None
+
+    def tables(self) -> dict[str, list[str]]:
+        names = [x[0] for x in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        return {x: self.columns(x) for x in names if x != 'capture'}
+
+    def index_rules(self) -> None:
+        '''
+        Rebuild the behaviors and criteria tables from the stored ruletrees
+        '''
+        for table in ['behaviors', 'criteria']:
+            cursor = self.conn.execute('SELECT propertyId, propertyVersion, rules FROM ruletrees')
+            self.replace(table, (row for property_id, version, rules in cursor
+                                 for row in rule_items(property_id, version, json.loads(rules), table)))
+
+
+def rule_items(property_id: int, version: int, rules: dict, key: str) -> Iterator[dict]:
+    '''
+    One row per behavior or criterion of the ruletree, key is 'behaviors' or 'criteria'
+    '''
+    stack = [(rules, rules.get('name', 'default'))]
+    while stack:
+        rule, path = stack.pop()
+        for position, item in enumerate(rule.get(key, []), 1):
+            yield {'propertyId': property_id,
+                   'propertyVersion': version,
+                   'rulePath': path,
+                   'ruleName': rule.get('name'),
+                   'position': position,
+                   'name': item.get('name'),
+                   'options': item.get('options', {}),
+                   'criteriaMustSatisfy': rule.get('criteriaMustSatisfy')}
+        for child in reversed(rule.get('children', [])):
+            stack.append((child, f'{path} > {child.get("name")}'))
+
+
+def value(x):
+    '''
+    SQLite friendly value, lists and dicts as compact JSON
+    '''
+    if isinstance(x, (list, dict)):
+        return json.dumps(x, separators=(',', ':'))
+    if isinstance(x, bool):
+        return int(x)
+    return x
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,91 @@
+'''
+JSON decoding/encoding used for API responses and saved files
+
+orjson is used when installed, otherwise the standard library. ijson, when installed, lets
+callers walk a streamed response item by item instead of holding the whole payload in memory.
+'''
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+logger = logging.getLogger(__name__)
+
+if orjson:
+    DUMP_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    if orjson:
+        return orjson.dumps(obj, option=DUMP_OPTIONS).decode()
+    return json.dumps(obj, indent=2)
+
+
+def write(filepath: str, obj: Any) -> None:
+    if orjson:
+        Path(filepath).write_bytes(orjson.dumps(obj, option=DUMP_OPTIONS))
+    else:
+        with open(filepath, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
+def drop_keys(obj: Any, keys: set | list) -> Any:
+    '''
+    Copy of obj without the given keys at any depth, same result as
+    boltons remap(obj, lambda p, k, v: k not in keys) in a fraction of the time
+    '''
+    keys = keys if isinstance(keys, set) else set(keys)
+    return _drop_keys(obj, keys)
+
+
+def _drop_keys(obj: Any, keys: set) -> Any:
+    if isinstance(obj, dict):
+        return {k: _drop_keys(v, keys) for k, v in obj.items() if k not in keys}
+    if isinstance(obj, list):
+        return [_drop_keys(v, keys) for v in obj]
+    return obj
+
+
+def iter_items(stream: BinaryIO, prefix: str) -> Iterator[Any]:
+    '''
+    Yield the elements of the array at prefix, ijson notation, for example 'groups.items.item'
+
+    With ijson the payload is parsed incrementally from the stream,
+    without it the whole body is decoded first and the same elements are returned.
+    '''
+    if ijson:
+        yield from ijson.items(stream, prefix, use_float=True)
+        return
+
+    data = [loads(stream.read())]
+    for name in prefix.split('.') if prefix else []:
+        if name == 'item':
+            data = [x for node in data if isinstance(node, list) for x in node]
+        else:
+            data = [node[name] for node in data if isinstance(node, dict) and name in node]
+    yield from data
+
+
+if __name__ == '__main__':
+    pass
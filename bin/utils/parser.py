@@ -63,6 +63,35 @@ class AkamaiParser(CustomHelpFormatter, argparse.ArgumentParser):
         parser.add_argument('-a', '--accountkey',
                             metavar='accountkey', type=str, dest='account_switch_key',
                             help='account switch key (Akamai Internal Only)')
+        parser.add_argument('--pool-size', type=int, default=64, dest='pool_size',
+                            help='keep-alive connections per API host shared by all modules')
+        parser.add_argument('--no-keep-alive', action='store_true', dest='no_keep_alive',
+                            help='close API connections after each request')
+        parser.add_argument('--http2', action='store_true',
+                            help='multiplex concurrent API requests over HTTP/2 connections')
+        parser.add_argument('--rate-limit', type=float, dest='rate_limit',
+                            help='maximum requests per second per API family, lowered automatically when throttled. '
+                                 'Without it a family is paced at the X-RateLimit-Limit it advertises, else once the API answered 429')
+        parser.add_argument('--no-cache', action='store_true', dest='no_cache',
+                            help='do not read or write the API response cache')
+        parser.add_argument('--cache-ttl', type=int, default=600, dest='cache_ttl',
+                            help='seconds before cached account listings (groups, properties, hostnames) are revalidated')
+        parser.add_argument('--record', metavar='DIR', type=str,
+                            help='save every API request and response to a cassette in DIR')
+        parser.add_argument('--replay', metavar='DIR', type=str,
+                            help='answer API requests from the cassette in DIR, no network or credentials needed')
+        parser.add_argument('--replay-latency', metavar='MS', type=str, default='0', dest='replay_latency',
+                            help="milliseconds added to each replayed response, 'recorded' to use the recorded latency")
+        parser.add_argument('--update-snapshot', action='store_true', dest='update_snapshot',
+                            help='save the API responses of this run to the account snapshot used by --offline')
+        parser.add_argument('--offline', action='store_true',
+                            help='answer every API request from the account snapshot, no network or credentials needed')
+        parser.add_argument('--base-url', metavar='URL', type=str, dest='base_url',
+                            help='send API calls to URL instead of the edgerc host, ie. a local ak_mock server')
+        parser.add_argument('--audit-requests', action='store_true', dest='audit_requests',
+                            help='report API requests made more than once in the run, with their call sites')
+        parser.add_argument('--max-duplicates', metavar='N', type=int, dest='max_duplicates',
+                            help='audit requests and exit with status 1 when more than N requests were duplicates')
         subparsers = parser.add_subparsers(title='Available commands', metavar='', dest='command')
         cls.all_command(subparsers)
         return parser.parse_args()
@@ -173,6 +202,23 @@ class AkamaiParser(CustomHelpFormatter, argparse.ArgumentParser):
                                          {'name': 'namecontains', 'help': 'behavior name contains keyword search'},
                                          {'name': 'hidexml', 'help': 'use this argument to hide XML result from the terminal', 'action': 'store_false'},
                                          {'name': 'lineno', 'help': 'show line number', 'action': 'store_true'}]},
+                 {'name': 'activate',
+                  'help': 'activate many property versions with bulk activation requests and wait for them',
+                  'required_arguments': [{'name': 'email', 'help': 'notification emails', 'nargs': '+'}],
+                  'optional_arguments': [{'name': 'property-version', 'help': 'propertyId:version ie. 123456:5', 'nargs': '+'},
+                                         {'name': 'input', 'help': 'excel with propertyId, propertyName, stagingVersion and productionVersion'},
+                                         {'name': 'network', 'help': 'staging and/or production', 'nargs': '+',
+                                          'choices': ['staging', 'production'], 'default': ['staging']},
+                                         {'name': 'note', 'help': 'activation note', 'default': 'activated by akamai util'},
+                                         {'name': 'concurrency', 'help': 'maximum API requests in flight', 'default': 10},
+                                         {'name': 'no-wait', 'help': 'return once the activations are submitted', 'action': 'store_true'},
+                                         {'name': 'output', 'help': 'also save the result to output/ as excel ie. activation.xlsx'}]},
+                 {'name': 'activation-status',
+                  'help': 'follow many activations until they are done, with a live summary',
+                  'optional_arguments': [{'name': 'property-activation', 'help': 'propertyId:activationId ie. 123456:8765432', 'nargs': '+'},
+                                         {'name': 'input', 'help': 'excel with propertyId, propertyName and activationId'},
+                                         {'name': 'concurrency', 'help': 'maximum API requests in flight', 'default': 10},
+                                         {'name': 'output', 'help': 'also save the result to output/ as excel ie. activation.xlsx'}]},
                  ]
         actions['delivery-config'] = cls.create_main_command(
             subparsers,
@@ -180,7 +226,7 @@ class AkamaiParser(CustomHelpFormatter, argparse.ArgumentParser):
             help='many things you may need to (know about/check on/perform on) configs on the account',
             optional_arguments=[{'name': 'summary', 'help': 'only show account summary', 'action': 'store_true'},
                                 {'name': 'output', 'help': 'output filename.extension ie akamai.xlsx'},
-                                {'name': 'concurrency', 'help': 'increase concurrency to X', 'default': 1},
+                                {'name': 'concurrency', 'help': 'maximum API requests in flight', 'default': 10},
                                 {'name': 'show', 'help': 'automatically launch Microsoft Excel after (Mac OS Only)', 'action': 'store_true'},
                                 {'name': 'behavior', 'help': 'behaviors you want to audit on the property', 'nargs': '+'},
                                 {'name': 'group-id', 'help': 'provide at least one groupId without prefix grp_ ', 'nargs': '+'},
@@ -204,4 +250,17 @@ class AkamaiParser(CustomHelpFormatter, argparse.ArgumentParser):
                                                 {'name': 'group-id', 'help': 'group-id', 'nargs': '+'},
                                                 {'name': 'output', 'help': 'override excel output file (.xlsx)'},
                                                 {'name': 'no-show', 'help': 'automatically open compare report in browser', 'action': 'store_true'}])
+        snapshot_sc = [{'name': 'query',
+                        'help': 'run SQL against the captured inventory, without API calls',
+                        'optional_arguments': [{'name': 'sql', 'help': 'SELECT statement, ie. "SELECT * FROM behaviors WHERE name = \'origin\'"'},
+                                               {'name': 'tables', 'help': 'list tables, row counts and columns', 'action': 'store_true'},
+                                               {'name': 'output', 'help': 'also save the result to output/ as excel ie. origins.xlsx'}]
+                        }]
+        actions['snapshot'] = cls.create_main_command(
+                            subparsers,
+                            'snapshot',
+                            help='capture groups, properties, hostnames, ruletrees and security objects into a local inventory',
+                            subcommands=snapshot_sc,
+                            optional_arguments=[{'name': 'group-id', 'help': 'only capture these groupIds, without prefix grp_', 'nargs': '+'},
+                                                {'name': 'concurrency', 'help': 'maximum API requests in flight', 'default': 10}])
         return actions
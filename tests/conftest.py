@@ -0,0 +1,52 @@
+'''
+Every test runs in its own directory with the module level state of ak_api reset,
+API calls go to an ak_mock server started per test.
+'''
+from __future__ import annotations
+
+import pytest
+from ak_api import cache
+from ak_api import cassette
+from ak_api import circuit
+from ak_api import ratelimit
+from ak_api import retry
+from ak_api import transport
+from ak_api import version_cache
+from ak_mock.account import Account
+from ak_mock.server import MockServer
+from ak_utils import papi as p
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # cache/, snapshots/ and output/ land in the test directory
+    monkeypatch.setattr(cache, 'ENABLED', False)
+    monkeypatch.setattr(cache, 'PATH', str(tmp_path / 'cache' / 'api_cache.db'))
+    monkeypatch.setattr(cassette, 'MODE', None)
+    monkeypatch.setattr(cassette, 'DIRECTORY', None)
+    monkeypatch.setattr(cassette, 'LATENCY', 0.0)
+    monkeypatch.setattr(cassette, '_replayed', {})
+    monkeypatch.setattr(transport, 'BASE_URL', None)
+    monkeypatch.setattr(transport, '_edgercs', {})
+    monkeypatch.setattr(transport, '_sessions', {})
+    monkeypatch.setattr(circuit, '_breakers', {})
+    monkeypatch.setattr(ratelimit, '_buckets', {})
+    monkeypatch.setattr(retry, '_budgets', {})
+    monkeypatch.setattr(p, '_group_indexes', {})
+    version_cache.clear()
+    yield
+    transport.close_all()
+
+
+@pytest.fixture
+def account():
+    return Account(properties=20, security_configs=2, network_lists=3, enrollments=2)
+
+
+@pytest.fixture
+def mock_server(account):
+    server = MockServer(account, port=0).start()
+    transport.configure(base_url=server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import httpx
+import pytest
+from ak_api.papi import AsyncPapi
+from ak_api.papi import Papi
+from ak_api.papi import activation_batches
+from ak_mock import server
+from ak_utils import activation as activation_module
+from ak_utils.activation import ACTIVATION_ETA
+from ak_utils.activation import ACTIVATION_POLL
+from ak_utils.activation import ActivationTracker
+from ak_utils.papi import PapiWrapper
+
+
+def activation(property_id, network: str) -> dict:
+    return {'propertyId': property_id, 'propertyVersion': 1, 'network': network}
+
+
+def test_a_property_appears_once_per_batch():
+    activations = [activation(x, network) for network in ['staging', 'production'] for x in range(1, 6)]
+    activations.append(activation('prp_1', 'staging'))  # the same property with its prefix
+
+    batches = activation_batches(activations, size=4)
+
+    assert sum(len(x) for x in batches) == len(activations)
+    assert all(len(x) <= 4 for x in batches)
+    for batch in batches:
+        ids = [int(str(x['propertyId']).removeprefix('prp_')) for x in batch]
+        assert len(ids) == len(set(ids))
+    assert len(batches) == 3
+
+
+def test_batches_fill_up_before_a_new_one_starts():
+    batches = activation_batches([activation(x, 'staging') for x in range(10)], size=4)
+    assert [len(x) for x in batches] == [4, 4, 2]
+    assert activation_batches([]) == []
+
+
+def test_payload_keeps_fast_fallback():
+    payload = Papi.bulk_activation_payload([{**activation('prp_1', 'staging'), 'propertyVersion': '3'}], ['a@b.c'])
+    assert payload['activatePropertyVersions'] == [{'network': 'STAGING', 'note': '', 'propertyId': 'prp_1', 'propertyVersion': 3}]
+    assert payload['defaultActivationSettings']['useFastFallback'] is True
+
+
+def tracker_with(submitted: datetime | None) -> ActivationTracker:
+    tracker = ActivationTracker(logger=logging.getLogger(__name__))
+    tracker.add('prp_1', 'atv_1', network='staging')
+    tracker.activations['1'].update({'status': 'PENDING', 'submitDate': submitted.isoformat() if submitted else None})
+    return tracker
+
+
+def test_next_delay_follows_retry_after_within_bounds():
+    tracker = tracker_with(None)
+    assert tracker._next_delay(1, 30) == 30
+    assert tracker._next_delay(1, 1) == ACTIVATION_POLL[0]
+    assert tracker._next_delay(1, 10_000) == ACTIVATION_POLL[1]
+
+
+def test_next_delay_halves_the_time_left_then_doubles_once_overdue():
+    tracker = tracker_with(datetime.now(timezone.utc))
+    assert tracker._next_delay(1, None) == pytest.approx(ACTIVATION_ETA['STAGING'] / 2, abs=1)
+
+    tracker = tracker_with(datetime.now(timezone.utc) - timedelta(hours=1))
+    delays = [tracker._next_delay(1, None) for _ in range(6)]
+    assert delays == [30, 60, 120, 240, 300, 300]
+
+
+def test_client_error_ends_the_activation(mock_server, account):
+    prop = next(iter(account.properties.values()))
+    tracker = ActivationTracker(logger=logging.getLogger(__name__))
+    tracker.add(prop['propertyId'], 'atv_999999', network='staging')
+
+    df = tracker.run(timeout=3)
+
+    assert df['status'].tolist() == ['ERROR']
+    assert tracker.pending() == []
+    assert tracker.requests == 1
+
+
+def test_a_failed_submit_keeps_the_accepted_batches(mock_server, account, monkeypatch):
+    monkeypatch.setattr(server, 'BULK_ACTIVATION_DELAY', 0)
+    submit = AsyncPapi.bulk_activate_properties
+
+    async def read_timeout_on_production(self, activations, emails, *args):
+        if activations[0]['network'] == 'production':
+            raise httpx.ReadTimeout('timed out')
+        return await submit(self, activations, emails, *args)
+
+    monkeypatch.setattr(AsyncPapi, 'bulk_activate_properties', read_timeout_on_production)
+    prop = next(iter(account.properties.values()))
+    activations = [{**activation(prop['propertyId'], x), 'propertyVersion': prop['latestVersion']} for x in ['staging', 'production']]
+
+    df = PapiWrapper(logger=logging.getLogger(__name__)).bulk_activate(activations, ['a@b.c']).set_index('network')
+
+    assert df.loc['production', 'taskStatus'] == 'UNKNOWN'
+    assert 'ReadTimeout' in df.loc['production', 'fatalError']
+    assert df.loc['staging', 'bulkActivationId'] > 0
+    assert df.loc['staging', 'activationId'] is not None
+
+
+def test_a_failed_poll_is_retried_later(monkeypatch):
+    monkeypatch.setattr(activation_module, 'ACTIVATION_POLL', (0.01, 0.01))
+    calls = []
+
+    async def get_activations(self, property_id, activation_id=None):
+        calls.append(property_id)
+        if len(calls) == 1:
+            raise httpx.ConnectError('connection reset')
+        return 200, [{'activationId': 'atv_1', 'status': 'ACTIVE'}], None
+
+    monkeypatch.setattr(AsyncPapi, 'get_activations', get_activations)
+    tracker = tracker_with(None)
+
+    df = tracker.run(timeout=5)
+
+    assert df['status'].tolist() == ['ACTIVE']
+    assert calls == [1, 1]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+import httpx
+import pandas as pd
+import pytest
+from ak_api import retry
+from ak_api import transport
+from ak_api.papi import AsyncPapi
+from ak_mock.server import MockServer
+from ak_utils.papi import PapiWrapper
+from command import snapshot
+
+
+def test_backoff_does_not_hold_the_session_bound(account, monkeypatch):
+    monkeypatch.setattr(retry, 'BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(retry, 'MAX_RETRIES', 1)
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+    server = MockServer(account, port=0, error_rate=1.0, error_status=[500], error_path='/hostnames$').start()
+    transport.configure(base_url=server.url)
+    prop = next(iter(account.properties.values()))
+
+    async def run() -> tuple[float, list]:
+        async with AsyncPapi(max_in_flight=1, logger=logging.getLogger(__name__)) as papi:
+            failing = asyncio.create_task(papi.get_property_hostnames(prop['propertyId']))
+            await asyncio.sleep(0.2)  # the first attempt failed, the call is backing off
+            start = time.perf_counter()
+            resp = await papi.get(f'{papi.MODULE}/groups', headers=papi.headers)
+            elapsed = time.perf_counter() - start
+            assert resp.status_code == 200
+            return elapsed, await failing
+
+    try:
+        elapsed, hostnames = asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert elapsed < 0.5
+    assert hostnames['status'] == 500
+
+
+@pytest.fixture
+def one_property_times_out(account, monkeypatch):
+    '''
+    Every request about the first property raises once its retries are spent, the others are answered
+    '''
+    failing = int(next(iter(account.properties)))
+    for name in ['get_property_hostnames', 'get_property_versions', 'property_ruletree']:
+        original = getattr(AsyncPapi, name)
+
+        async def call(self, property_id, *args, original=original, **kwargs):
+            if int(property_id) == failing:
+                raise httpx.ReadTimeout('timed out')
+            return await original(self, property_id, *args, **kwargs)
+
+        monkeypatch.setattr(AsyncPapi, name, call)
+    return failing
+
+
+def test_ruletrees_survive_a_failed_property(mock_server, account, one_property_times_out):
+    props = list(account.properties.values())[:3]
+    df = pd.DataFrame({'propertyId': [int(x['propertyId'].removeprefix('prp_')) for x in props],
+                       'productionVersion': [x['productionVersion'] for x in props],
+                       'latestVersion': [x['latestVersion'] for x in props]})
+    ruletrees = PapiWrapper(logger=logging.getLogger(__name__)).get_property_ruletrees(df)
+    assert ruletrees[0] == {'rules': {}}
+    assert all(x['rules']['name'] == 'default' for x in ruletrees[1:])
+
+
+def test_property_details_survive_a_failed_property(mock_server, account, one_property_times_out):
+    props = list(account.properties.values())[:3]
+    properties = pd.DataFrame({'propertyId': [int(x['propertyId'].removeprefix('prp_')) for x in props],
+                               'productionVersion': [x['productionVersion'] for x in props],
+                               'latestVersion': [x['latestVersion'] for x in props],
+                               'assetId': [x['assetId'] for x in props],
+                               'groupId': [x['groupId'] for x in props],
+                               'propertyName': [x['propertyName'] for x in props]})
+    asyncio.run(PapiWrapper(logger=logging.getLogger(__name__)).collect_properties_detail([properties]))
+    assert properties['productId'].tolist()[0] == one_property_times_out
+    assert properties['hostname_count'].tolist()[1:] == [len(x['hostnames']) for x in props[1:]]
+
+
+def test_snapshot_survives_a_failed_property(mock_server, account, one_property_times_out):
+    props = [{**x, 'propertyId': int(x['propertyId'].removeprefix('prp_'))} for x in list(account.properties.values())[:3]]
+    details = asyncio.run(snapshot.collect_properties(props, None, None, logging.getLogger(__name__)))
+    assert details[0] == {'version': props[0]['productionVersion'], 'versions': [], 'hostnames': [], 'rules': None}
+    assert all(x['rules'] for x in details[1:])
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import logging
+
+from ak_api import audit
+from ak_api import papi as papi_module
+from ak_api.papi import Papi
+from ak_mock import server
+
+
+def test_status_polls_are_not_duplicates(mock_server, monkeypatch):
+    for name in ['ENABLED', 'PATH', '_journal']:
+        monkeypatch.setattr(audit, name, getattr(audit, name))
+    audit.start('logs/api_audit.jsonl')
+    monkeypatch.setattr(server, 'SEARCH_DELAY', 0.2)
+    monkeypatch.setattr(papi_module, 'BULK_SEARCH_POLL', (0.05, 0.05))
+    papi = Papi(logger=logging.getLogger(__name__))
+
+    status, matches = papi.bulk_search_properties("$..behaviors[?(@.name == 'caching')]")
+    assert status == 200 and list(matches)
+    papi.get_groups()
+    papi.get_groups()
+
+    polls = [x for x in audit._journal.read() if '/bulk/rules-search-requests/' in x['fingerprint']]
+    assert len(polls) > 2
+    assert [x['request'] for x in audit.duplicates()] == ['GET /papi/v1/groups?']
+    assert audit.report() == 1
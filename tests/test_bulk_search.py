@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+
+import pandas as pd
+from ak_api.papi import Papi
+from ak_mock import server
+from ak_mock.account import match_locations
+from ak_utils.papi import PapiWrapper
+
+
+def test_one_match_per_location():
+    results = [{'propertyId': 'prp_7', 'propertyName': 'a', 'propertyVersion': '3', 'isLatest': True,
+                'productionStatus': 'ACTIVE', 'stagingStatus': 'INACTIVE',
+                'matchLocations': ['/rules/behaviors/0', '/rules/children/1/behaviors/2']},
+               {'propertyId': 'prp_8', 'propertyName': 'b', 'propertyVersion': 1, 'matchLocations': []}]
+    matches = list(Papi._bulk_search_matches(results))
+    assert [(x['propertyId'], x['propertyVersion'], x['path']) for x in matches] == [
+        (7, 3, '/rules/behaviors/0'), (7, 3, '/rules/children/1/behaviors/2')]
+
+
+def test_behavior_counts_match_the_ruletrees(mock_server, account, monkeypatch):
+    monkeypatch.setattr(server, 'SEARCH_DELAY', 0)
+    props = list(account.properties.values())
+    df = pd.DataFrame({'propertyId': [int(x['propertyId'].removeprefix('prp_')) for x in props],
+                       'productionVersion': [x['productionVersion'] for x in props],
+                       'latestVersion': [x['latestVersion'] for x in props]})
+    df.loc[0, 'productionVersion'] = None  # never activated, the latest version is audited
+
+    def expected(name: str) -> list:
+        versions = [props[0]['latestVersion']] + [x['productionVersion'] for x in props[1:]]
+        return [len(list(match_locations(account.ruletree(prop, account.version(prop, version))['rules'],
+                                         'behaviors', name, ignore_case=True)))
+                for prop, version in zip(props, versions)]
+
+    counts = PapiWrapper(logger=logging.getLogger(__name__)).bulk_behavior_counts(['caching', 'gzipresponse', 'no such'], df)
+
+    assert counts['caching'] == expected('caching')
+    assert counts['gzipresponse'] == expected('gzipResponse')  # the CLI lowercases behavior names
+    assert sum(counts['gzipresponse']) > 0
+    assert counts['no such'] is None
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+from ak_api import cache
+from ak_api import version_cache
+from ak_api.papi import Papi
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(cache, 'ENABLED', True)
+
+
+def rules(version: int) -> str:
+    return f'/papi/v1/properties/prp_1/versions/{version}/rules'
+
+
+def test_only_locked_ruletrees_are_immutable(enabled):
+    version_cache.remember_property({'propertyId': 'prp_1', 'contractId': 'ctr_1', 'groupId': 'grp_1',
+                                     'stagingVersion': 3, 'productionVersion': 2})
+    assert cache.policy('GET', rules(3)) == 'immutable'
+    assert cache.policy('GET', rules(2)) == 'immutable'
+    assert cache.policy('GET', rules(4)) == 'ttl'
+    assert cache.policy('GET', '/papi/v1/properties/prp_1/versions/3') == 'ttl'
+    assert cache.policy('GET', '/appsec/v1/export/configs/1/versions/2') == 'ttl'
+
+    version_cache.remember_version('prp_1', 4, {'propertyId': 'prp_1',
+                                                'versions': {'items': [{'propertyVersion': 4,
+                                                                        'stagingStatus': 'PENDING',
+                                                                        'productionStatus': 'INACTIVE'}]}})
+    assert cache.policy('GET', rules(4)) == 'immutable'
+    version_cache.remember_property({'propertyId': 'prp_1', 'propertyVersion': 5,
+                                     'stagingStatus': 'INACTIVE', 'productionStatus': 'INACTIVE'})
+    assert cache.policy('GET', rules(5)) == 'ttl'
+
+
+def test_immutable_entry_is_fresh_only_while_immutable(enabled, monkeypatch):
+    monkeypatch.setattr(cache, 'TTL', 0)
+    cache.store('key', 'url', 200, {'ETag': '"1"'}, b'{}', immutable=True)
+    assert cache.lookup('key', immutable=True).fresh
+    entry = cache.lookup('key', immutable=False)
+    assert not entry.fresh
+    assert entry.etag == '"1"'
+
+
+def test_version_detail_is_revalidated(mock_server, account, enabled, monkeypatch):
+    monkeypatch.setattr(cache, 'TTL', 0)
+    prop = next(iter(account.properties.values()))
+    papi = Papi(logger=logging.getLogger(__name__))
+    url = f'{papi.MODULE}/properties/{prop["propertyId"]}/versions/{prop["stagingVersion"]}'
+    first = papi.session.get(url)
+    second = papi.session.get(url)
+    assert second.json() == first.json()
+    assert second.headers[cache.HIT_HEADER] == 'HIT'
+    assert mock_server.requests == 2  # the second one came back 304 Not Modified
+
+
+def test_locked_ruletree_is_served_from_cache(mock_server, account, enabled, monkeypatch):
+    monkeypatch.setattr(cache, 'TTL', 0)
+    prop = next(iter(account.properties.values()))
+    version_cache.remember_property(account.listing(prop))
+    papi = Papi(logger=logging.getLogger(__name__))
+    url = f'{papi.MODULE}/properties/{prop["propertyId"]}/versions/{prop["stagingVersion"]}/rules'
+    papi.session.get(url)
+    assert papi.session.get(url).headers[cache.HIT_HEADER] == 'HIT'
+    assert mock_server.requests == 1
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from ak_api import cassette
+from ak_api import transport
+from ak_api.papi import Papi
+from ak_mock.server import MockServer
+
+
+def run(papi: Papi) -> tuple[list, list]:
+    _, groups = papi.get_groups()  # blocking
+    properties = [x for group in groups for contract_id in group.get('contractIds', [])
+                  for x in papi.iter_properties_per_group(group['groupId'], contract_id)]  # streamed
+    return groups, properties
+
+
+def test_record_then_replay(mock_server):
+    cassette.configure('record', 'cassette')
+    papi = Papi(logger=logging.getLogger(__name__))
+    recorded = run(papi)
+    assert recorded[1]
+    sent = mock_server.requests
+
+    cassette.configure('replay', 'cassette')
+    transport.configure()  # remount the adapters of existing sessions
+    assert run(papi) == recorded
+    assert mock_server.requests == sent
+
+
+def test_update_then_offline(mock_server):
+    cassette.configure('update', cassette.snapshot_directory())
+    papi = Papi(logger=logging.getLogger(__name__))
+    run(papi)
+    updated = run(papi)
+    sent = mock_server.requests
+
+    cassette.configure('offline', cassette.snapshot_directory())
+    transport.configure()
+    assert run(papi) == updated
+    assert run(papi) == updated
+    assert mock_server.requests == sent
+
+
+def test_replay_recorded_latency(account):
+    server = MockServer(account, port=0, latency=0.2).start()
+    transport.configure(base_url=server.url)
+    cassette.configure('record', 'cassette')
+    papi = Papi(logger=logging.getLogger(__name__))
+    papi.get_groups()
+    server.shutdown()
+    server.server_close()
+    (elapsed,), = cassette.connection().execute('SELECT elapsed FROM interaction').fetchall()
+    assert elapsed >= 0.2
+
+    cassette.configure('replay', 'cassette', latency='recorded')
+    transport.configure()
+    start = time.perf_counter()
+    status, _ = papi.get_groups()
+    assert status == 200
+    assert time.perf_counter() - start >= 0.2
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+import requests
+from ak_api import circuit
+from ak_api import transport
+from ak_api.papi import AsyncPapi
+from ak_api.papi import Papi
+from ak_mock.server import MockServer
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(circuit, 'COOL_DOWN', 0)
+    return circuit.CircuitBreaker('GET /papi/v1/groups')
+
+
+def opened(breaker: circuit.CircuitBreaker) -> circuit.CircuitBreaker:
+    for _ in range(circuit.THRESHOLD):
+        breaker.record(500)
+    assert breaker.state == circuit.OPEN
+    return breaker
+
+
+def probing(breaker: circuit.CircuitBreaker) -> circuit.CircuitBreaker:
+    assert opened(breaker).allow()
+    assert breaker.state == circuit.HALF_OPEN
+    return breaker
+
+
+def test_opens_after_threshold():
+    breaker = circuit.CircuitBreaker('GET /papi/v1/groups')
+    for _ in range(circuit.THRESHOLD - 1):
+        breaker.record(502)
+    assert breaker.allow()
+    breaker.record(502)
+    assert breaker.state == circuit.OPEN
+    assert not breaker.allow()
+
+
+def test_one_probe_at_a_time(breaker):
+    probing(breaker)
+    assert not breaker.allow()
+
+
+@pytest.mark.parametrize('status, state', [(200, circuit.CLOSED), (404, circuit.CLOSED),
+                                           (500, circuit.OPEN), (429, circuit.OPEN)])
+def test_probe_outcome(breaker, status, state):
+    probing(breaker).record(status)
+    assert breaker.state == state
+
+
+def test_throttled_while_closed_is_not_a_failure(breaker):
+    breaker.record(500)
+    breaker.record(429)
+    assert breaker.state == circuit.CLOSED
+    assert breaker.failures == 1
+
+
+def test_probe_raising_reopens(mock_server, monkeypatch):
+    monkeypatch.setattr(circuit, 'COOL_DOWN', 0)
+    papi = Papi(logger=logging.getLogger(__name__))
+    breaker = opened(circuit.breaker_for('GET', '/papi/v1/groups'))
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('unexpected')
+    monkeypatch.setattr(requests.Session, 'request', broken)
+    with pytest.raises(RuntimeError):
+        papi.session.get(f'{papi.MODULE}/groups')
+    assert breaker.state == circuit.OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_probe_reopens(account, monkeypatch):
+    monkeypatch.setattr(circuit, 'COOL_DOWN', 0)
+    server = MockServer(account, port=0, latency=5).start()
+    transport.configure(base_url=server.url)
+
+    async def run() -> circuit.CircuitBreaker:
+        async with AsyncPapi(logger=logging.getLogger(__name__)) as papi:
+            breaker = opened(circuit.breaker_for('GET', '/papi/v1/groups'))
+            task = asyncio.create_task(papi.get(f'{papi.MODULE}/groups'))
+            await asyncio.sleep(0.2)
+            assert breaker.state == circuit.HALF_OPEN
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return breaker
+
+    try:
+        assert asyncio.run(run()).state == circuit.OPEN
+    finally:
+        server.shutdown()
+        server.server_close()
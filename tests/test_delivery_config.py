@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import logging
+from types import SimpleNamespace
+
+import pandas as pd
+from ak_utils.papi import PapiWrapper
+from command import delivery_config
+
+
+def test_activate_reads_versions_from_excel(monkeypatch):
+    # the columns delivery-config writes, without assetId/groupId, one property never activated on production
+    pd.DataFrame({'propertyId': ['prp_1', 'prp_2'],
+                  'propertyName': ['a', 'b'],
+                  'stagingVersion': [4, 2],
+                  'productionVersion': [3, None]}).to_excel('activate.xlsx', index=False)
+    submitted = []
+
+    def bulk_activate(self, activations, emails, concurrency=None):
+        submitted.extend(activations)
+        return pd.DataFrame([{**x, 'activationId': None, 'activationStatus': 'ACTIVE'} for x in activations])
+
+    monkeypatch.setattr(PapiWrapper, 'bulk_activate', bulk_activate)
+    args = SimpleNamespace(account_switch_key=None, concurrency=None, network=['staging', 'production'],
+                           input='activate.xlsx', property_version=None, note='note', email=['a@b.c'],
+                           no_wait=True, output=None)
+    delivery_config.activate(args, logging.getLogger(__name__))
+
+    assert sorted((x['propertyId'], x['network'], x['propertyVersion']) for x in submitted) == [
+        (1, 'production', 3), (1, 'staging', 4), (2, 'staging', 2)]
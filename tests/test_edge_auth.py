@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import requests
+from ak_api.edge_auth import EdgeGridSigner
+from akamai.edgegrid import EdgeGridAuth
+from akamai.edgegrid import edgegrid
+
+
+CREDENTIALS = ('akab-client-token', 'client-secret-of-44-characters-xxxxxxxxxxxx', 'akab-access-token')
+URL = 'https://akab-host.luna.akamaiapis.net'
+
+
+def prepare(method: str, path: str, **kwargs) -> requests.PreparedRequest:
+    return requests.Request(method, f'{URL}{path}', **kwargs).prepare()
+
+
+@pytest.mark.parametrize('request_', [
+    prepare('GET', '/papi/v1/properties', params={'contractId': 'ctr_1', 'groupId': 'grp_2', 'accountSwitchKey': '1-MOCK'}),
+    prepare('POST', '/papi/v1/search/find-by-value', json={'propertyName': 'www.example.com'}),
+    prepare('POST', '/papi/v1/bulk/rules-search-requests', data=json.dumps({'match': 'x' * 200_000}),
+            headers={'Content-Type': 'application/json'}),
+], ids=['get query', 'post json', 'post over max_body'])
+def test_signature_matches_edgegrid_auth(request_, monkeypatch):
+    signer = EdgeGridSigner(*CREDENTIALS)
+    for timestamp in ['20261017T10:00:00+0000', '20261017T10:00:01+0000']:  # the signing key changes with it
+        monkeypatch.setattr(edgegrid, 'eg_timestamp', lambda: timestamp)
+        monkeypatch.setattr(edgegrid, 'new_nonce', lambda: 'c2d9ee4c-0f20-4b0b-8d6b-9f1c1b9b0f5e')
+        expected = EdgeGridAuth(*CREDENTIALS)(request_.copy())
+        signed = signer(request_.copy())
+        assert signed.headers['Authorization'] == expected.headers['Authorization']
+        assert signed.headers.get('User-Agent') == expected.headers.get('User-Agent')
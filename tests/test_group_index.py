@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+
+from ak_utils.papi import GroupIndex
+from ak_utils.papi import PapiWrapper
+
+
+def test_tree_lookups():
+    index = GroupIndex([{'groupId': 1, 'groupName': 'Account', 'contractIds': ['C-1']},
+                        {'groupId': 2, 'groupName': 'Division', 'parentGroupId': 1, 'contractIds': ['C-1']},
+                        {'groupId': 3, 'groupName': 'Team', 'parentGroupId': 2, 'contractIds': ['C-1', 'C-2']},
+                        {'groupId': 4, 'groupName': 'Other', 'parentGroupId': 1, 'contractIds': []}])
+    assert '3' in index and 5 not in index
+    assert index.top_ids() == [1]
+    assert index.child_ids(1) == [2, 4]
+    assert index.child_ids(3) == []
+    assert index.ancestors(3) == [1, 2]
+    assert index.path('3') == 'Account > Division > Team'
+    assert index.contracts(3) == ['C-1', 'C-2']
+    assert index.get(5) == {} and index.name(5) == '' and index.parent(5) is None
+
+
+def test_ancestors_stop_on_a_cycle():
+    index = GroupIndex([{'groupId': 1, 'groupName': 'a', 'parentGroupId': 2},
+                        {'groupId': 2, 'groupName': 'b', 'parentGroupId': 1}])
+    assert index.ancestors(1) == [2]
+
+
+def test_wrappers_of_an_account_share_one_group_listing(mock_server, account):
+    logger = logging.getLogger(__name__)
+    team = account.groups[-1]
+    group_id = int(team['groupId'].removeprefix('grp_'))
+    parent_id = int(team['parentGroupId'].removeprefix('grp_'))
+
+    papi = PapiWrapper(logger=logger)
+    assert papi.get_group_name(group_id) == team['groupName']
+    assert papi.get_parent_group_id(group_id) == str(parent_id)  # as the API sends it
+    assert group_id in papi.get_child_group_id(parent_id)
+    assert PapiWrapper(logger=logger).get_group_contract_id(group_id) == [x.removeprefix('ctr_') for x in account.contracts]
+    assert mock_server.requests == 1
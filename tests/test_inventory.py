@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from utils.inventory import Inventory
+
+
+def test_query_reads_but_cannot_write(tmp_path):
+    store = Inventory(tmp_path)
+    store.replace('cpcodes', [{'cpcodeId': 1, 'cpcodeName': 'a'}, {'cpcodeId': 2, 'cpcodeName': 'b'}])
+
+    assert store.query('SELECT cpcodeName FROM cpcodes WHERE cpcodeId > ?', (1,))['cpcodeName'].tolist() == ['b']
+    for sql in ['DELETE FROM cpcodes', 'DROP TABLE cpcodes', "INSERT INTO cpcodes (cpcodeId) VALUES (3)"]:
+        with pytest.raises(pd.errors.DatabaseError, match='readonly'):
+            store.query(sql)
+    store.close()
+
+    assert Inventory(tmp_path).query('SELECT COUNT(*) AS n FROM cpcodes')['n'].tolist() == [2]
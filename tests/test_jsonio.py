@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import copy
+
+from ak_api.papi import RULETREE_IGNORE_KEYS
+from ak_mock.account import Account
+from boltons.iterutils import remap
+from utils import jsonio
+
+
+def test_drop_keys_matches_remap_on_a_ruletree():
+    account = Account(properties=3, rules=6, behaviors=4)
+    prop = next(iter(account.properties.values()))
+    ruletree = account.ruletree(prop, prop['versions'][-1])
+    ruletree['rules']['children'][0]['comments'] = 'nested key to drop'
+    ruletree['rules']['variables'] = [{'name': 'PMUSER_X', 'etag': 'nested in a list'}]
+    ruletree['rules']['children'][1]['options'] = {'ruleFormat': 'latest', 'keep': [1, {'errors': []}, None]}
+    keys = RULETREE_IGNORE_KEYS + ['uuid']
+    original = copy.deepcopy(ruletree)
+
+    dropped = jsonio.drop_keys(ruletree, keys)
+
+    assert dropped == remap(ruletree, lambda p, k, v: k not in keys)
+    assert 'rules' in dropped and 'propertyId' not in dropped and 'comments' not in dropped['rules']['children'][0]
+    assert dropped['rules']['children'][1]['options'] == {'keep': [1, {}, None]}
+    assert dropped['rules']['variables'] == [{'name': 'PMUSER_X'}]
+    assert ruletree == original  # the input is not modified
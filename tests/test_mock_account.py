@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from ak_mock.account import Account
+
+
+def cpcode_ids(rule: dict):
+    for behavior in rule['behaviors']:
+        if behavior['name'] == 'cpCode':
+            yield behavior['options']['value']['id']
+    for child in rule['children']:
+        yield from cpcode_ids(child)
+
+
+def test_ruletree_cpcodes_are_in_the_account():
+    account = Account(properties=30)
+    ids = [x for prop in account.properties.values()
+           for version in prop['versions']
+           for x in cpcode_ids(account.ruletree(prop, version)['rules'])]
+
+    assert len(ids) > len(account.properties)  # the default rule and some random behaviors
+    assert {x['cpcodeId'] for x in account.cpcodes()} >= set(ids)
+    assert all(account.cpcode_by_id(x) for x in ids)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+from ak_api import ratelimit
+from ak_api.ratelimit import TokenBucket
+
+
+def test_unlimited_until_throttled():
+    bucket = TokenBucket('papi', None, 20)
+    assert all(bucket.reserve() == 0 for _ in range(200))
+    assert bucket.throttle(1.0)
+    assert bucket.rate is not None
+    assert bucket.rate == bucket.max_rate / 2
+    assert bucket.reserve() >= 1.0
+
+
+def test_pause_adds_to_deficit():
+    bucket = TokenBucket('papi', 10.0, 1)
+    bucket.throttle(2.0)
+    assert bucket.rate == 5.0
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits == pytest.approx([2.2, 2.4, 2.6], abs=0.05)
+
+
+def test_paced_bucket_spaces_requests():
+    bucket = TokenBucket('papi', 10.0, 2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.1, 0.2], abs=0.02)
+
+
+def test_recover_up_to_ceiling():
+    bucket = TokenBucket('papi', 10.0, 1)
+    bucket.throttle(0.0)
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 10.0
+
+
+def test_retry_after():
+    assert ratelimit.retry_after({'Retry-After': '7'}) == 7.0
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert ratelimit.retry_after({'Retry-After': later}) == pytest.approx(30, abs=2)
+    assert ratelimit.retry_after({'Retry-After': 'soon'}) is None
+    assert ratelimit.retry_after({}) is None
+
+
+def test_throttled_pause():
+    assert ratelimit.throttled(200, {}, '') is None
+    assert ratelimit.throttled(429, {'Retry-After': 'soon'}, '') == ratelimit.THROTTLE_PAUSE
+    assert ratelimit.throttled(403, {}, 'WAF deny rule IPBLOCK-BURST4-54013') == ratelimit.IPBLOCK_PAUSE
+
+
+def test_paced_from_the_advertised_budget(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'LIMIT_WINDOW', 10)
+    bucket = TokenBucket('papi', None, 20)
+    assert bucket.reserve() == 0
+    bucket.observe({'X-RateLimit-Limit': '100', 'X-RateLimit-Remaining': '3'})
+    assert bucket.rate == bucket.max_rate == 10.0
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]  # no more back to back than the budget left
+    assert waits[3:] == pytest.approx([0.1, 0.2], abs=0.02)
+
+
+def test_rate_limit_option_is_not_overridden():
+    bucket = TokenBucket('papi', 2.0, 20)
+    bucket.observe({'X-RateLimit-Limit': '6000', 'X-RateLimit-Remaining': '5999'})
+    assert bucket.rate == bucket.max_rate == 2.0
+    bucket = TokenBucket('identity-management', None, 20)
+    bucket.observe({})
+    assert bucket.rate is None
+
+
+def test_headroom_forecast_slows_down_as_the_budget_runs_out(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ratelimit, 'time', SimpleNamespace(monotonic=lambda: clock[0]))
+    bucket = TokenBucket('papi', None, 20)
+    rates = []
+    for second in range(80):  # 20 requests a second against 1600 left, spent in 80 seconds
+        clock[0] += 1
+        for _ in range(20):
+            bucket.reserve()
+        remaining = 1600 - 20 * (second + 1)
+        bucket.observe({'X-RateLimit-Limit': '6000', 'X-RateLimit-Remaining': str(remaining)})
+        rates.append((remaining, bucket.rate))
+
+    assert all(rate == 100.0 for remaining, rate in rates if remaining > 20 * ratelimit.HEADROOM)
+    slowed = [rate for remaining, rate in rates if remaining < 20 * ratelimit.HEADROOM]
+    assert slowed[0] < 25.0  # about the 20 requests a second sent, less as the forecast shrinks
+    assert all(x > y for x, y in zip(slowed, slowed[1:]) if y > ratelimit.MIN_RATE)
+    assert slowed[-1] == ratelimit.MIN_RATE
+    assert bucket.low and bucket.forecast() == 0
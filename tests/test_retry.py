@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+from ak_api import retry
+from ak_api.retry import RetryPolicy
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+
+
+def policy(method: str = 'GET', path: str = '/papi/v1/groups') -> RetryPolicy:
+    return RetryPolicy(method, f'https://host{path}', path)
+
+
+def test_backoff_doubles_until_max_retries(no_jitter):
+    p = policy()
+    delays = [p.delay(502, {}) for _ in range(retry.MAX_RETRIES + 1)]
+    assert delays == [0.5, 1.0, 2.0, 4.0, None]
+    assert p.delay(404, {}) is None
+
+
+def test_retry_after_is_a_floor(no_jitter):
+    assert policy().delay(503, {'Retry-After': '7'}) == 7
+
+
+def test_post_is_retried_only_when_not_processed():
+    assert policy('POST', '/papi/v1/properties').delay(502, {}) is None
+    assert policy('POST', '/papi/v1/properties').delay_error(connect_failed=False) is None
+    assert policy('POST', '/papi/v1/properties').delay(503, {'Retry-After': '1'}) is not None
+    assert policy('POST', '/papi/v1/properties').delay_error(connect_failed=True) is not None
+    assert policy('POST', '/papi/v1/search/find-by-value').delay(502, {}) is not None
+
+
+def test_budget_caps_retries_of_an_endpoint():
+    budget = retry.budget_for('/papi/v1/groups')
+    budget.tokens = 0
+    p = policy()  # a request earns BUDGET_RATIO of a retry, not a whole one
+    assert p.delay(500, {}) is None
+    assert budget.exhausted
+
+    for _ in range(int(1 / retry.BUDGET_RATIO)):
+        policy()
+    assert policy().delay(500, {}) is not None
+    assert not budget.exhausted
+    assert policy(path='/papi/v1/contracts').delay(500, {}) is not None  # budgets are per endpoint
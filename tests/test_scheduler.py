@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from ak_api import scheduler
+from ak_api.scheduler import Scheduler
+
+
+async def hold(slots: Scheduler, entered: asyncio.Event, leave: asyncio.Event, priority: int = scheduler.NORMAL):
+    async with slots.slot_async(priority):
+        entered.set()
+        await leave.wait()
+
+
+def test_cancelled_while_queued_releases_nothing():
+    async def run():
+        slots = Scheduler(1)
+        entered, leave = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold(slots, entered, leave))
+        await entered.wait()
+        queued = asyncio.create_task(hold(slots, asyncio.Event(), asyncio.Event()))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        leave.set()
+        await holder
+        return slots
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_cancelled_while_polling_shared_slot_releases():
+    async def run():
+        slots = Scheduler(2)
+        slots._shared.acquire()  # another process holds the shared slots
+        slots._shared.acquire()
+        task = asyncio.create_task(hold(slots, asyncio.Event(), asyncio.Event()))
+        await asyncio.sleep(0.05)
+        assert slots.in_flight == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return slots
+    assert asyncio.run(run()).in_flight == 0
+
+
+def test_priority_order():
+    slots = Scheduler(1)
+    order = []
+    release = threading.Event()
+
+    def worker(name: str, priority: int, started: threading.Event):
+        started.set()
+        with slots.slot(priority):
+            order.append(name)
+            if name == 'first':
+                release.wait()
+
+    threads = []
+    for name, priority in [('first', scheduler.NORMAL), ('bulk', scheduler.BULK),
+                           ('normal', scheduler.NORMAL), ('interactive', scheduler.INTERACTIVE)]:
+        started = threading.Event()
+        thread = threading.Thread(target=worker, args=(name, priority, started))
+        thread.start()
+        started.wait()
+        threads.append(thread)
+        # wait for the first worker to hold the slot and every other one to be queued behind it
+        while not order or len(slots._queue) < len(threads) - 1:
+            time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert order == ['first', 'interactive', 'normal', 'bulk']
+    assert slots.in_flight == 0
+
+
+def test_priority_for():
+    assert scheduler.priority_for('https://host/papi/v1/groups') == scheduler.INTERACTIVE
+    assert scheduler.priority_for('https://host/papi/v1/properties/1/versions/2/rules') == scheduler.BULK
+    assert scheduler.priority_for('https://host/papi/v1/properties/1/hostnames') == scheduler.NORMAL
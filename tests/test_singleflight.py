@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from ak_api.singleflight import SingleFlight
+
+
+def test_threads_share_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flights.do, 'GET /groups', fetch) for _ in range(8)]
+        while not flights._flights:
+            time.sleep(0.001)
+        time.sleep(0.05)  # the others join the flight in the meantime
+        release.set()
+        results = [x.result() for x in futures]
+
+    assert len(calls) == 1
+    assert all(x is results[0] for x in results)
+    assert flights._flights == {}
+    assert flights.do('GET /groups', lambda: 'again') == 'again'
+
+
+def test_error_reaches_every_waiter():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ConnectionError('reset')
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flights.do, 'key', fail) for _ in range(4)]
+        time.sleep(0.05)
+        release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert flights._flights == {}
+
+
+def test_tasks_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'items': []}
+
+    async def run():
+        return await asyncio.gather(*[flights.do_async('key', fetch) for _ in range(5)],
+                                    flights.do_async('other', fetch))
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(x is results[0] for x in results[:5])
+    assert results[5] is not results[0]
+    assert flights._futures == {}
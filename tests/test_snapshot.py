@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+from ak_api import cassette
+from ak_api import transport
+from ak_api import version_cache
+from ak_utils import papi as p
+from command import snapshot
+
+
+def capture() -> dict:
+    args = SimpleNamespace(account_switch_key=None, concurrency=None, group_id=None)
+    snapshot.main(args, logger=logging.getLogger(__name__))
+    with sqlite3.connect(Path(cassette.snapshot_directory(), 'inventory.db')) as conn:
+        tables = [x for (x,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'capture'")]
+        return {x: conn.execute(f'SELECT * FROM "{x}" ORDER BY 1').fetchall() for x in tables}
+
+
+def test_update_snapshot_then_offline(mock_server, account):
+    cassette.configure('update', cassette.snapshot_directory())
+    updated = capture()
+    assert len(updated['properties']) == len(account.properties)
+    assert updated['security_configs'] and updated['network_lists'] and updated['cpcodes']
+    sent = mock_server.requests
+
+    cassette.configure('offline', cassette.snapshot_directory())
+    transport.configure()
+    version_cache.clear()
+    p._group_indexes.clear()
+    assert capture() == updated
+    assert mock_server.requests == sent
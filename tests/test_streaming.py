@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+import requests
+from ak_api import cache
+from ak_api.papi import Papi
+from ak_utils.papi import PapiWrapper
+from utils import jsonio
+
+
+def listed_properties(papi: Papi) -> list:
+    _, groups = papi.get_groups()
+    return [x for group in groups for contract_id in group.get('contractIds', [])
+            for x in papi.iter_properties_per_group(group['groupId'], contract_id)]
+
+
+def test_iter_records_yields_every_record(mock_server, account):
+    papi = Papi(logger=logging.getLogger(__name__))
+    properties = listed_properties(papi)
+    assert sorted(x['propertyId'] for x in properties) == sorted(account.properties)
+
+
+def test_iter_records_raises_on_error(mock_server):
+    papi = Papi(logger=logging.getLogger(__name__))
+    with pytest.raises(requests.HTTPError):
+        list(papi.iter_properties_per_group('', ''))
+
+
+def test_streamed_listing_comes_from_cache(mock_server, monkeypatch):
+    monkeypatch.setattr(cache, 'ENABLED', True)
+    papi = Papi(logger=logging.getLogger(__name__))
+    first = listed_properties(papi)
+    sent = mock_server.requests
+    assert listed_properties(papi) == first
+    assert mock_server.requests == sent
+
+
+def test_cached_listing_is_streamed_and_stored_once_read(mock_server, monkeypatch):
+    monkeypatch.setattr(cache, 'ENABLED', True)
+    papi = Papi(logger=logging.getLogger(__name__))
+    url = f'{papi.base_url}/network-list/v2/network-lists'
+
+    with papi.session.get(url, stream=True) as resp:
+        assert not resp._content_consumed  # parsed as it arrives, not read whole first
+        resp.raw.read(10)
+    with papi.session.get(url, stream=True) as resp:
+        assert cache.HIT_HEADER not in resp.headers  # a body read part way is not stored
+        assert [x['name'] for x in jsonio.iter_items(resp.raw, 'networkLists.item')]
+    sent = mock_server.requests
+    with papi.session.get(url, stream=True) as resp:
+        assert resp.headers[cache.HIT_HEADER] == 'HIT'
+        assert [x['name'] for x in jsonio.iter_items(resp.raw, 'networkLists.item')]
+    assert mock_server.requests == sent
+
+
+
+def test_group_that_cannot_be_listed_is_empty(mock_server):
+    papi = PapiWrapper(logger=logging.getLogger(__name__))
+    assert papi.get_properties_count_in_group('', '') == 0
+    assert papi.get_propertyname_per_group('', '') == []
+    assert papi.get_properties_detail_per_group('', '').empty
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+import ssl
+
+import certifi
+import pytest
+import requests
+from ak_api import retry
+from ak_api import transport
+from ak_api.cpcode import CpCode
+from ak_api.papi import Papi
+
+
+def test_wrappers_share_one_session(mock_server):
+    papi = Papi(logger=logging.getLogger(__name__))
+    cpcode = CpCode(account_switch_key=None)
+    assert papi.session is cpcode.session
+    assert len(transport._sessions) == 1
+
+
+def test_session_sends_to_base_url(mock_server):
+    papi = Papi(logger=logging.getLogger(__name__))
+    status, groups = papi.get_groups()
+    assert status == 200
+    assert groups
+    assert mock_server.requests == 1
+
+
+@pytest.fixture
+def http2(mock_server, monkeypatch):
+    monkeypatch.setattr(transport, 'HTTP2', False)
+    transport.configure(http2=True)
+    return mock_server
+
+
+def test_http2_adapter_sends_and_streams(http2, account):
+    papi = Papi(logger=logging.getLogger(__name__))
+    assert isinstance(papi.session.get_adapter(transport.BASE_URL), transport.Http2Adapter)
+    status, groups = papi.get_groups()
+    assert status == 200
+    properties = [x for group in groups for contract_id in group.get('contractIds', [])
+                  for x in papi.iter_properties_per_group(group['groupId'], contract_id)]
+    assert sorted(x['propertyId'] for x in properties) == sorted(account.properties)
+
+
+def test_http2_adapter_honours_verify_cert_and_proxies(http2, monkeypatch):
+    monkeypatch.setattr(retry, 'MAX_RETRIES', 0)
+    papi = Papi(logger=logging.getLogger(__name__))
+    adapter = papi.session.get_adapter(transport.BASE_URL)
+    papi.get_groups()
+    proxy = 'http://127.0.0.1:9'  # nothing listens there, the request must fail rather than go direct
+    with pytest.raises(requests.ConnectionError):
+        papi.session.get(f'{transport.BASE_URL}/papi/v1/groups', proxies={'http': proxy}, verify=False, cert=None)
+    assert {(verify is False, cert, proxy) for verify, cert, proxy in adapter._clients} == {(False, None, None), (True, None, proxy)}
+    assert adapter.ssl_context(False, None).verify_mode == ssl.CERT_NONE
+    assert adapter.ssl_context(certifi.where(), None).verify_mode == ssl.CERT_REQUIRED
+    adapter.close()
+    assert adapter._clients == {}
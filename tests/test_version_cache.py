@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import logging
+
+from ak_api.papi import Papi
+
+
+def test_ruletree_sends_one_version_request(mock_server, account):
+    prop = next(iter(account.properties.values()))
+    property_id = int(prop['propertyId'].removeprefix('prp_'))
+    papi = Papi(logger=logging.getLogger(__name__))
+
+    status, ruletree = papi.property_ruletree(property_id, prop['latestVersion'])
+    assert status == 200 and ruletree['rules']
+    assert mock_server.requests == 2  # the version detail for contract and group, then the rules
+
+    papi.property_ruletree(property_id, 1)
+    assert mock_server.requests == 3  # the placement is known now
+    assert papi.get_property_version_detail(property_id, prop['latestVersion'])['propertyId'] == prop['propertyId']
+    assert mock_server.requests == 3
+
+
+def test_listed_property_needs_only_its_rules(mock_server, account):
+    papi = Papi(logger=logging.getLogger(__name__))
+    prop = papi.get_property_version_latest(next(iter(account.properties)))
+    sent = mock_server.requests
+
+    status, _ = papi.property_ruletree(int(prop['propertyId'].removeprefix('prp_')), prop['latestVersion'])
+    assert status == 200
+    assert mock_server.requests == sent + 1